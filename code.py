@@ -1,229 +1,106 @@
 import streamlit as st
 import pandas as pd
-
-# --- Definicje Funkcji Modelu Biznesowego ---
-
-def get_default_inputs():
-    """Zwraca słownik z domyślnymi parametrami wejściowymi modelu."""
+import altair as alt
+import numpy as np
+import contextlib
+import io
+import os
+import time
+
+from psmodel.agents import run_agent_simulation
+from psmodel.batch import KOLUMNY_ROCZNE, PARAMETRY_UDZIALOWE, scenario_results
+from psmodel.cache import PARAMETRY_METRYK, ResultCache, canonical_key
+from psmodel.cohort import run_cohort_model
+from psmodel.display import (FORMAT_PLN, FORMAT_PROCENT, FORMATY_METRYK, FORMATY_PODSUMOWANIA, FORMATY_ROCZNE, KROKI_FORMATOW,
+                             ROZMIAR_STRONY, downsample_indices, page_rows)
+from psmodel.jacobian import elasticities, financial_model_jacobian
+from psmodel.model import calculate_consultant_annual_metrics, get_default_inputs, run_financial_model
+from psmodel.monte_carlo import default_distributions, run_monte_carlo
+from psmodel.optimizer import optimize_recruitment_plan
+from psmodel.portfolio import KLUCZE_ALOKACJI, KOLUMNA_NARZUT, Portfolio, read_units
+from psmodel.sensitivity import numeric_parameters, sweep_2d, tornado
+from psmodel.store import INDEKSOWANE, ZRODLA, ScenarioStore
+from psmodel.timing import record_timings, stage
+
+# --- Pamięć Podręczna Wyników ---
+
+@st.cache_resource
+def get_result_caches():
+    """Tworzy pamięci podręczne współdzielone przez kolejne uruchomienia skryptu.
+
+    Poziom dyskowy jest włączany zmienną środowiskową `PSMODEL_CACHE_DIR`.
+    """
+    katalog = os.environ.get('PSMODEL_CACHE_DIR')
     return {
-        # Parametry Konsultanta
-        'konsultant_godziny_pracy_miesiac': 150,
-        'konsultant_stawka_billable_godz': 500.0,
-        'konsultant_wynagrodzenie_roczne': 500000.0,
-        'konsultant_procent_czasu_rozwoj_admin': 0.05,
-        'konsultant_procent_czasu_billable_docelowy': 0.60,
-        'konsultant_procent_czasu_utrzymanie_projektow': 0.15,
-        # 'konsultant_procent_czasu_sprzedaz_docelowy' - obliczane dynamicznie
-
-        # Parametry Ramp-up
-        'rampup_dlugosc_lata': 2, # Informacyjnie, logika sztywno na R1, R2, Full
-        'rampup_efektywnosc_billable_rok1': 0.25,
-        'rampup_efektywnosc_billable_rok2': 0.60,
-        'rampup_efektywnosc_sprzedaz_rok1': 0.10,
-        'rampup_efektywnosc_sprzedaz_rok2': 0.50,
-
-        # Parametry Sprzedażowe
-        'sprzedaz_leady_rocznie_docelowo': 6,
-        'sprzedaz_srednia_wartosc_kontraktu': 2000000.0,
-        'sprzedaz_cykl_sprzedazy_miesiace': 12, # Wpływa na roczne opóźnienie
-        'sprzedaz_wspolczynnik_konwersji': 0.35,
-
-        # Parametry Korporacyjne
-        'korporacyjne_overhead_roczny_na_konsultanta': 120000.0,
-        'korporacyjne_koszt_rekrutacji_konsultanta': 100000.0,
-
-        # Cele Firmy (do porównania)
-        'cel_marza_operacyjna': 0.15,
-        'cel_liczba_konsultantow_docelowa': 7, # Informacyjnie
-        'cel_obrot_roczny_aspiracja': 100000000.0, # Informacyjnie
-
-        # Parametry Modelu
-        'model_horyzont_analizy_lata': 5,
-
-        # Plan Rekrutacji (Nowi Konsultanci w Roku)
-        'rekrutacja_rok1_nowi': 2,
-        'rekrutacja_rok2_nowi': 2,
-        'rekrutacja_rok3_nowi': 3,
-        'rekrutacja_rok4_nowi': 0,
-        'rekrutacja_rok5_nowi': 0,
+        'metryki': ResultCache('metryki', maks_rozmiar=256, katalog=katalog),
+        'model': ResultCache('model', maks_rozmiar=128, katalog=katalog),
     }
 
-def calculate_consultant_annual_metrics(inputs_dict):
-    """Oblicza roczne metryki dla każdego typu konsultanta (R1, R2, Full)."""
-    metrics = {}
-    godziny_pracy_rocznie_global = inputs_dict['konsultant_godziny_pracy_miesiac'] * 12
-
-    for typ in ["R1", "R2", "Full"]:
-        m = {}
-        m['godziny_pracy_rocznie'] = godziny_pracy_rocznie_global
-        m['godziny_na_rozwoj_admin'] = m['godziny_pracy_rocznie'] * inputs_dict['konsultant_procent_czasu_rozwoj_admin']
-
-        if typ == "R1":
-            efektywnosc_billable = inputs_dict['rampup_efektywnosc_billable_rok1']
-            efektywnosc_sprzedaz = inputs_dict['rampup_efektywnosc_sprzedaz_rok1']
-            m['godziny_na_utrzymanie_projektow'] = 0 # Założenie
-        elif typ == "R2":
-            efektywnosc_billable = inputs_dict['rampup_efektywnosc_billable_rok2']
-            efektywnosc_sprzedaz = inputs_dict['rampup_efektywnosc_sprzedaz_rok2']
-            # Założenie: R2 poświęca połowę docelowego czasu na utrzymanie
-            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
-                                                inputs_dict['konsultant_procent_czasu_utrzymanie_projektow'] * 0.5
-        else: # Full
-            efektywnosc_billable = 1.0
-            efektywnosc_sprzedaz = 1.0
-            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
-                                                inputs_dict['konsultant_procent_czasu_utrzymanie_projektow']
-
-        m['godziny_billable'] = m['godziny_pracy_rocznie'] * \
-                                inputs_dict['konsultant_procent_czasu_billable_docelowy'] * efektywnosc_billable
-        
-        if typ == "Full":
-             m['godziny_na_sprzedaz'] = m['godziny_pracy_rocznie'] * \
-                                       inputs_dict['konsultant_procent_czasu_sprzedaz_docelowy']
-        else: # Dla R1 i R2, czas na sprzedaż to reszta
-            m['godziny_na_sprzedaz'] = m['godziny_pracy_rocznie'] - m['godziny_na_rozwoj_admin'] - \
-                                     m['godziny_billable'] - m['godziny_na_utrzymanie_projektow']
-            if m['godziny_na_sprzedaz'] < 0: m['godziny_na_sprzedaz'] = 0
-
-
-        m['przychod_z_godzin_billable'] = m['godziny_billable'] * inputs_dict['konsultant_stawka_billable_godz']
-        
-        m['liczba_wygenerowanych_leadow'] = inputs_dict['sprzedaz_leady_rocznie_docelowo'] * efektywnosc_sprzedaz
-        m['liczba_pozyskanych_kontraktow'] = m['liczba_wygenerowanych_leadow'] * inputs_dict['sprzedaz_wspolczynnik_konwersji']
-        m['potencjalny_przychod_z_kontraktow'] = m['liczba_pozyskanych_kontraktow'] * inputs_dict['sprzedaz_srednia_wartosc_kontraktu']
-        
-        m['koszt_wynagrodzenia'] = inputs_dict['konsultant_wynagrodzenie_roczne']
-        m['koszt_overheadu'] = inputs_dict['korporacyjne_overhead_roczny_na_konsultanta']
-        m['calkowity_koszt_roczny_konsultanta'] = m['koszt_wynagrodzenia'] + m['koszt_overheadu']
-        
-        m['calkowity_przychod_potencjalny_konsultanta'] = m['przychod_z_godzin_billable'] + m['potencjalny_przychod_z_kontraktow']
-        m['zysk_strata_na_konsultancie_potencjalny'] = m['calkowity_przychod_potencjalny_konsultanta'] - m['calkowity_koszt_roczny_konsultanta']
-        
-        metrics[typ] = m
-    return metrics
-
-def run_financial_model(inputs_dict):
-    """Uruchamia 5-letnią symulację finansową."""
-    
-    horyzont_lat = inputs_dict['model_horyzont_analizy_lata']
-    plan_rekrutacji = [
-        inputs_dict['rekrutacja_rok1_nowi'], inputs_dict['rekrutacja_rok2_nowi'],
-        inputs_dict['rekrutacja_rok3_nowi'], inputs_dict['rekrutacja_rok4_nowi'],
-        inputs_dict['rekrutacja_rok5_nowi']
-    ]
-
-    # Oblicz metryki roczne per typ konsultanta raz
-    metrics_per_consultant_type = calculate_consultant_annual_metrics(inputs_dict)
-
-    # Inicjalizacja stanów
-    konsultanci_r1_poprzedni_rok = 0
-    konsultanci_r2_poprzedni_rok = 0
-    konsultanci_full_poprzedni_rok = 0
-    
-    kontrakty_pozyskane_lacznie_poprzedni_rok = 0
-    skumulowany_przeplyw_pieniezny = 0
-    
-    roczne_wyniki_lista = []
-    calkowite_koszty_rekrutacji_do_roi = 0
-
-    for i_rok in range(horyzont_lat):
-        rok_kalendarzowy = i_rok + 1
-        wyniki_biezacego_roku = {"Rok": rok_kalendarzowy}
-
-        # --- Liczba Konsultantów ---
-        nowi_w_roku = plan_rekrutacji[i_rok]
-        
-        przechodzacy_do_r2 = konsultanci_r1_poprzedni_rok
-        przechodzacy_do_full = konsultanci_r2_poprzedni_rok
-        
-        biezacy_r1_eoy = nowi_w_roku
-        biezacy_r2_eoy = przechodzacy_do_r2
-        biezacy_full_eoy = konsultanci_full_poprzedni_rok + przechodzacy_do_full
-        
-        wyniki_biezacego_roku["Konsultanci R1 (koniec roku)"] = biezacy_r1_eoy
-        wyniki_biezacego_roku["Konsultanci R2 (koniec roku)"] = biezacy_r2_eoy
-        wyniki_biezacego_roku["Konsultanci Full (koniec roku)"] = biezacy_full_eoy
-        laczna_liczba_konsultantow_eoy = biezacy_r1_eoy + biezacy_r2_eoy + biezacy_full_eoy
-        wyniki_biezacego_roku["Łączna Liczba Konsultantów (koniec roku)"] = laczna_liczba_konsultantow_eoy
-
-        # Aktualizacja stanu na następny rok
-        konsultanci_r1_poprzedni_rok = biezacy_r1_eoy
-        konsultanci_r2_poprzedni_rok = biezacy_r2_eoy
-        konsultanci_full_poprzedni_rok = biezacy_full_eoy
-
-        # --- Przychody ---
-        przychod_billable_r1 = biezacy_r1_eoy * metrics_per_consultant_type["R1"]['przychod_z_godzin_billable']
-        przychod_billable_r2 = biezacy_r2_eoy * metrics_per_consultant_type["R2"]['przychod_z_godzin_billable']
-        przychod_billable_full = biezacy_full_eoy * metrics_per_consultant_type["Full"]['przychod_z_godzin_billable']
-        laczny_przychod_billable = przychod_billable_r1 + przychod_billable_r2 + przychod_billable_full
-        wyniki_biezacego_roku["Łączny Przychód z Godzin Billable"] = laczny_przychod_billable
-
-        kontrakty_pozyskane_r1_w_roku = biezacy_r1_eoy * metrics_per_consultant_type["R1"]['liczba_pozyskanych_kontraktow']
-        kontrakty_pozyskane_r2_w_roku = biezacy_r2_eoy * metrics_per_consultant_type["R2"]['liczba_pozyskanych_kontraktow']
-        kontrakty_pozyskane_full_w_roku = biezacy_full_eoy * metrics_per_consultant_type["Full"]['liczba_pozyskanych_kontraktow']
-        lacznie_kontrakty_pozyskane_biezacy_rok = kontrakty_pozyskane_r1_w_roku + kontrakty_pozyskane_r2_w_roku + kontrakty_pozyskane_full_w_roku
-        wyniki_biezacego_roku["Łącznie Kontrakty Pozyskane (szt.)"] = lacznie_kontrakty_pozyskane_biezacy_rok
-        
-        przychod_z_kontraktow_w_roku = kontrakty_pozyskane_lacznie_poprzedni_rok * inputs_dict['sprzedaz_srednia_wartosc_kontraktu']
-        wyniki_biezacego_roku["Przychód z Kontraktów (z opóźnieniem)"] = przychod_z_kontraktow_w_roku
-        
-        kontrakty_pozyskane_lacznie_poprzedni_rok = lacznie_kontrakty_pozyskane_biezacy_rok # Na następny rok
-
-        calkowity_przychod_firmy = laczny_przychod_billable + przychod_z_kontraktow_w_roku
-        wyniki_biezacego_roku["CAŁKOWITY PRZYCHÓD FIRMY"] = calkowity_przychod_firmy
-
-        # --- Koszty ---
-        wynagrodzenia = laczna_liczba_konsultantow_eoy * inputs_dict['konsultant_wynagrodzenie_roczne']
-        wyniki_biezacego_roku["Wynagrodzenia"] = wynagrodzenia
-        
-        overhead = laczna_liczba_konsultantow_eoy * inputs_dict['korporacyjne_overhead_roczny_na_konsultanta']
-        wyniki_biezacego_roku["Overhead"] = overhead
-        
-        koszty_rekrutacji = nowi_w_roku * inputs_dict['korporacyjne_koszt_rekrutacji_konsultanta']
-        wyniki_biezacego_roku["Koszty Rekrutacji"] = koszty_rekrutacji
-        calkowite_koszty_rekrutacji_do_roi += koszty_rekrutacji
-        
-        laczne_koszty_operacyjne = wynagrodzenia + overhead + koszty_rekrutacji
-        wyniki_biezacego_roku["Łączne Koszty Operacyjne"] = laczne_koszty_operacyjne
-
-        # --- Rentowność ---
-        ebit = calkowity_przychod_firmy - laczne_koszty_operacyjne
-        wyniki_biezacego_roku["ZYSK / STRATA OPERACYJNA (EBIT)"] = ebit
-        
-        marza_operacyjna = ebit / calkowity_przychod_firmy if calkowity_przychod_firmy != 0 else 0
-        wyniki_biezacego_roku["MARŻA OPERACYJNA (%)"] = marza_operacyjna * 100 # Procenty
-
-        # --- Przepływy ---
-        skumulowany_przeplyw_pieniezny += ebit
-        wyniki_biezacego_roku["Skumulowany przepływ pieniężny"] = skumulowany_przeplyw_pieniezny
-        
-        roczne_wyniki_lista.append(wyniki_biezacego_roku)
-
-    # --- Podsumowanie ROI ---
-    roi_summary = {}
-    roi_summary['calkowite_koszty_rekrutacji_5lat'] = calkowite_koszty_rekrutacji_do_roi
-    roi_summary['skumulowany_ebit_5lat'] = skumulowany_przeplyw_pieniezny
-    
-    if calkowite_koszty_rekrutacji_do_roi > 0:
-        roi_summary['roi'] = skumulowany_przeplyw_pieniezny / calkowite_koszty_rekrutacji_do_roi
-    else:
-        roi_summary['roi'] = float('inf') if skumulowany_przeplyw_pieniezny > 0 else 0
-
-    payback_period = "Brak zwrotu w 5 lat lub później"
-    for i, rok_dane in enumerate(roczne_wyniki_lista):
-        if rok_dane["Skumulowany przepływ pieniężny"] > 0:
-            # Prosta wersja - rok, w którym po raz pierwszy jest dodatni
-            payback_period = f"W {rok_dane['Rok']} roku"
-            # TODO: Dokładniejsza interpolacja, jeśli potrzebna
-            break
-    roi_summary['payback_period_display'] = payback_period
-    
-    # Konwersja na DataFrame
-    roczne_wyniki_df = pd.DataFrame(roczne_wyniki_lista)
-    # Konwersja metryk konsultantów na DataFrame
-    detailed_consultant_metrics_df = pd.DataFrame(metrics_per_consultant_type).T # Transpozycja dla lepszego widoku
-    
-    return roczne_wyniki_df, roi_summary, detailed_consultant_metrics_df
+@st.cache_resource
+def get_scenario_store(katalog, horyzont_lat):
+    """Otwiera magazyn scenariuszy raz na katalog i horyzont; obiekt jest współdzielony przez sesje."""
+    return ScenarioStore(katalog, horyzont_lat)
+
+def open_scenario_store(horyzont_lat):
+    """Magazyn dla bieżącego horyzontu albo None - błąd formatu lub odczytu katalogu pokazuje w aplikacji.
+
+    Magazyn jest otwierany dopiero tam, gdzie jest potrzebny, więc katalog w starym formacie
+    nie blokuje reszty aplikacji.
+    """
+    try:
+        magazyn = get_scenario_store(os.environ.get('PSMODEL_STORE_DIR', 'scenariusze'), int(horyzont_lat))
+        len(magazyn)  # odświeża schemat - katalog mógł zostać podmieniony od otwarcia
+    except (ValueError, OSError) as blad:
+        st.error(f"Nie udało się otworzyć magazynu scenariuszy: {blad}")
+        return None
+    return magazyn
+
+@st.cache_data(max_entries=64)
+def elasticities_table(inputs_dict):
+    """Tabela elastyczności z jakobianu modelu rocznego; liczona raz na zestaw parametrów."""
+    jakobian = financial_model_jacobian(inputs_dict)
+    elastycznosci_df = pd.DataFrame({
+        "EBIT": elasticities(jakobian, inputs_dict, "ZYSK / STRATA OPERACYJNA (EBIT)"),
+        "Marża operacyjna": elasticities(jakobian, inputs_dict, "MARŻA OPERACYJNA (%)"),
+        "Skumulowany przepływ pieniężny": elasticities(jakobian, inputs_dict, "Skumulowany przepływ pieniężny"),
+        "ROI": elasticities(jakobian, inputs_dict, 'roi'),
+    }, index=pd.Index(jakobian['parametry'], name="Parametr"))
+    return elastycznosci_df.reindex(elastycznosci_df["EBIT"].abs().sort_values(ascending=False).index)
+
+# --- Wyświetlanie Tabel i Wykresów ---
+
+def show_table(df, formaty=None, klucz="tabela", **kwargs):
+    """Wyświetla tabelę liczbową z formatami nakładanymi przy renderowaniu; duże tabele dzieli na strony.
+
+    `formaty` to słownik kolumna -> (etykieta, format) jak w `psmodel.display`.
+    """
+    with stage('formatowanie'):
+        konfiguracja = {k: st.column_config.NumberColumn(etykieta, format=format_kolumny, step=KROKI_FORMATOW.get(format_kolumny))
+                        for k, (etykieta, format_kolumny) in (formaty or {}).items() if k in df.columns}
+        if len(df) > ROZMIAR_STRONY:
+            # Sortujemy całą tabelę (tylko tablica kolejności), a do przeglądarki wysyłamy jedną stronę
+            kol1, kol2, kol3 = st.columns(3)
+            sortuj = kol1.selectbox("Sortuj według", [None, *df.columns], key=f"{klucz}_sortuj",
+                                    format_func=lambda k: "(bez sortowania)" if k is None else str(k))
+            malejaco = kol2.checkbox("Malejąco", value=True, key=f"{klucz}_malejaco")
+            liczba_stron = -(-len(df) // ROZMIAR_STRONY)
+            strona = kol3.number_input(f"Strona (z {liczba_stron})", min_value=1, max_value=liczba_stron, value=1,
+                                       key=f"{klucz}_strona")
+            kolejnosc = len(df)
+            if sortuj is not None:
+                kolejnosc = np.argsort(df[sortuj].to_numpy(), kind='stable')
+                kolejnosc = kolejnosc[::-1] if malejaco else kolejnosc
+            wiersze, _ = page_rows(kolejnosc, strona)
+            st.caption(f"Strona {int(strona)} z {liczba_stron} ({len(wiersze):,} z {len(df):,} wierszy)")
+            df = df.iloc[wiersze]
+    with stage('renderowanie'):
+        st.dataframe(df, column_config=konfiguracja, use_container_width=True, **kwargs)
+
+
+def chart_rows(df, kolumny):
+    """Zwraca ramkę do wykresu; długie serie są próbkowane z zachowaniem minimów i maksimów."""
+    indeksy = downsample_indices([df[k].to_numpy() for k in kolumny])
+    return df if len(indeksy) == len(df) else df.iloc[indeksy]
 
 # --- Interfejs Użytkownika Streamlit ---
 
@@ -231,7 +108,7 @@ st.set_page_config(layout="wide", page_title="Model Biznesowy Konsulting")
 st.title("📈 Model Biznesowy Firmy Konsultingowej")
 st.markdown("""
 Ten model symuluje finanse firmy konsultingowej w branży technologiczno-ubezpieczeniowej
-na przestrzeni 5 lat. Możesz dostosować parametry wejściowe w panelu bocznym,
+w wybranym horyzoncie (domyślnie 5 lat). Możesz dostosować parametry wejściowe w panelu bocznym,
 aby zobaczyć ich wpływ na rentowność i zwrot z inwestycji.
 """)
 
@@ -272,6 +149,8 @@ inputs['rampup_efektywnosc_sprzedaz_rok1'] = st.sidebar.slider(
     "Efektywność Sprzedażowa - Rok 1", min_value=0.0, max_value=1.0, value=default_inputs['rampup_efektywnosc_sprzedaz_rok1'], step=0.01, format="%.2f")
 inputs['rampup_efektywnosc_sprzedaz_rok2'] = st.sidebar.slider(
     "Efektywność Sprzedażowa - Rok 2", min_value=0.0, max_value=1.0, value=default_inputs['rampup_efektywnosc_sprzedaz_rok2'], step=0.01, format="%.2f")
+inputs['rampup_dlugosc_lata'] = st.sidebar.number_input(
+    "Długość ramp-upu (lata)", min_value=1, max_value=5, value=default_inputs['rampup_dlugosc_lata'], step=1)
 
 # Parametry Sprzedażowe
 st.sidebar.subheader("Sprzedaż")
@@ -281,6 +160,12 @@ inputs['sprzedaz_srednia_wartosc_kontraktu'] = st.sidebar.number_input(
     "Średnia wartość kontraktu (PLN)", min_value=100000.0, max_value=10000000.0, value=default_inputs['sprzedaz_srednia_wartosc_kontraktu'], step=100000.0, format="%.2f")
 inputs['sprzedaz_wspolczynnik_konwersji'] = st.sidebar.slider(
     "Współczynnik konwersji (lead -> kontrakt)", min_value=0.0, max_value=1.0, value=default_inputs['sprzedaz_wspolczynnik_konwersji'], step=0.01, format="%.2f")
+inputs['sprzedaz_cykl_sprzedazy_miesiace'] = st.sidebar.slider(
+    "Cykl sprzedaży (miesiące)", min_value=1, max_value=36, value=default_inputs['sprzedaz_cykl_sprzedazy_miesiace'], step=1)
+inputs['sprzedaz_cykl_rozrzut_miesiace'] = st.sidebar.slider(
+    "Rozrzut cyklu sprzedaży (± miesiące)", min_value=0, max_value=12, value=default_inputs['sprzedaz_cykl_rozrzut_miesiace'], step=1)
+inputs['sprzedaz_okres_realizacji_miesiace'] = st.sidebar.slider(
+    "Okres realizacji kontraktu (miesiące)", min_value=1, max_value=60, value=default_inputs['sprzedaz_okres_realizacji_miesiace'], step=1)
 
 # Parametry Korporacyjne
 st.sidebar.subheader("Korporacyjne")
@@ -289,95 +174,409 @@ inputs['korporacyjne_overhead_roczny_na_konsultanta'] = st.sidebar.number_input(
 inputs['korporacyjne_koszt_rekrutacji_konsultanta'] = st.sidebar.number_input(
     "Koszt rekrutacji konsultanta (PLN)", min_value=0.0, max_value=300000.0, value=default_inputs['korporacyjne_koszt_rekrutacji_konsultanta'], step=10000.0, format="%.2f")
 
+# Parametry Modelu
+st.sidebar.subheader("Model")
+inputs['model_horyzont_analizy_lata'] = st.sidebar.number_input(
+    "Horyzont analizy (lata)", min_value=1, max_value=30, value=default_inputs['model_horyzont_analizy_lata'], step=1)
+krok_symulacji = st.sidebar.selectbox("Krok symulacji", ["roczny", "miesieczny"], format_func=lambda k: {"roczny": "Roczny", "miesieczny": "Miesięczny"}[k])
+zapisuj_scenariusze = st.sidebar.checkbox("💾 Zapisuj uruchomienia w magazynie scenariuszy", value=False)
+mierz_czas_etapow = st.sidebar.checkbox("⏱️ Mierz czas etapów (panel wydajności)", value=False)
+
 # Plan Rekrutacji
 st.sidebar.subheader("Plan Rekrutacji (nowi konsultanci)")
-inputs['rekrutacja_rok1_nowi'] = st.sidebar.number_input("Rok 1", min_value=0, max_value=10, value=default_inputs['rekrutacja_rok1_nowi'], step=1)
-inputs['rekrutacja_rok2_nowi'] = st.sidebar.number_input("Rok 2", min_value=0, max_value=10, value=default_inputs['rekrutacja_rok2_nowi'], step=1)
-inputs['rekrutacja_rok3_nowi'] = st.sidebar.number_input("Rok 3", min_value=0, max_value=10, value=default_inputs['rekrutacja_rok3_nowi'], step=1)
-inputs['rekrutacja_rok4_nowi'] = st.sidebar.number_input("Rok 4", min_value=0, max_value=10, value=default_inputs['rekrutacja_rok4_nowi'], step=1)
-inputs['rekrutacja_rok5_nowi'] = st.sidebar.number_input("Rok 5", min_value=0, max_value=10, value=default_inputs['rekrutacja_rok5_nowi'], step=1)
-
-# Ukryte, ale potrzebne
-inputs['model_horyzont_analizy_lata'] = default_inputs['model_horyzont_analizy_lata']
+for rok in range(1, inputs['model_horyzont_analizy_lata'] + 1):
+    inputs[f'rekrutacja_rok{rok}_nowi'] = st.sidebar.number_input(
+        f"Rok {rok}", min_value=0, max_value=10, value=default_inputs.get(f'rekrutacja_rok{rok}_nowi', 0), step=1)
+
+# Model roczny ma sztywne etapy R1 -> R2 -> Full, roczne opóźnienie kontraktów
+# i rozpoznaje przychód w roku podpisania; pozostałe ustawienia liczy silnik kohortowy
+uzyj_silnika_kohortowego = krok_symulacji != "roczny" or inputs['rampup_dlugosc_lata'] != 2 or \
+    inputs['sprzedaz_cykl_sprzedazy_miesiace'] != 12 or inputs['sprzedaz_cykl_rozrzut_miesiace'] != 0 or \
+    inputs['sprzedaz_okres_realizacji_miesiace'] > 12
+# Analizy wielu scenariuszy (Monte Carlo, wrażliwość) liczymy tym samym silnikiem co tabelę wyników
+krok_analiz = krok_symulacji if uzyj_silnika_kohortowego else None
+opis_silnika = f"silnik kohortowy, krok {'miesięczny' if krok_symulacji == 'miesieczny' else 'roczny'}" \
+    if uzyj_silnika_kohortowego else "model roczny"
+# Krok miesięczny ma 12 razy więcej okresów - mniejsze paczki utrzymują podobne zużycie pamięci
+rozmiar_paczki_analiz = 5_000 if krok_analiz == "miesieczny" else 50_000
 
 
 # --- Główny Panel z Wynikami ---
-if st.sidebar.button("🚀 Uruchom Model", type="primary", use_container_width=True):
-    with st.spinner("Przetwarzanie modelu..."):
-        yearly_results_df, roi_summary, detailed_consultant_metrics_df = run_financial_model(inputs)
+cache_wynikow = get_result_caches()
+# Pomiar etapów obejmuje cały blok wyników. Blok `with` przywraca zmienną kontekstową także wtedy,
+# gdy skrypt zostanie przerwany wyjątkiem lub ponownym uruchomieniem (RerunException), więc
+# pomiary nie przenoszą się na kolejne uruchomienia w tym samym wątku
+with record_timings() if mierz_czas_etapow else contextlib.nullcontext() as pomiary_etapow:
+    start_wynikow = time.perf_counter()
+    klucz_modelu = canonical_key(inputs, krok=krok_symulacji, silnik_kohortowy=uzyj_silnika_kohortowego)
+    if st.sidebar.button("🚀 Uruchom Model", type="primary", use_container_width=True):
+        with st.spinner("Przetwarzanie modelu..."):
+            # Metryki per typ konsultanta zależą tylko od części parametrów - np. zmiana planu rekrutacji ich nie unieważnia
+            metryki = cache_wynikow['metryki'].get_or_compute(
+                canonical_key(inputs, PARAMETRY_METRYK), lambda: calculate_consultant_annual_metrics(inputs))
+
+            def policz_model():
+                if uzyj_silnika_kohortowego:
+                    wyniki_kohortowe = run_cohort_model([inputs], krok=krok_symulacji)
+                    return scenario_results(wyniki_kohortowe, 0) + (pd.DataFrame(metryki).T, wyniki_kohortowe['okresowe'])
+                return run_financial_model(inputs, metrics=metryki) + (None,)
+
+            wyniki_modelu = cache_wynikow['model'].get_or_compute(klucz_modelu, policz_model)
+
+            magazyn = open_scenario_store(inputs['model_horyzont_analizy_lata']) if zapisuj_scenariusze else None
+            if magazyn is not None:
+                magazyn.append([inputs], {k: wyniki_modelu[0][k].to_numpy(dtype=np.float64)[None, :] for k in KOLUMNY_ROCZNE},
+                               zrodlo=f"kohortowy_{krok_symulacji}" if uzyj_silnika_kohortowego else "model_roczny")
+        # Wyniki w stanie sesji - zmiana strony lub sortowania tabeli uruchamia skrypt ponownie
+        # bez kliknięcia przycisku, a wyniki nie powinny wtedy znikać
+        st.session_state['wyniki_modelu'] = {'klucz': klucz_modelu, 'wyniki': wyniki_modelu}
+
+    if 'wyniki_modelu' in st.session_state:
+        yearly_results_df, roi_summary, detailed_consultant_metrics_df, okresowe = st.session_state['wyniki_modelu']['wyniki']
+        if st.session_state['wyniki_modelu']['klucz'] != klucz_modelu:
+            st.warning("Parametry zmieniły się od ostatniego uruchomienia - kliknij '🚀 Uruchom Model', aby przeliczyć wyniki.")
 
         st.subheader("📊 Wyniki Modelu Finansowego (Roczne)")
-        
-        # Formatowanie DataFrame dla czytelności
-        formatted_df = yearly_results_df.copy()
-        currency_columns = ["Łączny Przychód z Godzin Billable", "Przychód z Kontraktów (z opóźnieniem)",
-                            "CAŁKOWITY PRZYCHÓD FIRMY", "Wynagrodzenia", "Overhead", "Koszty Rekrutacji",
-                            "Łączne Koszty Operacyjne", "ZYSK / STRATA OPERACYJNA (EBIT)", "Skumulowany przepływ pieniężny"]
-        for col in currency_columns:
-            if col in formatted_df.columns:
-                 formatted_df[col] = formatted_df[col].apply(lambda x: f"{x:,.0f} PLN")
-        
-        if "MARŻA OPERACYJNA (%)" in formatted_df.columns:
-            formatted_df["MARŻA OPERACYJNA (%)"] = formatted_df["MARŻA OPERACYJNA (%)"].apply(lambda x: f"{x:.2f}%")
-
-        # Zmiana nazw kolumn dla lepszej prezentacji
-        column_rename_map = {
-            "Konsultanci R1 (koniec roku)": "Kons. R1",
-            "Konsultanci R2 (koniec roku)": "Kons. R2",
-            "Konsultanci Full (koniec roku)": "Kons. Full",
-            "Łączna Liczba Konsultantów (koniec roku)": "∑ Kons.",
-            "Łącznie Kontrakty Pozyskane (szt.)": "Kontrakty (szt.)"
-        }
-        display_df = formatted_df.rename(columns=column_rename_map)
-        st.dataframe(display_df, use_container_width=True)
-
-        st.subheader("🏆 Kluczowe Wskaźniki (po 5 latach)")
+
+        # Tabela pozostaje liczbowa - formaty i krótkie nazwy kolumn są nakładane przy renderowaniu
+        show_table(yearly_results_df, FORMATY_ROCZNE, klucz="roczne", hide_index=True)
+
+        st.subheader(f"🏆 Kluczowe Wskaźniki (po {len(yearly_results_df)} latach)")
         col1, col2, col3 = st.columns(3)
         col1.metric("Skumulowany EBIT", f"{roi_summary.get('skumulowany_ebit_5lat', 0):,.0f} PLN")
         col2.metric("Proste ROI", f"{roi_summary.get('roi', 0):.2%}")
         col3.metric("Okres Zwrotu", f"{roi_summary.get('payback_period_display', 'N/A')}")
 
         st.subheader("📈 Wykresy")
-        if not yearly_results_df.empty:
-            # Wykres EBIT i Skumulowanego Przepływu
-            chart_data_ebit = yearly_results_df[['Rok', 'ZYSK / STRATA OPERACYJNA (EBIT)', 'Skumulowany przepływ pieniężny']].set_index('Rok')
-            st.line_chart(chart_data_ebit)
-
-            # Wykres Struktury Przychodów
-            revenue_chart_data = yearly_results_df[['Rok', 'Łączny Przychód z Godzin Billable', 'Przychód z Kontraktów (z opóźnieniem)']].set_index('Rok')
-            st.bar_chart(revenue_chart_data)
-            
-            # Wykres Liczby Konsultantów
-            consultant_chart_data = yearly_results_df[['Rok', 'Konsultanci R1 (koniec roku)', 'Konsultanci R2 (koniec roku)', 'Konsultanci Full (koniec roku)']].set_index('Rok')
-            st.area_chart(consultant_chart_data)
+        with stage('renderowanie'):
+            if not yearly_results_df.empty:
+                # Wykresy czytają kolumny bezpośrednio z tabeli wyników (bez budowania osobnych ramek)
+                kolumny_ebit = ['ZYSK / STRATA OPERACYJNA (EBIT)', 'Skumulowany przepływ pieniężny']
+                st.line_chart(chart_rows(yearly_results_df, kolumny_ebit), x='Rok', y=kolumny_ebit)
+
+                kolumny_przychodu = ['Łączny Przychód z Godzin Billable', 'Przychód z Kontraktów (z opóźnieniem)']
+                st.bar_chart(chart_rows(yearly_results_df, kolumny_przychodu), x='Rok', y=kolumny_przychodu)
+
+                kolumny_konsultantow = ['Konsultanci R1 (koniec roku)', 'Konsultanci R2 (koniec roku)', 'Konsultanci Full (koniec roku)']
+                st.area_chart(chart_rows(yearly_results_df, kolumny_konsultantow), x='Rok', y=kolumny_konsultantow)
+
+                if okresowe is not None and len(okresowe["Okres"]) > len(yearly_results_df):
+                    # Wykres miesięczny z silnika kohortowego - próbkowany przy długich horyzontach
+                    ebit_miesieczny = okresowe["ZYSK / STRATA OPERACYJNA (EBIT)"][0]
+                    przeplyw_miesieczny = okresowe["Skumulowany przepływ pieniężny"][0]
+                    punkty = downsample_indices([ebit_miesieczny, przeplyw_miesieczny])
+                    st.line_chart(pd.DataFrame({
+                        "Miesiąc": okresowe["Okres"][punkty],
+                        "EBIT miesięczny": ebit_miesieczny[punkty],
+                        "Skumulowany przepływ pieniężny": przeplyw_miesieczny[punkty],
+                    }), x="Miesiąc")
 
 
         st.subheader("📄 Szczegółowe Kalkulacje Roczne dla Typów Konsultantów")
-        # Formatowanie tabeli metryk konsultantów
-        formatted_metrics_df = detailed_consultant_metrics_df.copy()
-        metrics_currency_cols = ['przychod_z_godzin_billable', 'potencjalny_przychod_z_kontraktow', 
-                                 'koszt_wynagrodzenia', 'koszt_overheadu', 'calkowity_koszt_roczny_konsultanta',
-                                 'calkowity_przychod_potencjalny_konsultanta', 'zysk_strata_na_konsultancie_potencjalny']
-        metrics_hours_cols = ['godziny_pracy_rocznie', 'godziny_na_rozwoj_admin', 'godziny_billable', 
-                              'godziny_na_utrzymanie_projektow', 'godziny_na_sprzedaz']
-        
-        for col in metrics_currency_cols:
-            if col in formatted_metrics_df.columns:
-                formatted_metrics_df[col] = formatted_metrics_df[col].apply(lambda x: f"{x:,.0f} PLN")
-        for col in metrics_hours_cols:
-            if col in formatted_metrics_df.columns:
-                 formatted_metrics_df[col] = formatted_metrics_df[col].apply(lambda x: f"{x:,.0f} godz.")
-        
-        if 'liczba_wygenerowanych_leadow' in formatted_metrics_df.columns:
-            formatted_metrics_df['liczba_wygenerowanych_leadow'] = formatted_metrics_df['liczba_wygenerowanych_leadow'].apply(lambda x: f"{x:.1f} szt.")
-        if 'liczba_pozyskanych_kontraktow' in formatted_metrics_df.columns:
-            formatted_metrics_df['liczba_pozyskanych_kontraktow'] = formatted_metrics_df['liczba_pozyskanych_kontraktow'].apply(lambda x: f"{x:.1f} szt.")
-
-        st.dataframe(formatted_metrics_df, use_container_width=True)
-
-
-else:
-    st.info("Dostosuj parametry w panelu bocznym i kliknij '🚀 Uruchom Model', aby zobaczyć wyniki.")
+        show_table(detailed_consultant_metrics_df, FORMATY_METRYK, klucz="metryki")
+
+
+    else:
+        st.info("Dostosuj parametry w panelu bocznym i kliknij '🚀 Uruchom Model', aby zobaczyć wyniki.")
+czas_wynikow = time.perf_counter() - start_wynikow
+
+# --- Panel Wydajności ---
+with st.expander("⏱️ Wydajność bieżącego uruchomienia"):
+    if not mierz_czas_etapow:
+        st.caption("Pomiar czasu etapów jest wyłączony - włącz go w panelu bocznym w sekcji \"Model\".")
+    else:
+        # Czas bloku wyników poza oznaczonymi etapami (spinner, metryki, wykresy pomocnicze)
+        pomiary_etapow.add('inne', max(0.0, czas_wynikow - pomiary_etapow.total), 0)
+        if len(pomiary_etapow.etapy) > 1:
+            st.metric("Łączny czas bloku wyników", f"{pomiary_etapow.total * 1000:,.1f} ms")
+            st.dataframe(pd.DataFrame(pomiary_etapow.records()).set_index('etap'), use_container_width=True,
+                         column_config={'czas_ms': st.column_config.NumberColumn("Czas (ms)", format="%.2f"),
+                                        'wywolania': st.column_config.NumberColumn("Wywołania"),
+                                        'udzial': st.column_config.ProgressColumn("Udział", min_value=0.0, max_value=1.0, format="%.2f")})
+            st.caption("Etapy pominięte w tabeli zostały wzięte z pamięci podręcznej wyników.")
+        else:
+            st.caption("Uruchom model, aby zobaczyć czasy etapów: metryki, symulacja, budowa tabel, formatowanie i renderowanie.")
+
+# --- Pamięć Podręczna ---
+with st.expander("🗄️ Pamięć podręczna wyników"):
+    st.dataframe(pd.DataFrame([c.stats() for c in cache_wynikow.values()]).set_index('nazwa'), use_container_width=True)
+    katalog_cache = os.environ.get('PSMODEL_CACHE_DIR')
+    st.caption(f"Poziom dyskowy: {katalog_cache}" if katalog_cache else
+               "Poziom dyskowy wyłączony (ustaw zmienną środowiskową PSMODEL_CACHE_DIR).")
+    if st.button("🧹 Wyczyść pamięć podręczną"):
+        for c in cache_wynikow.values():
+            c.clear(dysk=True)
+        st.rerun()
+
+# --- Magazyn Scenariuszy ---
+with st.expander("🗃️ Magazyn zapisanych scenariuszy"):
+    magazyn = open_scenario_store(inputs['model_horyzont_analizy_lata'])
+    if magazyn is not None:
+        st.markdown(f"Zapisane uruchomienia dla horyzontu {inputs['model_horyzont_analizy_lata']} lat: **{len(magazyn):,}** "
+                    f"(katalog `{magazyn.katalog}`). Zapis włączysz w panelu bocznym w sekcji \"Model\".")
+        if len(magazyn):
+            mag_col1, mag_col2, mag_col3, mag_col4 = st.columns(4)
+            mag_miara = mag_col1.selectbox("Sortuj według", INDEKSOWANE)
+            mag_n = mag_col2.number_input("Liczba scenariuszy", min_value=1, max_value=10_000, value=50, step=10)
+            mag_zrodlo = mag_col3.selectbox("Silnik i krok", [None, *ZRODLA],
+                                            format_func=lambda z: "(wszystkie)" if z is None else z.replace('_', ' '))
+            mag_cel = mag_col4.checkbox("Tylko z marżą ≥ cel", value=True)
+            mag_malejaco = mag_miara != 'rok_zwrotu'  # wcześniejszy zwrot jest lepszy
+            najlepsze = magazyn.top(mag_miara, n=int(mag_n), malejaco=mag_malejaco,
+                                    warunki={'nadwyzka_marzy': (0, None)} if mag_cel else None, zrodlo=mag_zrodlo)
+            najlepsze_df = pd.DataFrame(najlepsze).set_index('wiersz')
+            plany = pd.DataFrame(magazyn.inputs(najlepsze['wiersz']), index=najlepsze_df.index)
+            kolumny_planu = [k for k in plany.columns if k.startswith('rekrutacja_')]
+            show_table(najlepsze_df.join(plany[kolumny_planu]).replace(np.inf, np.nan), FORMATY_PODSUMOWANIA, klucz="magazyn")
+
+# --- Symulacja Monte Carlo ---
+with st.expander("🎲 Symulacja Monte Carlo (niepewność sprzedaży i ramp-upu)"):
+    st.markdown("""
+    Leady, konwersja, wartość kontraktu i efektywności ramp-upu są losowane z rozkładów trójkątnych
+    wokół wartości z panelu bocznego. Wyniki są agregowane strumieniowo, więc pamięć nie rośnie z liczbą losowań.
+    """)
+    st.caption(f"Losowania są liczone tym samym silnikiem co tabela wyników: {opis_silnika}.")
+    mc_col1, mc_col2, mc_col3 = st.columns(3)
+    mc_liczba_losowan = mc_col1.number_input("Liczba losowań", min_value=10_000, max_value=10_000_000, value=100_000, step=10_000)
+    mc_rozrzut = mc_col2.slider("Rozrzut parametrów (±%)", min_value=0.0, max_value=0.8, value=0.2, step=0.05, format="%.2f")
+    mc_seed = mc_col3.number_input("Ziarno losowania", min_value=0, value=42, step=1)
+
+    if st.button("🎲 Uruchom Monte Carlo"):
+        with st.spinner("Symulacja Monte Carlo..."):
+            mc_inputs = {**default_inputs, **inputs}
+            mc_wyniki = run_monte_carlo(mc_inputs, default_distributions(mc_inputs, mc_rozrzut),
+                                        int(mc_liczba_losowan), rozmiar_paczki=rozmiar_paczki_analiz, seed=int(mc_seed),
+                                        krok_kohortowy=krok_analiz)
+
+        st.caption(f"Liczba losowań: {mc_wyniki['liczba_losowan']:,}")
+        etykiety_percentyli = [f"P{p}" for p in mc_wyniki['percentyle']]
+        for tytul, klucz in [("EBIT roczny", 'ebit_percentyle'), ("Skumulowany przepływ pieniężny", 'przeplyw_percentyle')]:
+            fan_df = pd.DataFrame(mc_wyniki[klucz].T, columns=etykiety_percentyli)
+            fan_df["Rok"] = mc_wyniki['Rok']
+            baza = alt.Chart(fan_df, title=f"{tytul} (PLN) - wykres wachlarzowy").encode(x=alt.X("Rok:O"))
+            wykres = (
+                baza.mark_area(opacity=0.2).encode(y=alt.Y(f"{etykiety_percentyli[0]}:Q", title="PLN"), y2=f"{etykiety_percentyli[-1]}:Q")
+                + baza.mark_area(opacity=0.4).encode(y=f"{etykiety_percentyli[1]}:Q", y2=f"{etykiety_percentyli[-2]}:Q")
+                + baza.mark_line().encode(y=f"{etykiety_percentyli[len(etykiety_percentyli) // 2]}:Q")
+            )
+            st.altair_chart(wykres, use_container_width=True)
+
+        st.dataframe(pd.DataFrame({
+            "Rok": mc_wyniki['Rok'],
+            "P(zwrot do roku N)": mc_wyniki['prawdopodobienstwo_zwrotu'],
+            "P(marża ≥ cel)": mc_wyniki['prawdopodobienstwo_celu_marzy'],
+        }).set_index("Rok"), use_container_width=True)
+
+# --- Symulacja Agentowa ---
+with st.expander("👥 Symulacja agentowa (rotacja, opóźnienia zatrudnień, awanse)"):
+    st.markdown("""
+    Każdy planowany konsultant jest symulowany osobno: zatrudnienie następuje z losowym opóźnieniem,
+    awanse R1 → R2 → Full mają losowy termin, konsultant może odejść z firmy (stała roczna rotacja),
+    a jego utylizacja billable ma indywidualny szum. Tabela pokazuje średnie wyniki roczne z replikacji.
+    """)
+    ag_col1, ag_col2, ag_col3 = st.columns(3)
+    ag_replikacje = ag_col1.number_input("Liczba replikacji", min_value=10, max_value=10_000, value=1_000, step=100)
+    ag_rotacja = ag_col2.slider("Rotacja roczna", min_value=0.0, max_value=0.5, value=0.10, step=0.01, format="%.2f")
+    ag_opoznienie = ag_col3.slider("Średnie opóźnienie zatrudnienia (mies.)", min_value=0.0, max_value=12.0, value=2.0, step=0.5)
+    ag_col4, ag_col5, ag_col6 = st.columns(3)
+    ag_rozrzut = ag_col4.slider("Rozrzut terminu awansu (± mies.)", min_value=0.0, max_value=6.0, value=2.0, step=0.5)
+    ag_szum = ag_col5.slider("Szum utylizacji (odch. std.)", min_value=0.0, max_value=0.5, value=0.10, step=0.01, format="%.2f")
+    ag_seed = ag_col6.number_input("Ziarno losowania", min_value=0, value=42, step=1, key="ag_seed")
+
+    if st.button("👥 Uruchom symulację agentową"):
+        with st.spinner("Symulacja agentowa..."):
+            ag_wyniki = run_agent_simulation(
+                {**default_inputs, **inputs}, int(ag_replikacje), rotacja_roczna=ag_rotacja,
+                opoznienie_zatrudnienia_mies=ag_opoznienie, rozrzut_awansu_mies=ag_rozrzut,
+                szum_utylizacji=ag_szum, seed=int(ag_seed))
+        # W stanie sesji, aby stronicowanie tabeli (ponowne uruchomienie skryptu) nie ukrywało wyników
+        st.session_state['ag_wyniki'] = ag_wyniki
+
+    if 'ag_wyniki' in st.session_state:
+        ag_wyniki = st.session_state['ag_wyniki']
+        ag_df = pd.DataFrame({"Rok": ag_wyniki['Rok'], **ag_wyniki['srednie'], "Odejścia (średnio)": ag_wyniki['odejscia']})
+        show_table(ag_df, FORMATY_ROCZNE, klucz="agenci", hide_index=True)
+        ag_col1, ag_col2 = st.columns(2)
+        ag_col1.metric("Średni skumulowany EBIT", f"{ag_wyniki['skumulowany_ebit_5lat'].mean():,.0f} PLN")
+        ag_col2.metric("P(zwrot w horyzoncie)", f"{(ag_wyniki['rok_zwrotu'] > 0).mean():.1%}")
+
+        etykiety_percentyli = [f"P{p}" for p in ag_wyniki['percentyle']['percentyle']]
+        fan_df = pd.DataFrame(ag_wyniki['percentyle']['przeplyw'].T, columns=etykiety_percentyli)
+        fan_df["Rok"] = ag_wyniki['Rok']
+        baza = alt.Chart(fan_df, title="Skumulowany przepływ pieniężny (PLN) - wykres wachlarzowy").encode(x=alt.X("Rok:O"))
+        st.altair_chart(
+            baza.mark_area(opacity=0.3).encode(y=alt.Y(f"{etykiety_percentyli[0]}:Q", title="PLN"), y2=f"{etykiety_percentyli[-1]}:Q")
+            + baza.mark_line().encode(y=f"{etykiety_percentyli[len(etykiety_percentyli) // 2]}:Q"),
+            use_container_width=True)
+
+# --- Portfel Praktyk ---
+with st.expander("🏢 Portfel praktyk i biur (konsolidacja)"):
+    st.markdown("""
+    Wczytaj plik CSV z jednostkami (praktykami, biurami): jeden wiersz na jednostkę, kolumna `id` to nazwa,
+    opcjonalna kolumna `grupa` służy do agregacji, a pozostałe kolumny to parametry modelu. Brakujące parametry
+    biorą wartości z panelu bocznego. Po zmianie pliku przeliczane są tylko jednostki o zmienionych parametrach.
+    """)
+    pf_plik = st.file_uploader("Plik jednostek (CSV)", type=["csv"])
+    pf_col1, pf_col2 = st.columns(2)
+    pf_narzut = pf_col1.number_input("Wspólny narzut korporacyjny rocznie (PLN)", min_value=0.0, value=0.0, step=100_000.0, format="%.0f")
+    pf_klucz = pf_col2.selectbox("Klucz alokacji narzutu", list(KLUCZE_ALOKACJI),
+                                 format_func={'konsultanci': "Liczba konsultantów", 'przychod': "Przychód", 'rowno': "Po równo"}.get)
+
+    if pf_plik is not None:
+        # Portfel w stanie sesji - wyniki niezmienionych jednostek przetrwają kolejne uruchomienia skryptu
+        portfel = st.session_state.get('portfel')
+        if portfel is None or portfel.horyzont_lat != inputs['model_horyzont_analizy_lata']:
+            portfel = st.session_state['portfel'] = Portfolio(inputs['model_horyzont_analizy_lata'])
+        try:
+            jednostki = read_units(io.StringIO(pf_plik.getvalue().decode('utf-8-sig')))
+        except (ValueError, KeyError) as blad:
+            st.error(f"Nie udało się wczytać jednostek: {blad}")
+        else:
+            # % czasu na sprzedaż jest wyliczany dla każdej jednostki z jej własnych udziałów czasu
+            pf_baza = {k: v for k, v in inputs.items() if k != 'konsultant_procent_czasu_sprzedaz_docelowy'}
+            portfel.replace_units([(nazwa, grupa, {**pf_baza, **parametry}) for nazwa, grupa, parametry in jednostki])
+            portfel.set_overhead(pf_narzut, pf_klucz)
+            portfel.evaluate()
+            st.caption(f"Jednostki: {len(portfel):,} | przeliczone teraz: {portfel.przeliczone_ostatnio:,} | "
+                       f"przeliczone od początku sesji: {portfel.przeliczone_lacznie:,}")
+
+            pf_calosc = portfel.rollup(po_grupach=False)
+            pf_df, pf_roi = scenario_results(pf_calosc, 0)
+            pf_col1, pf_col2, pf_col3 = st.columns(3)
+            pf_col1.metric("Skonsolidowany EBIT", f"{pf_roi['skumulowany_ebit_5lat']:,.0f} PLN")
+            pf_col2.metric(f"Marża w roku {portfel.horyzont_lat}", f"{pf_df['MARŻA OPERACYJNA (%)'].iloc[-1]:.2f}%")
+            pf_col3.metric("Okres Zwrotu", pf_roi['payback_period_display'])
+            pf_kolumny_wykresu = ['ZYSK / STRATA OPERACYJNA (EBIT)', 'Skumulowany przepływ pieniężny']
+            st.line_chart(chart_rows(pf_df, pf_kolumny_wykresu), x='Rok', y=pf_kolumny_wykresu)
+
+            def podsumowanie_portfela(wyniki):
+                return pd.DataFrame({
+                    "Skumulowany EBIT": wyniki['skumulowany_ebit_5lat'],
+                    "Marża (ostatni rok, %)": wyniki["MARŻA OPERACYJNA (%)"][:, -1],
+                    "Narzut wspólny (suma)": wyniki[KOLUMNA_NARZUT].sum(axis=1),
+                    "Rok zwrotu": np.where(wyniki['rok_zwrotu'] > 0, wyniki['rok_zwrotu'], np.nan),
+                }, index=pd.Index(wyniki['etykiety'], name="Jednostka"))
+
+            pf_formaty = {"Skumulowany EBIT": ("Skumulowany EBIT (PLN)", FORMAT_PLN), "Marża (ostatni rok, %)": (None, FORMAT_PROCENT),
+                          "Narzut wspólny (suma)": ("Narzut wspólny (suma, PLN)", FORMAT_PLN), "Rok zwrotu": (None, "%d")}
+
+            st.markdown("**Grupy**")
+            pf_grupy = portfel.rollup()
+            show_table(podsumowanie_portfela(pf_grupy), pf_formaty, klucz="portfel_grupy")
+            pf_grupa = st.selectbox("Jednostki w grupie", pf_grupy['etykiety'])
+            pf_jednostki = portfel.unit_results(pf_grupa)
+            show_table(podsumowanie_portfela(pf_jednostki), pf_formaty, klucz="portfel_jednostki")
+            pf_jednostka = st.selectbox("Wyniki roczne jednostki", range(len(pf_jednostki['etykiety'])),
+                                        format_func=lambda i: pf_jednostki['etykiety'][i])
+            show_table(scenario_results(pf_jednostki, pf_jednostka)[0], FORMATY_ROCZNE, klucz="portfel_jednostka", hide_index=True)
+
+# --- Analiza Wrażliwości ---
+with st.expander("🌪️ Analiza wrażliwości (tornado i mapa ciepła)"):
+    sens_inputs = {**default_inputs, **inputs}
+    sens_parametry = numeric_parameters(sens_inputs)
+
+    st.caption(f"Warianty parametrów są liczone tym samym silnikiem co tabela wyników: {opis_silnika}.")
+    st.markdown("**Wykres tornado** - wpływ zmiany każdego parametru na skumulowany EBIT (rekrutacja: ±1 osoba).")
+    sens_delta = st.slider("Zmiana parametru (±%)", min_value=0.01, max_value=0.5, value=0.1, step=0.01, format="%.2f")
+    if st.button("🌪️ Policz tornado"):
+        sens_tornado = tornado(sens_inputs, sens_delta, krok_kohortowy=krok_analiz)
+        tornado_df = pd.DataFrame({
+            "Parametr": sens_tornado['parametr'],
+            "EBIT (niska wartość)": sens_tornado['ebit_niski'],
+            "EBIT (wysoka wartość)": sens_tornado['ebit_wysoki'],
+            "ROI (niska wartość)": sens_tornado['roi_niskie'],
+            "ROI (wysoka wartość)": sens_tornado['roi_wysokie'],
+        })
+        wykres_tornado = alt.Chart(tornado_df, title="Skumulowany EBIT (PLN)").mark_bar().encode(
+            x=alt.X("EBIT (niska wartość):Q", title="PLN"), x2="EBIT (wysoka wartość):Q",
+            y=alt.Y("Parametr:N", sort=None),
+        ) + alt.Chart(pd.DataFrame({"EBIT bazowy": [sens_tornado['ebit_bazowy']]})).mark_rule(color="red").encode(x="EBIT bazowy:Q")
+        st.altair_chart(wykres_tornado, use_container_width=True)
+        st.dataframe(tornado_df.set_index("Parametr"), use_container_width=True)
+
+    st.markdown("**Mapa ciepła** - gęsta siatka wartości dwóch parametrów.")
+    heat_col1, heat_col2 = st.columns(2)
+    heat_x = heat_col1.selectbox("Parametr osi X", sens_parametry, index=sens_parametry.index('konsultant_stawka_billable_godz'))
+    heat_y = heat_col2.selectbox("Parametr osi Y", sens_parametry, index=sens_parametry.index('konsultant_procent_czasu_billable_docelowy'))
+    heat_zakres = heat_col1.slider("Zakres zmian (±%)", min_value=0.05, max_value=0.9, value=0.5, step=0.05, format="%.2f")
+    heat_rozdzielczosc = heat_col2.slider("Rozdzielczość siatki (punkty na oś)", min_value=10, max_value=500, value=200, step=10)
+    heat_wynik = st.radio("Wynik", ["Skumulowany EBIT", "ROI"], horizontal=True)
+
+    if st.button("🗺️ Policz mapę ciepła"):
+        if heat_x == heat_y:
+            st.warning("Wybierz dwa różne parametry.")
+        else:
+            def zakres_parametru(klucz):
+                wartosc = float(sens_inputs[klucz])
+                dol, gora = wartosc * (1 - heat_zakres), wartosc * (1 + heat_zakres)
+                if klucz in PARAMETRY_UDZIALOWE:
+                    gora = min(gora, 1.0)
+                return np.linspace(dol, gora, heat_rozdzielczosc)
+
+            with st.spinner("Liczenie siatki..."):
+                siatka = sweep_2d(sens_inputs, heat_x, zakres_parametru(heat_x), heat_y, zakres_parametru(heat_y),
+                                  rozmiar_paczki=2 * rozmiar_paczki_analiz, krok_kohortowy=krok_analiz)
+            wartosci = siatka['skumulowany_ebit_5lat' if heat_wynik == "Skumulowany EBIT" else 'roi']
+            # Do wyświetlenia co k-ty punkt, aby wykres miał najwyżej ~100x100 komórek
+            krok = max(1, heat_rozdzielczosc // 100)
+            xs, ys = np.meshgrid(siatka['x'][::krok], siatka['y'][::krok])
+            heat_df = pd.DataFrame({heat_x: xs.ravel(), heat_y: ys.ravel(), heat_wynik: wartosci[::krok, ::krok].ravel()})
+            st.altair_chart(alt.Chart(heat_df).mark_rect().encode(
+                x=alt.X(f"{heat_x}:O", axis=alt.Axis(format=".3~g")), y=alt.Y(f"{heat_y}:O", sort="descending", axis=alt.Axis(format=".3~g")),
+                color=alt.Color(f"{heat_wynik}:Q", scale=alt.Scale(scheme="redyellowgreen")),
+            ), use_container_width=True)
+
+# --- Elastyczności (Pochodne Analityczne) ---
+with st.expander("📐 Elastyczności wyników względem parametrów"):
+    st.markdown("""
+    Elastyczność = o ile % zmieni się wynik w ostatnim roku horyzontu przy zmianie parametru o 1%.
+    Liczone dokładnie z pochodnych analitycznych modelu rocznego w jednym przejściu (bez dodatkowych uruchomień).
+    """)
+    if uzyj_silnika_kohortowego:
+        # Pochodne analityczne są wyprowadzone tylko dla modelu rocznego
+        st.warning(f"Elastyczności dotyczą modelu rocznego, a tabela wyników pochodzi z: {opis_silnika}. "
+                   "Ustawienia lejka, ramp-upu i kroku miesięcznego nie są tu uwzględnione.")
+    if st.toggle("Pokaż elastyczności", key="elastycznosci"):
+        elastycznosci_df = elasticities_table({**default_inputs, **inputs})
+        st.dataframe(elastycznosci_df.style.format("{:.3f}", na_rep="–"), use_container_width=True)
+
+# --- Optymalizacja Planu Rekrutacji ---
+with st.expander("🎯 Optymalizacja planu rekrutacji względem celów firmy"):
+    st.markdown("""
+    Szuka najtańszego planu rekrutacji (0-10 osób rocznie), który w wybranym roku osiąga docelową marżę
+    operacyjną i docelowy obrót, oraz frontu Pareto: skumulowany EBIT względem kosztów rekrutacji.
+    """)
+    opt_inputs = {**default_inputs, **inputs}
+    opt_col1, opt_col2, opt_col3 = st.columns(3)
+    opt_inputs['cel_marza_operacyjna'] = opt_col1.slider(
+        "Docelowa marża operacyjna", min_value=0.0, max_value=0.6, value=default_inputs['cel_marza_operacyjna'], step=0.01, format="%.2f")
+    opt_inputs['cel_obrot_roczny_aspiracja'] = opt_col2.number_input(
+        "Docelowy obrót roczny (PLN)", min_value=0.0, max_value=1e9, value=default_inputs['cel_obrot_roczny_aspiracja'], step=1e6, format="%.0f")
+    opt_rok = opt_col3.number_input("Rok osiągnięcia celów", min_value=1, max_value=int(opt_inputs['model_horyzont_analizy_lata']),
+                                    value=int(opt_inputs['model_horyzont_analizy_lata']), step=1)
+    opt_billable = st.checkbox("Przeszukuj także % czasu billable (0.30-0.80)")
+
+    if st.button("🎯 Znajdź plan rekrutacji"):
+        with st.spinner("Przeszukiwanie planów rekrutacji..."):
+            optymalizacja = optimize_recruitment_plan(
+                opt_inputs, int(opt_rok), procenty_billable=np.round(np.arange(0.30, 0.801, 0.05), 2) if opt_billable else None)
+
+        najtanszy = optymalizacja['najtanszy_plan']
+        if najtanszy is None:
+            st.warning("Żaden plan rekrutacji (do 10 osób rocznie) nie osiąga celów w wybranym roku.")
+        else:
+            st.success(f"Najtańszy plan: {najtanszy['plan']} (koszt rekrutacji {najtanszy['koszt_rekrutacji']:,.0f} PLN, "
+                       f"% billable {najtanszy['konsultant_procent_czasu_billable_docelowy']:.2f}, "
+                       f"skumulowany EBIT {najtanszy['skumulowany_ebit']:,.0f} PLN)")
+            front_df = pd.DataFrame(optymalizacja['front_pareto'])
+            front_df["plan"] = front_df["plan"].astype(str)
+            st.altair_chart(alt.Chart(front_df, title="Front Pareto: skumulowany EBIT vs koszt rekrutacji").mark_line(point=True).encode(
+                x=alt.X("koszt_rekrutacji:Q", title="Koszt rekrutacji (PLN)"),
+                y=alt.Y("skumulowany_ebit:Q", title="Skumulowany EBIT (PLN)"),
+                tooltip=["plan", "konsultant_procent_czasu_billable_docelowy", "koszt_rekrutacji", "skumulowany_ebit"],
+            ), use_container_width=True)
+            st.dataframe(front_df, use_container_width=True)
+        st.caption(f"Odwiedzone węzły przeszukiwania: {optymalizacja['odwiedzone_wezly']:,}")
 
 # --- Instrukcja Użycia ---
 with st.expander("📜 Instrukcja Uruchomienia i Użycia"):
@@ -393,6 +592,19 @@ with st.expander("📜 Instrukcja Uruchomienia i Użycia"):
         *   Kluczowe wskaźniki ROI i okres zwrotu.
         *   Wykresy ilustrujące dynamikę EBIT, skumulowanych przepływów, struktury przychodów oraz liczby konsultantów.
         *   Tabela ze szczegółowymi rocznymi kalkulacjami dla typów konsultantów (R1, R2, Full).
+    *   **Horyzont i krok symulacji:** W sekcji "Model" możesz wydłużyć horyzont do 30 lat i przełączyć symulację na krok miesięczny. Krok miesięczny, inna długość ramp-upu, cykl sprzedaży różny od 12 miesięcy, rozrzut cyklu lub realizacja kontraktu dłuższa niż rok są liczone silnikiem kohortowym.
+    *   **Lejek kontraktów:** Leady podpisują kontrakty po cyklu sprzedaży (z opcjonalnym rozrzutem ± miesiące), a wartość kontraktu jest rozpoznawana równomiernie przez okres realizacji zamiast jednorazowo.
+    *   **Monte Carlo:** Sekcja "🎲 Symulacja Monte Carlo" losuje niepewne parametry sprzedaży i ramp-upu, pokazując percentyle EBIT i skumulowanego przepływu oraz prawdopodobieństwo zwrotu i osiągnięcia docelowej marży.
+    *   **Analiza wrażliwości:** Wykres tornado pokazuje, które parametry najmocniej zmieniają skumulowany EBIT, a mapa ciepła - łączny wpływ dwóch wybranych parametrów.
+    *   **Elastyczności:** Tabela pokazuje, o ile procent zmieni się EBIT, marża, skumulowany przepływ i ROI w ostatnim roku przy zmianie danego parametru o 1%.
+    *   **Optymalizacja rekrutacji:** Wskaż docelową marżę, obrót i rok, a model znajdzie najtańszy plan rekrutacji spełniający cele oraz front Pareto EBIT względem kosztów rekrutacji.
+    *   **Pamięć podręczna:** Wyniki dla już policzonych zestawów parametrów są brane z pamięci podręcznej (liczniki trafień w sekcji "🗄️ Pamięć podręczna wyników"). Ustaw `PSMODEL_CACHE_DIR`, aby wyniki przetrwały restart aplikacji i były współdzielone między procesami.
+    *   **Magazyn scenariuszy:** Po zaznaczeniu "💾 Zapisuj uruchomienia" każde uruchomienie modelu jest dopisywane do magazynu na dysku (katalog z `PSMODEL_STORE_DIR`, domyślnie `scenariusze`). Sekcja "🗃️ Magazyn zapisanych scenariuszy" pokazuje najlepsze zapisane scenariusze wg ROI, roku zwrotu lub EBIT, z informacją, którym silnikiem i krokiem symulacji zostały policzone.
+    *   **Symulacja agentowa:** Sekcja "👥 Symulacja agentowa" symuluje każdego konsultanta osobno (rotacja, opóźnienia zatrudnień, losowe terminy awansów, indywidualna utylizacja) w wielu replikacjach i pokazuje średnie wyniki roczne oraz rozrzut skumulowanego przepływu.
+    *   **Portfel:** Sekcja "🏢 Portfel praktyk i biur" liczy wiele jednostek z pliku CSV naraz, rozdziela wspólny narzut korporacyjny według wybranego klucza i pokazuje wyniki skonsolidowane, grupy oraz pojedyncze jednostki.
+    *   **Wydajność:** Po zaznaczeniu "⏱️ Mierz czas etapów" sekcja "⏱️ Wydajność bieżącego uruchomienia" pokazuje czas metryk, symulacji, budowy tabel, formatowania i renderowania. Pełny zestaw pomiarów (import, opóźnienie, przepustowość wsadu, pamięć) uruchomisz poleceniem `python -m psmodel.bench`; opcje `--zapisz-baze` i `--porownaj` zapisują bazę i wykrywają regresje.
+    *   **Duże tabele:** Tabele wyników pozostają liczbowe (sortowanie po kliknięciu nagłówka działa na liczbach). Tabele dłuższe niż 500 wierszy są dzielone na strony z sortowaniem całej tabeli, a długie serie na wykresach (np. krok miesięczny) są próbkowane z zachowaniem minimów i maksimów.
+    *   **Tryb bez interfejsu:** Model jest dostępny jako pakiet `psmodel` bez zależności od Streamlit. Scenariusze z pliku CSV lub JSON lines policzysz poleceniem `python -m psmodel scenariusze.csv -o wyniki.jsonl` (opcja `--roczne` dołącza wyniki roczne). Inne narzędzia mogą korzystać z lokalnej usługi HTTP: `python -m psmodel.service serwuj` (`POST /model`, `POST /scenariusze`, `GET /metryki`).
     *   **Eksperymentowanie:** Zachęcam do eksperymentowania z różnymi wartościami parametrów, aby zrozumieć ich wpływ na rentowność i rozwój firmy.
 
     """)
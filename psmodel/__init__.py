@@ -0,0 +1,28 @@
+"""Silniki obliczeniowe modelu biznesowego firmy konsultingowej (bez zależności od Streamlit).
+
+Import pakietu jest lekki: funkcje poniżej są ładowane z modułów dopiero przy
+pierwszym użyciu, więc NumPy i pandas nie są importowane bez potrzeby.
+"""
+
+_EKSPORTY = {
+    'get_default_inputs': 'psmodel.model',
+    'complete_inputs': 'psmodel.model',
+    'calculate_consultant_annual_metrics': 'psmodel.model',
+    'run_financial_model': 'psmodel.model',
+    'run_financial_model_records': 'psmodel.model',
+    'run_financial_model_batch': 'psmodel.batch',
+    'run_cohort_model': 'psmodel.cohort',
+    'run_agent_simulation': 'psmodel.agents',
+    'Portfolio': 'psmodel.portfolio',
+}
+
+__all__ = list(_EKSPORTY)
+
+
+def __getattr__(nazwa):
+    if nazwa not in _EKSPORTY:
+        raise AttributeError(f"module 'psmodel' has no attribute {nazwa!r}")
+    import importlib
+    wartosc = getattr(importlib.import_module(_EKSPORTY[nazwa]), nazwa)
+    globals()[nazwa] = wartosc
+    return wartosc
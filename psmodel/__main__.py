@@ -0,0 +1,5 @@
+import sys
+
+from psmodel.cli import main
+
+sys.exit(main())
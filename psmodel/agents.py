@@ -0,0 +1,140 @@
+import numpy as np
+
+from psmodel.batch import KOLUMNY_ROCZNE, TYPY_KONSULTANTOW, calculate_consultant_annual_metrics_batch, input_columns, \
+    roi_summary_batch
+
+# --- Symulacja agentowa: każdy konsultant osobno ---
+#
+# Stan konsultantów trzymamy jako struktura tablic (replikacja, konsultant) w float32:
+# miesiąc rozpoczęcia pracy, miesiące awansu R1 -> R2 i R2 -> Full, miesiąc odejścia
+# i mnożnik utylizacji. Wszystkie zdarzenia losujemy z góry (opóźnienie zatrudnienia,
+# czasy etapów, czas do odejścia przy stałej intensywności rotacji), a wyniki roczne
+# to sumy części roku przepracowanych w każdym etapie - bez pętli po osobach.
+# Przy zerowej losowości wyniki pokrywają się z modelem rocznym (R1 przez rok, R2 przez rok, potem Full).
+
+MIESIACE_W_ROKU = 12.0
+
+
+def _stage_fraction(poczatek, koniec, rok):
+    # Część roku `rok` (liczonego od 0) przypadająca na przedział [poczatek, koniec)
+    return np.clip(np.minimum(koniec, (rok + 1) * MIESIACE_W_ROKU) - np.maximum(poczatek, rok * MIESIACE_W_ROKU),
+                   0.0, MIESIACE_W_ROKU) / MIESIACE_W_ROKU
+
+
+def _simulate_chunk(plan, metryki, parametry, n_replikacji, rng):
+    """Symuluje paczkę replikacji; zwraca wyniki roczne (replikacja, rok) dla kolumn zależnych od liczby osób."""
+    horyzont_lat = len(plan)
+    rok_planu = np.repeat(np.arange(horyzont_lat, dtype=np.float32), plan)  # jedno miejsce na każdą planowaną osobę
+    ksztalt = (n_replikacji, len(rok_planu))
+
+    # --- Stan agentów (struktura tablic) ---
+    start = rok_planu * np.float32(MIESIACE_W_ROKU)
+    if parametry['opoznienie_zatrudnienia_mies'] > 0:
+        start = start + rng.exponential(parametry['opoznienie_zatrudnienia_mies'], ksztalt).astype(np.float32)
+    else:
+        start = np.broadcast_to(start, ksztalt)
+
+    def czas_etapu():
+        czas = np.full(ksztalt, MIESIACE_W_ROKU, dtype=np.float32)
+        if parametry['rozrzut_awansu_mies'] > 0:
+            czas += rng.normal(0.0, parametry['rozrzut_awansu_mies'], ksztalt).astype(np.float32)
+        return np.maximum(czas, 1.0)
+
+    awans_r2 = start + czas_etapu()
+    awans_full = awans_r2 + czas_etapu()
+    if parametry['rotacja_roczna'] > 0:
+        # Stała intensywność odejść: P(odejście w ciągu roku) = rotacja_roczna
+        sredni_staz = -MIESIACE_W_ROKU / np.log1p(-parametry['rotacja_roczna'])
+        odejscie = start + rng.exponential(sredni_staz, ksztalt).astype(np.float32)
+    else:
+        odejscie = np.full(ksztalt, np.inf, dtype=np.float32)
+    if parametry['szum_utylizacji'] > 0:
+        utylizacja = np.maximum(rng.normal(1.0, parametry['szum_utylizacji'], ksztalt), 0.0).astype(np.float32)
+    else:
+        utylizacja = None
+
+    # Etapy ograniczone odejściem z firmy
+    granice = {"R1": (start, np.minimum(awans_r2, odejscie)),
+               "R2": (np.minimum(awans_r2, odejscie), np.minimum(awans_full, odejscie)),
+               "Full": (np.minimum(awans_full, odejscie), odejscie)}
+
+    wyniki = {k: np.zeros((n_replikacji, horyzont_lat)) for k in (
+        "Konsultanci R1 (koniec roku)", "Konsultanci R2 (koniec roku)", "Konsultanci Full (koniec roku)",
+        "Łączny Przychód z Godzin Billable", "Łącznie Kontrakty Pozyskane (szt.)", "osobolata", "odejscia")}
+    for rok in range(horyzont_lat):
+        koniec_roku = (rok + 1) * MIESIACE_W_ROKU
+        for typ in TYPY_KONSULTANTOW:
+            poczatek, koniec = granice[typ]
+            czesc = _stage_fraction(poczatek, koniec, rok)
+            wyniki[f"Konsultanci {typ} (koniec roku)"][:, rok] = ((poczatek < koniec_roku) & (koniec >= koniec_roku)).sum(axis=1)
+            czesc_billable = czesc if utylizacja is None else czesc * utylizacja
+            wyniki["Łączny Przychód z Godzin Billable"][:, rok] += \
+                czesc_billable.sum(axis=1, dtype=np.float64) * metryki[typ]['przychod_z_godzin_billable']
+            osobolata = czesc.sum(axis=1, dtype=np.float64)
+            wyniki["Łącznie Kontrakty Pozyskane (szt.)"][:, rok] += osobolata * metryki[typ]['liczba_pozyskanych_kontraktow']
+            wyniki["osobolata"][:, rok] += osobolata
+        wyniki["odejscia"][:, rok] = ((odejscie >= rok * MIESIACE_W_ROKU) & (odejscie < koniec_roku) &
+                                      (start < odejscie)).sum(axis=1)
+    return wyniki
+
+
+def run_agent_simulation(inputs_dict, liczba_replikacji=1000, rotacja_roczna=0.1, opoznienie_zatrudnienia_mies=2.0,
+                         rozrzut_awansu_mies=2.0, szum_utylizacji=0.1, rozmiar_paczki=50, seed=0,
+                         percentyle=(5, 50, 95)):
+    """Stochastyczna symulacja per konsultant z rotacją, opóźnieniami zatrudnień, awansami i szumem utylizacji.
+
+    Zwraca wyniki roczne każdej replikacji w formacie `run_financial_model_batch` (replikacja, rok),
+    słownik 'srednie' z wynikami uśrednionymi po replikacjach, 'percentyle' skumulowanego przepływu
+    i EBIT oraz 'odejscia' (średnia liczba odejść w roku).
+    """
+    kolumny = input_columns([inputs_dict])
+    horyzont_lat = int(kolumny['model_horyzont_analizy_lata'][0])
+    plan = np.array([int(inputs_dict.get(f'rekrutacja_rok{n}_nowi', 0)) for n in range(1, horyzont_lat + 1)])
+    metryki = {typ: {k: float(v[0]) for k, v in m.items()} for typ, m in calculate_consultant_annual_metrics_batch(kolumny).items()}
+    parametry = {'rotacja_roczna': rotacja_roczna, 'opoznienie_zatrudnienia_mies': opoznienie_zatrudnienia_mies,
+                 'rozrzut_awansu_mies': rozrzut_awansu_mies, 'szum_utylizacji': szum_utylizacji}
+    if not 0 <= rotacja_roczna < 1:
+        raise ValueError("Rotacja roczna musi mieścić się w przedziale [0, 1).")
+
+    rozmiary = [min(rozmiar_paczki, liczba_replikacji - s) for s in range(0, liczba_replikacji, rozmiar_paczki)]
+    ziarna = np.random.SeedSequence(seed).spawn(len(rozmiary))
+    czesci = [_simulate_chunk(plan, metryki, parametry, n, np.random.default_rng(z)) for n, z in zip(rozmiary, ziarna)]
+    wyniki = {k: np.concatenate([c[k] for c in czesci]) for k in czesci[0]}
+
+    # --- Wyniki finansowe z wyników per osoba (jak w modelu rocznym) ---
+    wyniki["Łączna Liczba Konsultantów (koniec roku)"] = wyniki["Konsultanci R1 (koniec roku)"] + \
+        wyniki["Konsultanci R2 (koniec roku)"] + wyniki["Konsultanci Full (koniec roku)"]
+    kontrakty_poprzedni_rok = np.zeros_like(wyniki["Łącznie Kontrakty Pozyskane (szt.)"])
+    kontrakty_poprzedni_rok[:, 1:] = wyniki["Łącznie Kontrakty Pozyskane (szt.)"][:, :-1]
+    wyniki["Przychód z Kontraktów (z opóźnieniem)"] = kontrakty_poprzedni_rok * inputs_dict['sprzedaz_srednia_wartosc_kontraktu']
+    wyniki["CAŁKOWITY PRZYCHÓD FIRMY"] = wyniki["Łączny Przychód z Godzin Billable"] + wyniki["Przychód z Kontraktów (z opóźnieniem)"]
+    # Wynagrodzenie i overhead za przepracowaną część roku; koszt rekrutacji w roku z planu
+    osobolata = wyniki.pop("osobolata")
+    wyniki["Wynagrodzenia"] = osobolata * inputs_dict['konsultant_wynagrodzenie_roczne']
+    wyniki["Overhead"] = osobolata * inputs_dict['korporacyjne_overhead_roczny_na_konsultanta']
+    wyniki["Koszty Rekrutacji"] = np.broadcast_to(plan * float(inputs_dict['korporacyjne_koszt_rekrutacji_konsultanta']),
+                                                  osobolata.shape).copy()
+    wyniki["Łączne Koszty Operacyjne"] = wyniki["Wynagrodzenia"] + wyniki["Overhead"] + wyniki["Koszty Rekrutacji"]
+    ebit = wyniki["CAŁKOWITY PRZYCHÓD FIRMY"] - wyniki["Łączne Koszty Operacyjne"]
+    przychod = wyniki["CAŁKOWITY PRZYCHÓD FIRMY"]
+    wyniki["ZYSK / STRATA OPERACYJNA (EBIT)"] = ebit
+    wyniki["MARŻA OPERACYJNA (%)"] = np.divide(ebit, przychod, out=np.zeros_like(ebit), where=przychod != 0) * 100
+    wyniki["Skumulowany przepływ pieniężny"] = np.cumsum(ebit, axis=1)
+    odejscia = wyniki.pop("odejscia")
+    wyniki = {k: wyniki[k] for k in KOLUMNY_ROCZNE}
+    wyniki["Rok"] = np.arange(1, horyzont_lat + 1)
+    wyniki.update(roi_summary_batch(wyniki))
+
+    wyniki['srednie'] = {k: wyniki[k].mean(axis=0) for k in KOLUMNY_ROCZNE}
+    # Marża średnia liczona ze średnich EBIT i przychodu, a nie jako średnia marż
+    sredni_przychod = wyniki['srednie']["CAŁKOWITY PRZYCHÓD FIRMY"]
+    wyniki['srednie']["MARŻA OPERACYJNA (%)"] = np.divide(
+        wyniki['srednie']["ZYSK / STRATA OPERACYJNA (EBIT)"], sredni_przychod,
+        out=np.zeros_like(sredni_przychod), where=sredni_przychod != 0) * 100
+    wyniki['percentyle'] = {
+        'percentyle': list(percentyle),
+        'ebit': np.percentile(ebit, percentyle, axis=0),
+        'przeplyw': np.percentile(wyniki["Skumulowany przepływ pieniężny"], percentyle, axis=0),
+    }
+    wyniki['odejscia'] = odejscia.mean(axis=0)
+    return wyniki
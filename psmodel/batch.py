@@ -0,0 +1,268 @@
+import numpy as np
+
+from psmodel.model import WZOR_REKRUTACJI, payback_period_text
+from psmodel.timing import stage, timed
+
+# --- Wsadowy (zwektoryzowany) silnik modelu finansowego ---
+#
+# Odpowiednik `run_financial_model` z psmodel.model liczący N scenariuszy naraz.
+# Wszystkie wyniki roczne są tablicami NumPy o kształcie (scenariusz, rok),
+# a kolejność działań odpowiada ścieżce skalarnej, dzięki czemu liczby są identyczne.
+
+TYPY_KONSULTANTOW = ("R1", "R2", "Full")
+
+KOLUMNY_ROCZNE = (
+    "Konsultanci R1 (koniec roku)",
+    "Konsultanci R2 (koniec roku)",
+    "Konsultanci Full (koniec roku)",
+    "Łączna Liczba Konsultantów (koniec roku)",
+    "Łączny Przychód z Godzin Billable",
+    "Łącznie Kontrakty Pozyskane (szt.)",
+    "Przychód z Kontraktów (z opóźnieniem)",
+    "CAŁKOWITY PRZYCHÓD FIRMY",
+    "Wynagrodzenia",
+    "Overhead",
+    "Koszty Rekrutacji",
+    "Łączne Koszty Operacyjne",
+    "ZYSK / STRATA OPERACYJNA (EBIT)",
+    "MARŻA OPERACYJNA (%)",
+    "Skumulowany przepływ pieniężny",
+)
+
+# Parametry będące udziałami/prawdopodobieństwami - wartości zmieniane poza modelem obcinamy do [0, 1]
+PARAMETRY_UDZIALOWE = {
+    'konsultant_procent_czasu_rozwoj_admin',
+    'konsultant_procent_czasu_billable_docelowy',
+    'konsultant_procent_czasu_utrzymanie_projektow',
+    'rampup_efektywnosc_billable_rok1',
+    'rampup_efektywnosc_billable_rok2',
+    'rampup_efektywnosc_sprzedaz_rok1',
+    'rampup_efektywnosc_sprzedaz_rok2',
+    'sprzedaz_wspolczynnik_konwersji',
+    'cel_marza_operacyjna',
+}
+
+
+def _row_columns(wiersze):
+    """Buduje kolumny z listy słowników o (być może) różnych kluczach.
+
+    Kolumny powstają z sumy kluczy wszystkich wierszy. Brakujące lata planu rekrutacji
+    oznaczają 0 nowych osób, a brakujący % czasu na sprzedaż jest wyliczany dla danego
+    wiersza; brak innego parametru jest błędem danych wejściowych.
+    """
+    klucze = dict.fromkeys(k for w in wiersze for k in w)
+    kolumny = {}
+    for k in klucze:
+        if WZOR_REKRUTACJI.match(k):
+            kolumny[k] = np.fromiter((w.get(k, 0.0) for w in wiersze), dtype=np.float64, count=len(wiersze))
+            continue
+        if k == 'konsultant_procent_czasu_sprzedaz_docelowy':
+            kolumny[k] = np.fromiter((w.get(k, np.nan) for w in wiersze), dtype=np.float64, count=len(wiersze))
+            continue
+        brak = next((i for i, w in enumerate(wiersze, start=1) if k not in w), None)
+        if brak is not None:
+            raise ValueError(f"Scenariusz {brak}: brak parametru {k}.")
+        kolumny[k] = np.fromiter((w[k] for w in wiersze), dtype=np.float64, count=len(wiersze))
+
+    sprzedaz = kolumny.get('konsultant_procent_czasu_sprzedaz_docelowy')
+    if sprzedaz is not None and np.isnan(sprzedaz).any():
+        brakujace = np.isnan(sprzedaz)
+        sprzedaz[brakujace] = np.maximum(
+            0, 1.0 - kolumny['konsultant_procent_czasu_rozwoj_admin'][brakujace] -
+            kolumny['konsultant_procent_czasu_billable_docelowy'][brakujace] -
+            kolumny['konsultant_procent_czasu_utrzymanie_projektow'][brakujace])
+    return kolumny
+
+
+def input_columns(tabela):
+    """Zamienia tabelę scenariuszy (lista słowników, słownik kolumn lub DataFrame) na słownik tablic float64."""
+    if hasattr(tabela, "columns") and hasattr(tabela, "to_numpy"):  # pandas.DataFrame
+        kolumny = {k: tabela[k].to_numpy(dtype=np.float64) for k in tabela.columns}
+    elif isinstance(tabela, dict):
+        kolumny = {k: np.asarray(v, dtype=np.float64).reshape(-1) for k, v in tabela.items()}
+    else:
+        wiersze = list(tabela)
+        if not wiersze:
+            raise ValueError("Tabela scenariuszy jest pusta.")
+        kolumny = _row_columns(wiersze)
+
+    # Skalary (kolumny długości 1) traktujemy jako wartość wspólną dla wszystkich scenariuszy
+    n = max(len(v) for v in kolumny.values())
+    if any(len(v) not in (1, n) for v in kolumny.values()):
+        raise ValueError("Wszystkie kolumny tabeli scenariuszy muszą mieć tę samą długość.")
+    kolumny = {k: np.broadcast_to(v, (n,)) for k, v in kolumny.items()}
+
+    if 'konsultant_procent_czasu_sprzedaz_docelowy' not in kolumny:
+        # Parametr obliczany tak samo jak w panelu bocznym aplikacji
+        kolumny['konsultant_procent_czasu_sprzedaz_docelowy'] = np.maximum(
+            0, 1.0 - kolumny['konsultant_procent_czasu_rozwoj_admin'] -
+            kolumny['konsultant_procent_czasu_billable_docelowy'] -
+            kolumny['konsultant_procent_czasu_utrzymanie_projektow'])
+    return kolumny
+
+
+@timed('metryki')
+def calculate_consultant_annual_metrics_batch(kolumny):
+    """Oblicza roczne metryki dla każdego typu konsultanta (R1, R2, Full) dla wszystkich scenariuszy naraz."""
+    metrics = {}
+    godziny_pracy_rocznie_global = kolumny['konsultant_godziny_pracy_miesiac'] * 12
+    zera = np.zeros_like(godziny_pracy_rocznie_global)
+
+    for typ in TYPY_KONSULTANTOW:
+        m = {}
+        m['godziny_pracy_rocznie'] = godziny_pracy_rocznie_global
+        m['godziny_na_rozwoj_admin'] = m['godziny_pracy_rocznie'] * kolumny['konsultant_procent_czasu_rozwoj_admin']
+
+        if typ == "R1":
+            efektywnosc_billable = kolumny['rampup_efektywnosc_billable_rok1']
+            efektywnosc_sprzedaz = kolumny['rampup_efektywnosc_sprzedaz_rok1']
+            m['godziny_na_utrzymanie_projektow'] = zera
+        elif typ == "R2":
+            efektywnosc_billable = kolumny['rampup_efektywnosc_billable_rok2']
+            efektywnosc_sprzedaz = kolumny['rampup_efektywnosc_sprzedaz_rok2']
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
+                kolumny['konsultant_procent_czasu_utrzymanie_projektow'] * 0.5
+        else:  # Full
+            efektywnosc_billable = 1.0
+            efektywnosc_sprzedaz = 1.0
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
+                kolumny['konsultant_procent_czasu_utrzymanie_projektow']
+
+        m['godziny_billable'] = m['godziny_pracy_rocznie'] * \
+            kolumny['konsultant_procent_czasu_billable_docelowy'] * efektywnosc_billable
+
+        if typ == "Full":
+            m['godziny_na_sprzedaz'] = m['godziny_pracy_rocznie'] * \
+                kolumny['konsultant_procent_czasu_sprzedaz_docelowy']
+        else:  # Dla R1 i R2, czas na sprzedaż to reszta
+            m['godziny_na_sprzedaz'] = np.maximum(
+                0, m['godziny_pracy_rocznie'] - m['godziny_na_rozwoj_admin'] -
+                m['godziny_billable'] - m['godziny_na_utrzymanie_projektow'])
+
+        m['przychod_z_godzin_billable'] = m['godziny_billable'] * kolumny['konsultant_stawka_billable_godz']
+
+        m['liczba_wygenerowanych_leadow'] = kolumny['sprzedaz_leady_rocznie_docelowo'] * efektywnosc_sprzedaz
+        m['liczba_pozyskanych_kontraktow'] = m['liczba_wygenerowanych_leadow'] * kolumny['sprzedaz_wspolczynnik_konwersji']
+        m['potencjalny_przychod_z_kontraktow'] = m['liczba_pozyskanych_kontraktow'] * kolumny['sprzedaz_srednia_wartosc_kontraktu']
+
+        m['koszt_wynagrodzenia'] = kolumny['konsultant_wynagrodzenie_roczne']
+        m['koszt_overheadu'] = kolumny['korporacyjne_overhead_roczny_na_konsultanta']
+        m['calkowity_koszt_roczny_konsultanta'] = m['koszt_wynagrodzenia'] + m['koszt_overheadu']
+
+        m['calkowity_przychod_potencjalny_konsultanta'] = m['przychod_z_godzin_billable'] + m['potencjalny_przychod_z_kontraktow']
+        m['zysk_strata_na_konsultancie_potencjalny'] = m['calkowity_przychod_potencjalny_konsultanta'] - m['calkowity_koszt_roczny_konsultanta']
+
+        metrics[typ] = m
+    return metrics
+
+
+def recruitment_plan_batch(kolumny, horyzont_lat):
+    """Zwraca plan rekrutacji jako tablicę (scenariusz, rok); lata bez `rekrutacja_rokN_nowi` mają 0 nowych osób."""
+    zera = np.zeros(len(kolumny['model_horyzont_analizy_lata']))
+    return np.stack([kolumny.get(f'rekrutacja_rok{n}_nowi', zera) for n in range(1, horyzont_lat + 1)], axis=1)
+
+
+def _horyzont(kolumny):
+    horyzonty = np.unique(kolumny['model_horyzont_analizy_lata'])
+    if len(horyzonty) != 1:
+        raise ValueError("Wszystkie scenariusze w jednym wsadzie muszą mieć ten sam horyzont analizy.")
+    return int(horyzonty[0])
+
+
+@timed('symulacja')
+def run_financial_model_batch(tabela):
+    """Uruchamia symulację finansową dla wielu scenariuszy naraz.
+
+    Zwraca słownik: kolumny tabeli rocznej jako tablice (scenariusz, rok), 'Rok' jako tablicę lat
+    oraz podsumowanie ROI jako tablice (scenariusz,); 'rok_zwrotu' = 0 oznacza brak zwrotu w horyzoncie.
+    """
+    kolumny = input_columns(tabela)
+    horyzont_lat = _horyzont(kolumny)
+    nowi = recruitment_plan_batch(kolumny, horyzont_lat)
+    metrics = calculate_consultant_annual_metrics_batch(kolumny)
+
+    def kolumna(typ, klucz):
+        return metrics[typ][klucz][:, None]
+
+    # --- Liczba Konsultantów ---
+    # R1 = nowi w roku, R2 = nowi rok wcześniej, Full = wszyscy zatrudnieni co najmniej dwa lata wcześniej
+    r1 = nowi
+    r2 = np.zeros_like(nowi)
+    r2[:, 1:] = nowi[:, :-1]
+    full = np.zeros_like(nowi)
+    full[:, 2:] = np.cumsum(nowi, axis=1)[:, :-2]
+    laczna_liczba = r1 + r2 + full
+
+    # --- Przychody ---
+    przychod_billable = r1 * kolumna("R1", 'przychod_z_godzin_billable') + \
+        r2 * kolumna("R2", 'przychod_z_godzin_billable') + \
+        full * kolumna("Full", 'przychod_z_godzin_billable')
+
+    kontrakty = r1 * kolumna("R1", 'liczba_pozyskanych_kontraktow') + \
+        r2 * kolumna("R2", 'liczba_pozyskanych_kontraktow') + \
+        full * kolumna("Full", 'liczba_pozyskanych_kontraktow')
+
+    # Kontrakty pozyskane w danym roku dają przychód w roku następnym
+    kontrakty_poprzedni_rok = np.zeros_like(kontrakty)
+    kontrakty_poprzedni_rok[:, 1:] = kontrakty[:, :-1]
+    przychod_z_kontraktow = kontrakty_poprzedni_rok * kolumny['sprzedaz_srednia_wartosc_kontraktu'][:, None]
+
+    calkowity_przychod = przychod_billable + przychod_z_kontraktow
+
+    # --- Koszty ---
+    wynagrodzenia = laczna_liczba * kolumny['konsultant_wynagrodzenie_roczne'][:, None]
+    overhead = laczna_liczba * kolumny['korporacyjne_overhead_roczny_na_konsultanta'][:, None]
+    koszty_rekrutacji = nowi * kolumny['korporacyjne_koszt_rekrutacji_konsultanta'][:, None]
+    laczne_koszty = wynagrodzenia + overhead + koszty_rekrutacji
+
+    # --- Rentowność i przepływy ---
+    ebit = calkowity_przychod - laczne_koszty
+    marza = np.divide(ebit, calkowity_przychod, out=np.zeros_like(ebit), where=calkowity_przychod != 0)
+    skumulowany_przeplyw = np.cumsum(ebit, axis=1)
+
+    wyniki = dict(zip(KOLUMNY_ROCZNE, (
+        r1, r2, full, laczna_liczba, przychod_billable, kontrakty, przychod_z_kontraktow,
+        calkowity_przychod, wynagrodzenia, overhead, koszty_rekrutacji, laczne_koszty,
+        ebit, marza * 100, skumulowany_przeplyw,
+    )))
+    wyniki["Rok"] = np.arange(1, horyzont_lat + 1)
+    wyniki.update(roi_summary_batch(wyniki))
+    return wyniki
+
+
+def roi_summary_batch(wyniki):
+    """Liczy podsumowanie ROI (tablice (scenariusz,)) z wyników rocznych; 'rok_zwrotu' = 0 oznacza brak zwrotu."""
+    # cumsum zamiast sum, aby sumować w tej samej kolejności co pętla skalarna
+    koszty_rekrutacji_lacznie = np.cumsum(wyniki["Koszty Rekrutacji"], axis=1)[:, -1]
+    skumulowany_przeplyw = wyniki["Skumulowany przepływ pieniężny"]
+    skumulowany_ebit = skumulowany_przeplyw[:, -1]
+    roi = np.where(skumulowany_ebit > 0, np.inf, 0.0)
+    np.divide(skumulowany_ebit, koszty_rekrutacji_lacznie, out=roi, where=koszty_rekrutacji_lacznie > 0)
+
+    dodatni = skumulowany_przeplyw > 0
+    rok_zwrotu = np.where(dodatni.any(axis=1), dodatni.argmax(axis=1) + 1, 0)
+    return {
+        'calkowite_koszty_rekrutacji_5lat': koszty_rekrutacji_lacznie,
+        'skumulowany_ebit_5lat': skumulowany_ebit,
+        'roi': roi,
+        'rok_zwrotu': rok_zwrotu,
+    }
+
+
+def scenario_results(wyniki, indeks):
+    """Zwraca wyniki jednego scenariusza w formacie `run_financial_model` (DataFrame roczny i roi_summary)."""
+    import pandas as pd
+
+    with stage('tabele'):
+        roczne_wyniki_df = pd.DataFrame({"Rok": wyniki["Rok"]})
+        for kolumna in KOLUMNY_ROCZNE:
+            roczne_wyniki_df[kolumna] = wyniki[kolumna][indeks]
+
+    rok_zwrotu = int(wyniki['rok_zwrotu'][indeks])
+    roi_summary = {
+        'calkowite_koszty_rekrutacji_5lat': float(wyniki['calkowite_koszty_rekrutacji_5lat'][indeks]),
+        'skumulowany_ebit_5lat': float(wyniki['skumulowany_ebit_5lat'][indeks]),
+        'roi': float(wyniki['roi'][indeks]),
+        'payback_period_display': payback_period_text(rok_zwrotu, len(wyniki["Rok"])),
+    }
+    return roczne_wyniki_df, roi_summary
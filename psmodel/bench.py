@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from psmodel.model import complete_inputs, run_financial_model, run_financial_model_records
+from psmodel.timing import record_timings
+
+# --- Zestaw testów wydajności ---
+#
+# Mierzy czas importu, opóźnienie pojedynczego uruchomienia, przepustowość silnika
+# wsadowego dla 1, 1 000 i 100 000 scenariuszy, szczytowe zużycie pamięci oraz
+# rozkład czasu na etapy. Wyniki można zapisać jako bazę i porównywać z nią kolejne
+# pomiary - przekroczenie progu regresji kończy program kodem 1.
+#
+# Baza w repozytorium (psmodel/bench_baza.json) ma progi ('progi') dopuszczające
+# dwukrotne spowolnienie - maszyny CI różnią się od maszyny pomiarowej i mają duży
+# rozrzut; pamięć jest powtarzalna i ma próg 10%. Porównanie z nią (np. w CI):
+#
+#   python -m psmodel.bench --porownaj
+#   python -m psmodel.bench --porownaj inna_baza.json --prog 0.25
+#
+# Bazę odświeżamy po zamierzonej zmianie wydajności albo sprzętu pomiarowego, na
+# nieobciążonej maszynie; progi zapisane w istniejącym pliku są zachowywane:
+#
+#   python -m psmodel.bench --zapisz-baze psmodel/bench_baza.json
+
+ROZMIARY_WSADU = (1, 1_000, 100_000)
+DOMYSLNY_PROG = 0.25  # dopuszczalne pogorszenie względem bazy (25%)
+DOMYSLNA_BAZA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baza.json')
+
+
+def _median_time(funkcja, powtorzenia, liczba=1):
+    # Mediana z `powtorzenia` pomiarów, każdy jako średnia z `liczba` wywołań
+    czasy = []
+    for _ in range(powtorzenia):
+        start = time.perf_counter()
+        for _ in range(liczba):
+            funkcja()
+        czasy.append((time.perf_counter() - start) / liczba)
+    return statistics.median(czasy)
+
+
+def _scenarios(n):
+    # Scenariusze różniące się planem rekrutacji i stawką - deterministycznie, bez losowania
+    bazowy = complete_inputs({})
+    return [{**bazowy, 'rekrutacja_rok1_nowi': i % 7, 'rekrutacja_rok2_nowi': (i // 7) % 5,
+             'konsultant_stawka_billable_godz': 300.0 + i % 400} for i in range(n)]
+
+
+def measure_import(modul, powtorzenia=5):
+    """Czas importu modułu w świeżym procesie (s) - mediana z `powtorzenia` uruchomień."""
+    kod = f"import time; t = time.perf_counter(); import {modul}; print(time.perf_counter() - t)"
+    czasy = [float(subprocess.run([sys.executable, '-c', kod], capture_output=True, text=True, check=True,
+                                  env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}).stdout)
+             for _ in range(powtorzenia)]
+    return statistics.median(czasy)
+
+
+def measure_latency(powtorzenia=50):
+    """Opóźnienie pojedynczego uruchomienia (s): ścieżka bez pandas i z budową DataFrame."""
+    inputs = complete_inputs({})
+    return {
+        'opoznienie_rekordy_s': _median_time(lambda: run_financial_model_records(inputs), powtorzenia, 20),
+        'opoznienie_dataframe_s': _median_time(lambda: run_financial_model(inputs), powtorzenia, 5),
+    }
+
+
+def measure_throughput(rozmiary=ROZMIARY_WSADU):
+    """Przepustowość silnika wsadowego (scenariusze/s) dla podanych rozmiarów wsadu."""
+    from psmodel.batch import input_columns, run_financial_model_batch
+
+    wyniki = {}
+    for n in rozmiary:
+        # Kolumny przygotowane raz - mierzymy silnik, nie budowę słowników
+        kolumny = {k: v.copy() for k, v in input_columns(_scenarios(n)).items()}
+        powtorzenia = 3 if n >= 100_000 else 10
+        czas = _median_time(lambda: run_financial_model_batch(kolumny), powtorzenia, max(1, 1000 // n))
+        wyniki[f'przepustowosc_{n}_scen_s'] = n / czas
+    return wyniki
+
+
+def measure_peak_memory(n=max(ROZMIARY_WSADU)):
+    """Szczytowa pamięć (MB) alokowana przez silnik wsadowy dla `n` scenariuszy (tracemalloc)."""
+    from psmodel.batch import input_columns, run_financial_model_batch
+
+    kolumny = input_columns(_scenarios(n))
+    tracemalloc.start()
+    try:
+        run_financial_model_batch(kolumny)
+        _, szczyt = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {f'pamiec_szczyt_{n}_scen_mb': szczyt / 2**20}
+
+
+def measure_stages(powtorzenia=200):
+    """Średni czas etapów (ms) pojedynczego uruchomienia z budową DataFrame."""
+    inputs = complete_inputs({})
+    with record_timings() as pomiary:
+        for _ in range(powtorzenia):
+            run_financial_model(inputs)
+    return {f"etap_{w['etap']}_ms": w['czas_ms'] / powtorzenia for w in pomiary.records()}
+
+
+def run_benchmarks(szybko=False):
+    """Uruchamia wszystkie pomiary; `szybko` pomija największy wsad i ogranicza powtórzenia."""
+    rozmiary = ROZMIARY_WSADU[:-1] if szybko else ROZMIARY_WSADU
+    wyniki = {
+        'import_psmodel_model_s': measure_import('psmodel.model', 3 if szybko else 5),
+        'import_psmodel_batch_s': measure_import('psmodel.batch', 3 if szybko else 5),
+        **measure_latency(10 if szybko else 50),
+        **measure_throughput(rozmiary),
+        **measure_peak_memory(max(rozmiary)),
+        **measure_stages(50 if szybko else 200),
+    }
+    return wyniki
+
+
+def higher_is_better(nazwa):
+    return nazwa.startswith('przepustowosc_')
+
+
+def compare(wyniki, baza, prog=DOMYSLNY_PROG):
+    """Porównuje wyniki z bazą; zwraca listę słowników z względną zmianą i flagą regresji.
+
+    Zmiana jest dodatnia, gdy wynik się pogorszył. Miary spoza bazy są pomijane.
+    """
+    porownanie = []
+    for nazwa, wartosc in wyniki.items():
+        if nazwa not in baza['wyniki'] or not baza['wyniki'][nazwa]:
+            continue
+        bazowa = baza['wyniki'][nazwa]
+        zmiana = (bazowa / wartosc - 1) if higher_is_better(nazwa) else (wartosc / bazowa - 1)
+        prog_miary = baza.get('progi', {}).get(nazwa, prog)
+        porownanie.append({'miara': nazwa, 'baza': bazowa, 'wynik': wartosc, 'zmiana': zmiana,
+                           'prog': prog_miary, 'regresja': zmiana > prog_miary})
+    return porownanie
+
+
+def _environment():
+    import numpy
+    return {'python': platform.python_version(), 'numpy': numpy.__version__,
+            'platforma': platform.platform(), 'procesor': platform.processor() or platform.machine()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m psmodel.bench',
+        description="Mierzy wydajność modelu i porównuje wyniki z zapisaną bazą.")
+    parser.add_argument('--zapisz-baze', metavar='PLIK', help="zapisz wyniki jako bazę do porównań")
+    parser.add_argument('--porownaj', metavar='PLIK', nargs='?', const=DOMYSLNA_BAZA,
+                        help="porównaj wyniki z bazą (domyślnie psmodel/bench_baza.json); kod wyjścia 1 przy regresji")
+    parser.add_argument('--prog', type=float, default=DOMYSLNY_PROG,
+                        help=f"dopuszczalne pogorszenie względem bazy (domyślnie {DOMYSLNY_PROG * 100:.0f}%%); "
+                             "progi zapisane w bazie ('progi') mają pierwszeństwo")
+    parser.add_argument('--szybko', action='store_true', help="pomiń wsad 100 000 scenariuszy i ogranicz powtórzenia")
+    parser.add_argument('--json', action='store_true', help="wypisz wyniki jako JSON")
+    args = parser.parse_args(argv)
+
+    wyniki = run_benchmarks(szybko=args.szybko)
+    if args.json:
+        print(json.dumps(wyniki, indent=2, ensure_ascii=False))
+    else:
+        for nazwa, wartosc in wyniki.items():
+            print(f"{nazwa:40s} {wartosc:14.6g}")
+
+    if args.zapisz_baze:
+        baza = {'srodowisko': _environment(), 'wyniki': wyniki}
+        if os.path.exists(args.zapisz_baze):
+            # Progi są ustawiane ręcznie - odświeżenie bazy ich nie nadpisuje
+            with open(args.zapisz_baze, encoding='utf-8') as plik:
+                progi = json.load(plik).get('progi')
+            if progi:
+                baza['progi'] = progi
+        with open(args.zapisz_baze, 'w', encoding='utf-8') as plik:
+            json.dump(baza, plik, indent=2, ensure_ascii=False)
+            plik.write('\n')
+        print(f"Zapisano bazę: {args.zapisz_baze}", file=sys.stderr)
+
+    if args.porownaj:
+        with open(args.porownaj, encoding='utf-8') as plik:
+            baza = json.load(plik)
+        porownanie = compare(wyniki, baza, args.prog)
+        regresje = [w for w in porownanie if w['regresja']]
+        print(f"\nPorównanie z bazą {args.porownaj}:")
+        for w in porownanie:
+            znacznik = "REGRESJA" if w['regresja'] else "ok"
+            print(f"{w['miara']:40s} {w['zmiana']:+8.1%} (próg {w['prog']:.0%})  {znacznik}")
+        if regresje:
+            print(f"Regresje wydajności: {len(regresje)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+from psmodel.model import WERSJA_MODELU
+
+# --- Pamięć podręczna wyników modelu ---
+#
+# Wyniki są zapamiętywane pod kanonicznym skrótem parametrów wejściowych:
+# kolejność kluczy nie ma znaczenia, a liczby całkowite i zmiennoprzecinkowe
+# o tej samej wartości (np. 12 i 12.0 ze Streamlit) dają ten sam klucz.
+# Pierwszy poziom to ograniczony słownik LRU w pamięci procesu, drugi
+# (opcjonalny) to katalog na dysku - pliki zapisujemy atomowo, więc katalog
+# może być współdzielony przez kilka procesów i przetrwa restart aplikacji.
+# Klucz zawiera `WERSJA_MODELU`, więc zmiana semantyki modelu unieważnia stare wpisy.
+
+# Parametry, od których zależą metryki per typ konsultanta (`calculate_consultant_annual_metrics`)
+PARAMETRY_METRYK = (
+    'konsultant_godziny_pracy_miesiac',
+    'konsultant_stawka_billable_godz',
+    'konsultant_wynagrodzenie_roczne',
+    'konsultant_procent_czasu_rozwoj_admin',
+    'konsultant_procent_czasu_billable_docelowy',
+    'konsultant_procent_czasu_utrzymanie_projektow',
+    'konsultant_procent_czasu_sprzedaz_docelowy',
+    'rampup_efektywnosc_billable_rok1',
+    'rampup_efektywnosc_billable_rok2',
+    'rampup_efektywnosc_sprzedaz_rok1',
+    'rampup_efektywnosc_sprzedaz_rok2',
+    'sprzedaz_leady_rocznie_docelowo',
+    'sprzedaz_srednia_wartosc_kontraktu',
+    'sprzedaz_wspolczynnik_konwersji',
+    'korporacyjne_overhead_roczny_na_konsultanta',
+)
+
+
+def _canonical(wartosc):
+    if isinstance(wartosc, dict):
+        return {str(k): _canonical(v) for k, v in wartosc.items()}
+    if isinstance(wartosc, (list, tuple)):
+        return [_canonical(v) for v in wartosc]
+    if hasattr(wartosc, 'item') and not isinstance(wartosc, (str, bytes)):  # skalary NumPy
+        wartosc = wartosc.item()
+    if isinstance(wartosc, bool) or wartosc is None or isinstance(wartosc, str):
+        return wartosc
+    if isinstance(wartosc, (int, float)):
+        return float(wartosc).hex()  # dokładna reprezentacja, 12 i 12.0 to ten sam klucz
+    raise TypeError(f"Nie można wyznaczyć klucza dla wartości typu {type(wartosc).__name__}.")
+
+
+def canonical_key(inputs_dict, klucze=None, **dodatkowe):
+    """Zwraca skrót SHA-256 parametrów niezależny od kolejności kluczy.
+
+    `klucze` ogranicza skrót do podzbioru parametrów (brakujące klucze są pomijane),
+    a `dodatkowe` pozwala dołączyć ustawienia spoza słownika parametrów (np. krok symulacji).
+    """
+    if klucze is not None:
+        inputs_dict = {k: inputs_dict[k] for k in klucze if k in inputs_dict}
+    tresc = json.dumps({'wersja_modelu': WERSJA_MODELU, 'parametry': _canonical(inputs_dict),
+                        'dodatkowe': _canonical(dodatkowe)},
+                       sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(tresc.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Pamięć podręczna LRU z opcjonalnym poziomem dyskowym i licznikami trafień."""
+
+    def __init__(self, nazwa, maks_rozmiar=128, katalog=None):
+        self.nazwa = nazwa
+        self.maks_rozmiar = maks_rozmiar
+        self.katalog = os.path.join(katalog, nazwa) if katalog else None
+        self._wpisy = OrderedDict()
+        self._blokada = threading.Lock()
+        self.trafienia_pamiec = 0
+        self.trafienia_dysk = 0
+        self.chybienia = 0
+
+    def _sciezka(self, klucz):
+        return os.path.join(self.katalog, klucz[:2], klucz + '.pkl')
+
+    def _zapamietaj(self, klucz, wartosc):
+        with self._blokada:
+            self._wpisy[klucz] = wartosc
+            self._wpisy.move_to_end(klucz)
+            while len(self._wpisy) > self.maks_rozmiar:
+                self._wpisy.popitem(last=False)
+
+    def _czytaj_z_dysku(self, klucz):
+        sciezka = self._sciezka(klucz)
+        try:
+            with open(sciezka, 'rb') as plik:
+                return True, pickle.load(plik)
+        except FileNotFoundError:
+            return False, None
+        except Exception:
+            # Plik uszkodzony albo zapisany przez starszą wersję kodu (brak klasy lub modułu,
+            # inny format obiektu) - traktujemy jak chybienie i usuwamy, wynik zostanie zapisany na nowo
+            with contextlib.suppress(OSError):
+                os.unlink(sciezka)
+            return False, None
+
+    def _zapisz_na_dysk(self, klucz, wartosc):
+        sciezka = self._sciezka(klucz)
+        os.makedirs(os.path.dirname(sciezka), exist_ok=True)
+        deskryptor, tymczasowa = tempfile.mkstemp(dir=os.path.dirname(sciezka), suffix='.tmp')
+        try:
+            with os.fdopen(deskryptor, 'wb') as plik:
+                pickle.dump(wartosc, plik, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tymczasowa, sciezka)  # atomowo - inne procesy widzą stary albo pełny nowy plik
+        except BaseException:
+            os.unlink(tymczasowa)
+            raise
+
+    def get_or_compute(self, klucz, funkcja):
+        """Zwraca wynik zapamiętany pod `klucz` albo liczy go przez `funkcja()` i zapamiętuje.
+
+        Zwracany obiekt jest współdzielony z pamięcią podręczną - nie należy go modyfikować.
+        """
+        with self._blokada:
+            if klucz in self._wpisy:
+                self._wpisy.move_to_end(klucz)
+                self.trafienia_pamiec += 1
+                return self._wpisy[klucz]
+        if self.katalog:
+            znaleziony, wartosc = self._czytaj_z_dysku(klucz)
+            if znaleziony:
+                with self._blokada:
+                    self.trafienia_dysk += 1
+                self._zapamietaj(klucz, wartosc)
+                return wartosc
+        with self._blokada:
+            self.chybienia += 1
+        wartosc = funkcja()
+        self._zapamietaj(klucz, wartosc)
+        if self.katalog:
+            self._zapisz_na_dysk(klucz, wartosc)
+        return wartosc
+
+    def clear(self, dysk=False):
+        """Czyści pamięć (opcjonalnie również katalog na dysku) i zeruje liczniki."""
+        with self._blokada:
+            self._wpisy.clear()
+            self.trafienia_pamiec = self.trafienia_dysk = self.chybienia = 0
+        if dysk and self.katalog and os.path.isdir(self.katalog):
+            for katalog, _, pliki in os.walk(self.katalog):
+                for plik in pliki:
+                    if plik.endswith('.pkl'):
+                        os.unlink(os.path.join(katalog, plik))
+
+    def stats(self):
+        """Zwraca liczniki trafień i chybień oraz bieżący rozmiar (spójną migawkę)."""
+        with self._blokada:
+            trafienia_pamiec, trafienia_dysk, chybienia = self.trafienia_pamiec, self.trafienia_dysk, self.chybienia
+            rozmiar = len(self._wpisy)
+        zapytania = trafienia_pamiec + trafienia_dysk + chybienia
+        return {
+            'nazwa': self.nazwa,
+            'trafienia_pamiec': trafienia_pamiec,
+            'trafienia_dysk': trafienia_dysk,
+            'chybienia': chybienia,
+            'wspolczynnik_trafien': (trafienia_pamiec + trafienia_dysk) / zapytania if zapytania else 0.0,
+            'rozmiar': rozmiar,
+            'maks_rozmiar': self.maks_rozmiar,
+        }
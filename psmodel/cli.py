@@ -0,0 +1,140 @@
+import argparse
+import csv
+import json
+import math
+import sys
+
+from psmodel.model import KOLUMNA_ID, complete_inputs, get_default_inputs, parse_scenario, run_financial_model_records
+
+# --- Wiersz poleceń: wsadowe liczenie scenariuszy z pliku ---
+#
+# Scenariusze (CSV albo JSON lines; brakujące parametry biorą wartości domyślne)
+# są czytane strumieniowo, liczone paczkami i wypisywane od razu po policzeniu
+# paczki, więc pamięć nie rośnie z liczbą scenariuszy. Silnik wsadowy (NumPy)
+# jest importowany dopiero przy pierwszej paczce.
+#
+#   python -m psmodel scenariusze.csv -o wyniki.jsonl --roczne
+
+def read_scenarios(plik, format_wejscia):
+    """Czyta scenariusze strumieniowo; zwraca generator słowników parametrów (puste pola CSV są pomijane)."""
+    if format_wejscia == 'csv':
+        wiersze = ({k: v for k, v in w.items() if v not in ('', None)} for w in csv.DictReader(plik))
+    else:
+        wiersze = (json.loads(linia) for linia in plik if linia.strip())
+    for numer, wiersz in enumerate(wiersze, start=1):
+        yield parse_scenario(wiersz, numer)
+
+
+def _summary(id_scenariusza, koszty, ebit, roi, rok_zwrotu):
+    return {
+        KOLUMNA_ID: id_scenariusza,
+        'calkowite_koszty_rekrutacji_5lat': float(koszty),
+        'skumulowany_ebit_5lat': float(ebit),
+        'roi': float(roi) if math.isfinite(roi) else None,  # None: dodatni EBIT bez kosztów rekrutacji
+        'rok_zwrotu': int(rok_zwrotu) or None,
+    }
+
+
+def _evaluate_scalar(paczka, roczne):
+    for scenariusz in paczka:
+        lista, roi_summary, _ = run_financial_model_records(
+            complete_inputs({k: v for k, v in scenariusz.items() if k != KOLUMNA_ID}))
+        rok_zwrotu = next((w['Rok'] for w in lista if w["Skumulowany przepływ pieniężny"] > 0), 0)
+        wynik = _summary(scenariusz[KOLUMNA_ID], roi_summary['calkowite_koszty_rekrutacji_5lat'],
+                         roi_summary['skumulowany_ebit_5lat'], roi_summary['roi'], rok_zwrotu)
+        if roczne:
+            wynik['roczne'] = {k: [w[k] for w in lista] for k in lista[0]} if lista else {}
+        yield wynik
+
+
+def evaluate_batch(paczka, roczne=False):
+    """Liczy paczkę sparsowanych scenariuszy (`parse_scenario`) o wspólnym horyzoncie silnikiem wsadowym.
+
+    Zwraca generator wyników w kolejności paczki: podsumowanie ROI z 'id' scenariusza,
+    a przy `roczne` także słownik 'roczne' z listami wartości rocznych.
+    """
+    from psmodel.batch import KOLUMNY_ROCZNE, run_financial_model_batch
+
+    wyniki = run_financial_model_batch([complete_inputs({k: v for k, v in s.items() if k != KOLUMNA_ID})
+                                        for s in paczka])
+    for i, scenariusz in enumerate(paczka):
+        wynik = _summary(scenariusz[KOLUMNA_ID], wyniki['calkowite_koszty_rekrutacji_5lat'][i],
+                         wyniki['skumulowany_ebit_5lat'][i], wyniki['roi'][i], wyniki['rok_zwrotu'][i])
+        if roczne:
+            wynik['roczne'] = {'Rok': wyniki['Rok'].tolist(), **{k: wyniki[k][i].tolist() for k in KOLUMNY_ROCZNE}}
+        yield wynik
+
+
+def evaluate_stream(scenariusze, silnik='wsadowy', rozmiar_paczki=1000, roczne=False):
+    """Liczy scenariusze paczkami i zwraca generator wyników w kolejności wejścia."""
+    licz = evaluate_batch if silnik == 'wsadowy' else _evaluate_scalar
+    domyslny_horyzont = get_default_inputs()['model_horyzont_analizy_lata']
+    paczka = []
+    for scenariusz in scenariusze:
+        # Silnik wsadowy wymaga wspólnego horyzontu w paczce
+        if paczka and (len(paczka) >= rozmiar_paczki or
+                       paczka[0].get('model_horyzont_analizy_lata', domyslny_horyzont) !=
+                       scenariusz.get('model_horyzont_analizy_lata', domyslny_horyzont)):
+            yield from licz(paczka, roczne)
+            paczka = []
+        paczka.append(scenariusz)
+    if paczka:
+        yield from licz(paczka, roczne)
+
+
+def _write_jsonl(wyniki, wyjscie):
+    for wynik in wyniki:
+        wyjscie.write(json.dumps(wynik, ensure_ascii=False) + '\n')
+        wyjscie.flush()
+
+
+def _write_csv(wyniki, wyjscie):
+    # CSV z wynikami rocznymi ma jeden wiersz na (scenariusz, rok) z powtórzonym podsumowaniem
+    pisarz = None
+    for wynik in wyniki:
+        roczne = wynik.pop('roczne', None)
+        wiersze = [wynik] if roczne is None else [
+            {**wynik, **{k: v[i] for k, v in roczne.items()}} for i in range(len(roczne.get('Rok', [])))]
+        for wiersz in wiersze:
+            if pisarz is None:
+                pisarz = csv.DictWriter(wyjscie, fieldnames=list(wiersz))
+                pisarz.writeheader()
+            pisarz.writerow(wiersz)
+        wyjscie.flush()
+
+
+def _detect_format(sciezka, podany):
+    if podany:
+        return podany
+    return 'csv' if sciezka.lower().endswith('.csv') else 'jsonl'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m psmodel',
+        description="Liczy scenariusze modelu finansowego z pliku CSV lub JSON lines i strumieniowo wypisuje wyniki.")
+    parser.add_argument('wejscie', help="plik scenariuszy (.csv lub .jsonl); '-' oznacza standardowe wejście")
+    parser.add_argument('-o', '--wyjscie', default='-', help="plik wyników (.csv lub .jsonl); domyślnie standardowe wyjście")
+    parser.add_argument('--format-wejscia', choices=('csv', 'jsonl'), help="format wejścia (domyślnie wg rozszerzenia, '-' = jsonl)")
+    parser.add_argument('--format-wyjscia', choices=('csv', 'jsonl'), help="format wyjścia (domyślnie wg rozszerzenia, '-' = jsonl)")
+    parser.add_argument('--roczne', action='store_true', help="dołącz wyniki roczne, nie tylko podsumowanie ROI")
+    parser.add_argument('--silnik', choices=('wsadowy', 'skalarny'), default='wsadowy',
+                        help="silnik wsadowy (NumPy) albo skalarny (bez NumPy)")
+    parser.add_argument('--rozmiar-paczki', type=int, default=1000, help="liczba scenariuszy liczonych naraz")
+    args = parser.parse_args(argv)
+
+    format_wejscia = _detect_format(args.wejscie, args.format_wejscia)
+    format_wyjscia = _detect_format(args.wyjscie, args.format_wyjscia)
+    wejscie = sys.stdin if args.wejscie == '-' else open(args.wejscie, newline='', encoding='utf-8')
+    wyjscie = sys.stdout if args.wyjscie == '-' else open(args.wyjscie, 'w', newline='', encoding='utf-8')
+    try:
+        wyniki = evaluate_stream(read_scenarios(wejscie, format_wejscia), args.silnik, args.rozmiar_paczki, args.roczne)
+        (_write_csv if format_wyjscia == 'csv' else _write_jsonl)(wyniki, wyjscie)
+    except (ValueError, KeyError) as e:
+        parser.exit(2, f"błąd: {e}\n")
+    finally:
+        if wejscie is not sys.stdin:
+            wejscie.close()
+        if wyjscie is not sys.stdout:
+            wyjscie.close()
+    return 0
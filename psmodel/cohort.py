@@ -0,0 +1,168 @@
+import numpy as np
+
+from psmodel.batch import KOLUMNY_ROCZNE, _horyzont, input_columns, roi_summary_batch, run_financial_model_batch
+from psmodel.pipeline import causal_convolve, contract_pipeline
+from psmodel.timing import timed
+
+# --- Silnik kohortowy: dowolny horyzont, krok miesięczny, dowolna krzywa ramp-upu ---
+#
+# Zatrudnienie przechowujemy jako tablicę kohort (liczba nowych osób w każdym
+# kroku czasu). Wynik kohorty zależy tylko od jej stażu, więc przychód, leady
+# i koszty wszystkich kohort to splot planu rekrutacji z krzywą "stawka(staż)".
+# Krzywa jest stała po zakończeniu ramp-upu, dlatego splot liczymy jako
+# skumulowaną liczbę osób × wartość docelowa plus krótki splot z odchyleniem
+# w okresie ramp-upu - koszt jest liniowy w horyzoncie i nie zależy od liczby kohort.
+# Leady przechodzą dalej przez lejek kontraktów (`psmodel.pipeline`).
+
+KROKI_NA_ROK = {"roczny": 1, "miesieczny": 12}
+
+
+def rampup_curve(kolumny, kroki_na_rok):
+    """Buduje krzywe ramp-upu (scenariusz, staż w krokach) z parametrów `rampup_*`.
+
+    Rok stażu j < `rampup_dlugosc_lata` ma efektywności interpolowane liniowo między wartościami
+    z roku 1 i roku 2 (dla długości 2 dokładnie R1 i R2); od roku `rampup_dlugosc_lata`
+    konsultant jest w pełni efektywny.
+    """
+    dlugosci = np.unique(kolumny['rampup_dlugosc_lata'])
+    if len(dlugosci) != 1 or dlugosci[0] < 1:
+        raise ValueError("Długość ramp-upu musi być dodatnia i wspólna dla wszystkich scenariuszy we wsadzie.")
+    dlugosc_lat = int(dlugosci[0])
+
+    postep = np.arange(dlugosc_lat) / max(dlugosc_lat - 1, 1)  # 0 .. 1 w kolejnych latach ramp-upu
+
+    def interpoluj(rok1, rok2):
+        return rok1[:, None] + (rok2 - rok1)[:, None] * postep[None, :]
+
+    krzywa_roczna = {
+        'billable': interpoluj(kolumny['rampup_efektywnosc_billable_rok1'], kolumny['rampup_efektywnosc_billable_rok2']),
+        'sprzedaz': interpoluj(kolumny['rampup_efektywnosc_sprzedaz_rok1'], kolumny['rampup_efektywnosc_sprzedaz_rok2']),
+    }
+    return {k: np.repeat(v, kroki_na_rok, axis=1) for k, v in krzywa_roczna.items()}
+
+
+def cohort_plan(kolumny, horyzont_lat, kroki_na_rok):
+    """Plan rekrutacji (scenariusz, krok): nowe osoby z `rekrutacja_rokN_nowi` na początku roku N."""
+    plan = np.zeros((len(kolumny['model_horyzont_analizy_lata']), horyzont_lat * kroki_na_rok))
+    for rok in range(1, horyzont_lat + 1):
+        plan[:, (rok - 1) * kroki_na_rok] = kolumny.get(f'rekrutacja_rok{rok}_nowi', 0.0)
+    return plan
+
+
+@timed('symulacja')
+def run_cohort_model(tabela, krok="miesieczny", plan=None, krzywa=None):
+    """Uruchamia kohortową symulację finansową dla wielu scenariuszy naraz.
+
+    `krok` to "miesieczny" albo "roczny"; `plan` (opcjonalnie) to tablica nowych osób
+    (scenariusz, krok), a `krzywa` (opcjonalnie) to słownik krzywych efektywności ramp-upu
+    'billable' i 'sprzedaz' o dowolnej długości w krokach (po jej końcu efektywność = 1).
+    Zwraca wyniki roczne w formacie `run_financial_model_batch` oraz słownik 'okresowe'
+    z wynikami dla każdego kroku.
+    """
+    kroki_na_rok = KROKI_NA_ROK[krok]
+    kolumny = input_columns(tabela)
+    horyzont_lat = _horyzont(kolumny)
+    n_krokow = horyzont_lat * kroki_na_rok
+    n_scenariuszy = len(kolumny['model_horyzont_analizy_lata'])
+    if plan is None:
+        nowi = cohort_plan(kolumny, horyzont_lat, kroki_na_rok)
+    else:
+        nowi = np.atleast_2d(np.asarray(plan, dtype=np.float64))
+        if nowi.shape[1] != n_krokow:
+            raise ValueError(f"Plan rekrutacji musi mieć {n_krokow} kroków (horyzont × kroki na rok).")
+        nowi = np.broadcast_to(nowi, (n_scenariuszy, n_krokow))
+    if krzywa is None:
+        krzywa = rampup_curve(kolumny, kroki_na_rok)
+    krzywa = {k: np.atleast_2d(np.asarray(v, dtype=np.float64)) for k, v in krzywa.items()}
+    dlugosc_rampupu = krzywa['billable'].shape[1]
+
+    # --- Liczba Konsultantów (wg stażu) ---
+    zatrudnieni = np.cumsum(nowi, axis=1)
+
+    def zatrudnieni_przed(kroki):
+        wynik = np.zeros_like(zatrudnieni)
+        if kroki < n_krokow:
+            wynik[:, kroki:] = zatrudnieni[:, :n_krokow - kroki]
+        return wynik
+
+    staz_rok1 = zatrudnieni - zatrudnieni_przed(kroki_na_rok)
+    w_pelni_efektywni = zatrudnieni_przed(max(dlugosc_rampupu, kroki_na_rok))
+    w_rampupie_po_roku1 = zatrudnieni - staz_rok1 - w_pelni_efektywni
+
+    # --- Przychody i leady: skumulowana liczba osób × wartość docelowa + splot z odchyleniem w ramp-upie ---
+    przychod_billable_docelowy = kolumny['konsultant_godziny_pracy_miesiac'] * 12 * \
+        kolumny['konsultant_procent_czasu_billable_docelowy'] * kolumny['konsultant_stawka_billable_godz']
+    leady_docelowe = kolumny['sprzedaz_leady_rocznie_docelowo']
+
+    odchylenie_billable = przychod_billable_docelowy[:, None] * (krzywa['billable'] - 1.0)
+    przychod_billable_okres = (zatrudnieni * przychod_billable_docelowy[:, None] +
+                               causal_convolve(nowi, odchylenie_billable)) / kroki_na_rok
+    odchylenie_leady = leady_docelowe[:, None] * (krzywa['sprzedaz'] - 1.0)
+    leady_okres = (zatrudnieni * leady_docelowe[:, None] + causal_convolve(nowi, odchylenie_leady)) / kroki_na_rok
+
+    # Kontrakty przechodzą przez lejek: cykl sprzedaży, potem rozpoznanie przychodu w okresie realizacji
+    lejek = contract_pipeline(leady_okres, kolumny, kroki_na_rok)
+    kontrakty_okres = lejek['kontrakty_pozyskane']
+    przychod_z_kontraktow_okres = lejek['przychod']
+
+    # --- Koszty ---
+    wynagrodzenia_okres = zatrudnieni * kolumny['konsultant_wynagrodzenie_roczne'][:, None] / kroki_na_rok
+    overhead_okres = zatrudnieni * kolumny['korporacyjne_overhead_roczny_na_konsultanta'][:, None] / kroki_na_rok
+    koszty_rekrutacji_okres = nowi * kolumny['korporacyjne_koszt_rekrutacji_konsultanta'][:, None]
+
+    okresowe = {
+        "Okres": np.arange(1, n_krokow + 1),
+        "Łączna Liczba Konsultantów": zatrudnieni,
+        "Łączny Przychód z Godzin Billable": przychod_billable_okres,
+        "Leady": leady_okres,
+        "Łącznie Kontrakty Pozyskane (szt.)": kontrakty_okres,
+        "Kontrakty Podpisane (szt.)": lejek['kontrakty_podpisane'],
+        "Przychód z Kontraktów (z opóźnieniem)": przychod_z_kontraktow_okres,
+        "Wynagrodzenia": wynagrodzenia_okres,
+        "Overhead": overhead_okres,
+        "Koszty Rekrutacji": koszty_rekrutacji_okres,
+    }
+    okresowe["CAŁKOWITY PRZYCHÓD FIRMY"] = przychod_billable_okres + przychod_z_kontraktow_okres
+    okresowe["Łączne Koszty Operacyjne"] = wynagrodzenia_okres + overhead_okres + koszty_rekrutacji_okres
+    okresowe["ZYSK / STRATA OPERACYJNA (EBIT)"] = okresowe["CAŁKOWITY PRZYCHÓD FIRMY"] - okresowe["Łączne Koszty Operacyjne"]
+    okresowe["Skumulowany przepływ pieniężny"] = np.cumsum(okresowe["ZYSK / STRATA OPERACYJNA (EBIT)"], axis=1)
+
+    # --- Agregacja do lat ---
+    def suma_roczna(x):
+        return x.reshape(x.shape[0], horyzont_lat, kroki_na_rok).sum(axis=2)
+
+    def koniec_roku(x):
+        return x[:, kroki_na_rok - 1::kroki_na_rok]
+
+    wyniki = {
+        "Konsultanci R1 (koniec roku)": koniec_roku(staz_rok1),
+        "Konsultanci R2 (koniec roku)": koniec_roku(w_rampupie_po_roku1),
+        "Konsultanci Full (koniec roku)": koniec_roku(w_pelni_efektywni),
+        "Łączna Liczba Konsultantów (koniec roku)": koniec_roku(zatrudnieni),
+    }
+    for kolumna in ("Łączny Przychód z Godzin Billable", "Łącznie Kontrakty Pozyskane (szt.)",
+                    "Przychód z Kontraktów (z opóźnieniem)", "CAŁKOWITY PRZYCHÓD FIRMY", "Wynagrodzenia",
+                    "Overhead", "Koszty Rekrutacji", "Łączne Koszty Operacyjne", "ZYSK / STRATA OPERACYJNA (EBIT)"):
+        wyniki[kolumna] = suma_roczna(okresowe[kolumna])
+    ebit, przychod = wyniki["ZYSK / STRATA OPERACYJNA (EBIT)"], wyniki["CAŁKOWITY PRZYCHÓD FIRMY"]
+    wyniki["MARŻA OPERACYJNA (%)"] = np.divide(ebit, przychod, out=np.zeros_like(ebit), where=przychod != 0) * 100
+    wyniki["Skumulowany przepływ pieniężny"] = np.cumsum(ebit, axis=1)
+    wyniki = {k: wyniki[k] for k in KOLUMNY_ROCZNE}
+    wyniki["Rok"] = np.arange(1, horyzont_lat + 1)
+
+    wyniki.update(roi_summary_batch(wyniki))
+    wyniki['okresowe'] = okresowe
+    return wyniki
+
+
+def run_model_batch(tabela, krok_kohortowy=None):
+    """Liczy scenariusze modelem rocznym (`krok_kohortowy` = None) albo silnikiem kohortowym z tym krokiem.
+
+    Wyniki mają format `run_financial_model_batch`; wyniki okresowe silnika kohortowego są
+    pomijane, aby analizy wielu scenariuszy (Monte Carlo, wrażliwość) ich nie przechowywały.
+    """
+    if krok_kohortowy is None:
+        return run_financial_model_batch(tabela)
+    wyniki = run_cohort_model(tabela, krok=krok_kohortowy)
+    del wyniki['okresowe']
+    return wyniki
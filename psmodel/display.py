@@ -0,0 +1,105 @@
+import numpy as np
+
+# --- Prezentacja wyników: formaty kolumn, stronicowanie i próbkowanie wykresów ---
+#
+# Tabele wyników pozostają liczbowe - format (PLN, godziny, procenty) i krótkie
+# nazwy kolumn są deklarowane tutaj i nakładane dopiero przy wyświetlaniu, więc nie
+# kopiujemy ramek ani nie formatujemy każdej komórki w Pythonie, a sortowanie po
+# kolumnie działa liczbowo. Duże tabele są dzielone na strony, a długie serie
+# wykresów (horyzont miesięczny, długie horyzonty) próbkowane z zachowaniem ekstremów.
+
+# Kwoty i godziny: preset "localized" (separator tysięcy wg ustawień przeglądarki), jednostka
+# trafia do etykiety kolumny. To udokumentowany preset `st.column_config.NumberColumn` zamiast
+# rozszerzenia printf (flaga ","); presety formatów istnieją tylko w nowszych wersjach Streamlit.
+FORMAT_PLN = "localized"
+FORMAT_GODZINY = "localized"
+FORMAT_PROCENT = "%.2f%%"
+# Krok kolumny wyznacza liczbę miejsc po przecinku presetu "localized" (bez kroku - do 3)
+KROKI_FORMATOW = {"localized": 1}
+
+
+def _z_jednostka(nazwa, jednostka):
+    """Dopisuje jednostkę do etykiety, także wewnątrz końcowego nawiasu ("Narzut (alokacja, PLN)")."""
+    return f"{nazwa[:-1]}, {jednostka})" if nazwa.endswith(")") else f"{nazwa} ({jednostka})"
+
+
+KOLUMNY_PLN_ROCZNE = (
+    "Łączny Przychód z Godzin Billable",
+    "Przychód z Kontraktów (z opóźnieniem)",
+    "CAŁKOWITY PRZYCHÓD FIRMY",
+    "Wynagrodzenia",
+    "Overhead",
+    "Koszty Rekrutacji",
+    "Łączne Koszty Operacyjne",
+    "ZYSK / STRATA OPERACYJNA (EBIT)",
+    "Skumulowany przepływ pieniężny",
+    "Narzut wspólny (alokacja)",
+)
+
+# Kolumna -> (etykieta albo None dla nazwy kolumny, format printf lub preset Streamlit)
+FORMATY_ROCZNE = {
+    "Rok": (None, "%d"),
+    "Konsultanci R1 (koniec roku)": ("Kons. R1", "%.0f"),
+    "Konsultanci R2 (koniec roku)": ("Kons. R2", "%.0f"),
+    "Konsultanci Full (koniec roku)": ("Kons. Full", "%.0f"),
+    "Łączna Liczba Konsultantów (koniec roku)": ("∑ Kons.", "%.0f"),
+    "Łącznie Kontrakty Pozyskane (szt.)": ("Kontrakty (szt.)", "%.1f"),
+    "MARŻA OPERACYJNA (%)": (None, FORMAT_PROCENT),
+    **{k: (_z_jednostka(k, "PLN"), FORMAT_PLN) for k in KOLUMNY_PLN_ROCZNE},
+}
+
+FORMATY_METRYK = {
+    **{k: (_z_jednostka(k, "godz."), FORMAT_GODZINY) for k in ('godziny_pracy_rocznie', 'godziny_na_rozwoj_admin', 'godziny_billable',
+                                                     'godziny_na_utrzymanie_projektow', 'godziny_na_sprzedaz')},
+    **{k: (_z_jednostka(k, "PLN"), FORMAT_PLN) for k in ('przychod_z_godzin_billable', 'potencjalny_przychod_z_kontraktow',
+                                               'koszt_wynagrodzenia', 'koszt_overheadu', 'calkowity_koszt_roczny_konsultanta',
+                                               'calkowity_przychod_potencjalny_konsultanta', 'zysk_strata_na_konsultancie_potencjalny')},
+    'liczba_wygenerowanych_leadow': (None, "%.1f szt."),
+    'liczba_pozyskanych_kontraktow': (None, "%.1f szt."),
+}
+
+# Miary podsumowania z `psmodel.store.PODSUMOWANIE`
+FORMATY_PODSUMOWANIA = {
+    'calkowite_koszty_rekrutacji': ("Koszty rekrutacji (PLN)", FORMAT_PLN),
+    'skumulowany_ebit': ("Skumulowany EBIT (PLN)", FORMAT_PLN),
+    'roi': ("ROI", "%.2f"),
+    'rok_zwrotu': ("Rok zwrotu", "%d"),
+    'ebit_ostatni_rok': ("EBIT (ostatni rok, PLN)", FORMAT_PLN),
+    'marza_ostatni_rok': ("Marża (ostatni rok)", FORMAT_PROCENT),
+    'nadwyzka_marzy': ("Nadwyżka marży", "%.3f"),
+}
+
+ROZMIAR_STRONY = 500
+MAKS_PUNKTOW_WYKRESU = 240
+
+
+def page_rows(kolejnosc_lub_liczba, numer_strony, rozmiar_strony=ROZMIAR_STRONY):
+    """Zwraca pozycje wierszy strony `numer_strony` (od 1) i liczbę stron.
+
+    Pierwszy argument to liczba wierszy albo tablica kolejności wierszy (np. z `np.argsort`).
+    """
+    kolejnosc = np.arange(kolejnosc_lub_liczba) if np.isscalar(kolejnosc_lub_liczba) else np.asarray(kolejnosc_lub_liczba)
+    liczba_stron = max(1, -(-len(kolejnosc) // rozmiar_strony))
+    numer_strony = min(max(int(numer_strony), 1), liczba_stron)
+    return kolejnosc[(numer_strony - 1) * rozmiar_strony:numer_strony * rozmiar_strony], liczba_stron
+
+
+def downsample_indices(serie, maks_punktow=MAKS_PUNKTOW_WYKRESU):
+    """Wybiera pozycje punktów do wykresu: dla każdego z przedziałów minimum i maksimum każdej serii.
+
+    `serie` to lista tablic tej samej długości. Zachowuje pierwszy i ostatni punkt; gdy punktów
+    jest nie więcej niż `maks_punktow`, zwraca wszystkie pozycje.
+    """
+    n = len(serie[0]) if serie else 0
+    if n <= maks_punktow:
+        return np.arange(n)
+    liczba_przedzialow = max(1, maks_punktow // (2 * len(serie)))
+    dlugosc = -(-n // liczba_przedzialow)
+    poczatki = np.arange(liczba_przedzialow) * dlugosc
+    wybrane = [np.array([0, n - 1])]
+    for seria in serie:
+        # Dopełnienie ostatnią wartością do pełnych przedziałów - pozycje dopełnienia sprowadzamy do n - 1
+        bloki = np.pad(np.asarray(seria, dtype=np.float64), (0, liczba_przedzialow * dlugosc - n), mode='edge')
+        bloki = bloki.reshape(liczba_przedzialow, dlugosc)
+        wybrane += [poczatki + bloki.argmin(axis=1), poczatki + bloki.argmax(axis=1)]
+    return np.unique(np.minimum(np.concatenate(wybrane), n - 1))
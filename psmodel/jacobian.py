@@ -0,0 +1,198 @@
+import numpy as np
+
+from psmodel.batch import KOLUMNY_ROCZNE, TYPY_KONSULTANTOW
+from psmodel.sensitivity import numeric_parameters
+
+# --- Analityczne pochodne modelu (tryb "forward" różniczkowania) ---
+#
+# Model jest złożeniem sum i iloczynów parametrów, więc każdą wielkość
+# pośrednią niesiemy razem z wektorem jej pochodnych cząstkowych po wszystkich
+# parametrach naraz. Jedno przejście daje dokładny jakobian wszystkich wyników
+# rocznych bez różnic skończonych. Obcięcia max(0, ...) różniczkujemy
+# przedziałami: poza obcięciem pochodna przechodzi bez zmian, przy obcięciu jest zerowa.
+
+
+class Dual:
+    """Wartość razem z wektorem pochodnych cząstkowych po parametrach wejściowych."""
+
+    __slots__ = ('v', 'd')
+
+    def __init__(self, v, d):
+        self.v = v
+        self.d = d
+
+    @staticmethod
+    def _jako_dual(x, wzor):
+        return x if isinstance(x, Dual) else Dual(x, np.zeros_like(wzor.d))
+
+    def __add__(self, inny):
+        inny = self._jako_dual(inny, self)
+        return Dual(self.v + inny.v, self.d + inny.d)
+
+    __radd__ = __add__
+
+    def __sub__(self, inny):
+        inny = self._jako_dual(inny, self)
+        return Dual(self.v - inny.v, self.d - inny.d)
+
+    def __rsub__(self, inny):
+        return self._jako_dual(inny, self) - self
+
+    def __mul__(self, inny):
+        if not isinstance(inny, Dual):
+            return Dual(self.v * inny, self.d * inny)
+        return Dual(self.v * inny.v, self.d * inny.v + inny.d * self.v)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, inny):
+        if not isinstance(inny, Dual):
+            return Dual(self.v / inny, self.d / inny)
+        return Dual(self.v / inny.v, (self.d * inny.v - inny.d * self.v) / (inny.v * inny.v))
+
+    def clamp_zero(self):
+        """max(0, x) różniczkowane przedziałami."""
+        return self if self.v > 0 else Dual(0.0, np.zeros_like(self.d))
+
+
+def _metrics_dual(x):
+    """Odpowiednik `calculate_consultant_annual_metrics` na liczbach dualnych."""
+    metrics = {}
+    godziny_pracy_rocznie_global = x['konsultant_godziny_pracy_miesiac'] * 12
+
+    for typ in TYPY_KONSULTANTOW:
+        m = {}
+        m['godziny_pracy_rocznie'] = godziny_pracy_rocznie_global
+        m['godziny_na_rozwoj_admin'] = m['godziny_pracy_rocznie'] * x['konsultant_procent_czasu_rozwoj_admin']
+
+        if typ == "R1":
+            efektywnosc_billable = x['rampup_efektywnosc_billable_rok1']
+            efektywnosc_sprzedaz = x['rampup_efektywnosc_sprzedaz_rok1']
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * 0
+        elif typ == "R2":
+            efektywnosc_billable = x['rampup_efektywnosc_billable_rok2']
+            efektywnosc_sprzedaz = x['rampup_efektywnosc_sprzedaz_rok2']
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
+                x['konsultant_procent_czasu_utrzymanie_projektow'] * 0.5
+        else:  # Full
+            efektywnosc_billable = 1.0
+            efektywnosc_sprzedaz = 1.0
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
+                x['konsultant_procent_czasu_utrzymanie_projektow']
+
+        m['godziny_billable'] = m['godziny_pracy_rocznie'] * \
+            x['konsultant_procent_czasu_billable_docelowy'] * efektywnosc_billable
+
+        if typ == "Full":
+            m['godziny_na_sprzedaz'] = m['godziny_pracy_rocznie'] * x['konsultant_procent_czasu_sprzedaz_docelowy']
+        else:  # Dla R1 i R2, czas na sprzedaż to reszta
+            m['godziny_na_sprzedaz'] = (m['godziny_pracy_rocznie'] - m['godziny_na_rozwoj_admin'] -
+                                        m['godziny_billable'] - m['godziny_na_utrzymanie_projektow']).clamp_zero()
+
+        m['przychod_z_godzin_billable'] = m['godziny_billable'] * x['konsultant_stawka_billable_godz']
+
+        m['liczba_wygenerowanych_leadow'] = x['sprzedaz_leady_rocznie_docelowo'] * efektywnosc_sprzedaz
+        m['liczba_pozyskanych_kontraktow'] = m['liczba_wygenerowanych_leadow'] * x['sprzedaz_wspolczynnik_konwersji']
+        m['potencjalny_przychod_z_kontraktow'] = m['liczba_pozyskanych_kontraktow'] * x['sprzedaz_srednia_wartosc_kontraktu']
+
+        m['koszt_wynagrodzenia'] = x['konsultant_wynagrodzenie_roczne']
+        m['koszt_overheadu'] = x['korporacyjne_overhead_roczny_na_konsultanta']
+        m['calkowity_koszt_roczny_konsultanta'] = m['koszt_wynagrodzenia'] + m['koszt_overheadu']
+
+        m['calkowity_przychod_potencjalny_konsultanta'] = m['przychod_z_godzin_billable'] + m['potencjalny_przychod_z_kontraktow']
+        m['zysk_strata_na_konsultancie_potencjalny'] = m['calkowity_przychod_potencjalny_konsultanta'] - m['calkowity_koszt_roczny_konsultanta']
+
+        metrics[typ] = m
+    return metrics
+
+
+def financial_model_jacobian(inputs_dict, parametry=None):
+    """Liczy wyniki roczne modelu i ich dokładne pochodne cząstkowe po parametrach w jednym przejściu.
+
+    Zwraca słownik z kluczami 'parametry', 'Rok', 'wartosci' (kolumna -> tablica (rok,))
+    oraz 'jakobian' (kolumna -> tablica (rok, parametr)); dodatkowo 'skumulowany_ebit_5lat' i 'roi'
+    oraz 'metryki' z pochodnymi metryk per typ konsultanta.
+    """
+    parametry = list(parametry) if parametry is not None else numeric_parameters(inputs_dict)
+    jednostkowe = np.eye(len(parametry))
+    x = {k: Dual(float(inputs_dict[k]), jednostkowe[i]) for i, k in enumerate(parametry)}
+    zero = np.zeros(len(parametry))
+    for k, v in inputs_dict.items():
+        if k not in x and k != 'konsultant_procent_czasu_sprzedaz_docelowy':
+            x[k] = Dual(float(v), zero)
+    # % czasu na sprzedaż zależy od pozostałych udziałów czasu (obcięcie w zerze jak w panelu bocznym)
+    x['konsultant_procent_czasu_sprzedaz_docelowy'] = (
+        1.0 - x['konsultant_procent_czasu_rozwoj_admin'] - x['konsultant_procent_czasu_billable_docelowy'] -
+        x['konsultant_procent_czasu_utrzymanie_projektow']).clamp_zero()
+
+    horyzont_lat = int(inputs_dict['model_horyzont_analizy_lata'])
+    plan_rekrutacji = [x.get(f'rekrutacja_rok{n}_nowi', Dual(0.0, zero)) for n in range(1, horyzont_lat + 1)]
+    metrics = _metrics_dual(x)
+
+    r1_poprzedni = r2_poprzedni = full_poprzedni = Dual(0.0, zero)
+    kontrakty_poprzedni_rok = Dual(0.0, zero)
+    skumulowany_przeplyw = Dual(0.0, zero)
+    koszty_rekrutacji_lacznie = Dual(0.0, zero)
+    roczne = {kolumna: [] for kolumna in KOLUMNY_ROCZNE}
+
+    for nowi in plan_rekrutacji:
+        r1, r2, full = nowi, r1_poprzedni, full_poprzedni + r2_poprzedni
+        r1_poprzedni, r2_poprzedni, full_poprzedni = r1, r2, full
+        laczna_liczba = r1 + r2 + full
+
+        przychod_billable = r1 * metrics["R1"]['przychod_z_godzin_billable'] + \
+            r2 * metrics["R2"]['przychod_z_godzin_billable'] + \
+            full * metrics["Full"]['przychod_z_godzin_billable']
+        kontrakty = r1 * metrics["R1"]['liczba_pozyskanych_kontraktow'] + \
+            r2 * metrics["R2"]['liczba_pozyskanych_kontraktow'] + \
+            full * metrics["Full"]['liczba_pozyskanych_kontraktow']
+        przychod_z_kontraktow = kontrakty_poprzedni_rok * x['sprzedaz_srednia_wartosc_kontraktu']
+        kontrakty_poprzedni_rok = kontrakty
+        calkowity_przychod = przychod_billable + przychod_z_kontraktow
+
+        wynagrodzenia = laczna_liczba * x['konsultant_wynagrodzenie_roczne']
+        overhead = laczna_liczba * x['korporacyjne_overhead_roczny_na_konsultanta']
+        koszty_rekrutacji = nowi * x['korporacyjne_koszt_rekrutacji_konsultanta']
+        koszty_rekrutacji_lacznie = koszty_rekrutacji_lacznie + koszty_rekrutacji
+        laczne_koszty = wynagrodzenia + overhead + koszty_rekrutacji
+
+        ebit = calkowity_przychod - laczne_koszty
+        # Marża = 0 przy zerowym przychodzie - tam również pochodna jest zerowa
+        marza = ebit / calkowity_przychod if calkowity_przychod.v != 0 else Dual(0.0, zero)
+        skumulowany_przeplyw = skumulowany_przeplyw + ebit
+
+        for kolumna, wartosc in zip(KOLUMNY_ROCZNE, (
+                r1, r2, full, laczna_liczba, przychod_billable, kontrakty, przychod_z_kontraktow,
+                calkowity_przychod, wynagrodzenia, overhead, koszty_rekrutacji, laczne_koszty,
+                ebit, marza * 100, skumulowany_przeplyw)):
+            roczne[kolumna].append(wartosc)
+
+    if koszty_rekrutacji_lacznie.v > 0:
+        roi = skumulowany_przeplyw / koszty_rekrutacji_lacznie
+    else:
+        roi = Dual(float('inf') if skumulowany_przeplyw.v > 0 else 0.0, zero)
+
+    wynik = {
+        'parametry': parametry,
+        'Rok': np.arange(1, horyzont_lat + 1),
+        'wartosci': {k: np.array([w.v for w in lista]) for k, lista in roczne.items()},
+        'jakobian': {k: np.array([w.d for w in lista]).reshape(horyzont_lat, len(parametry)) for k, lista in roczne.items()},
+    }
+    for klucz, wartosc in (('skumulowany_ebit_5lat', skumulowany_przeplyw), ('roi', roi)):
+        wynik['wartosci'][klucz] = wartosc.v
+        wynik['jakobian'][klucz] = wartosc.d
+    # Metryki per typ konsultanta: typ -> metryka -> (wartość, wektor pochodnych)
+    wynik['metryki'] = {typ: {k: (w.v, w.d) for k, w in m.items()} for typ, m in metrics.items()}
+    return wynik
+
+
+def elasticities(jakobian, inputs_dict, kolumna, rok=None):
+    """Zwraca elastyczności (∂y/∂x · x / y) wyniku `kolumna` w danym roku (domyślnie ostatnim) po parametrach."""
+    wartosc, pochodne = jakobian['wartosci'][kolumna], jakobian['jakobian'][kolumna]
+    if np.ndim(wartosc):
+        i_rok = (rok if rok is not None else len(wartosc)) - 1
+        wartosc, pochodne = wartosc[i_rok], pochodne[i_rok]
+    x = np.array([float(inputs_dict[k]) for k in jakobian['parametry']])
+    if wartosc == 0 or not np.isfinite(wartosc):
+        return np.full(len(x), np.nan)
+    return pochodne * x / wartosc
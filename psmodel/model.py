@@ -0,0 +1,327 @@
+# --- Rdzeń modelu biznesowego ---
+#
+# Skalarna ścieżka modelu bez zależności od Streamlit. Moduł nie importuje
+# NumPy ani pandas przy imporcie (pandas jest ładowany dopiero przy budowie
+# tabel wynikowych), dzięki czemu procesy robocze i krótkie zadania startują szybko.
+
+import json
+import math
+import re
+
+from psmodel.timing import stage, timed
+
+# Wersja semantyki modelu - zwiększ przy każdej zmianie wyników dla tych samych parametrów
+# (np. horyzont planu rekrutacji, silnik kohortowy, lejek kontraktów). Wchodzi do kluczy
+# pamięci podręcznej, więc wyniki zapisane na dysku przez starszy model nie są używane.
+WERSJA_MODELU = 3
+
+
+def get_default_inputs():
+    """Zwraca słownik z domyślnymi parametrami wejściowymi modelu."""
+    return {
+        # Parametry Konsultanta
+        'konsultant_godziny_pracy_miesiac': 150,
+        'konsultant_stawka_billable_godz': 500.0,
+        'konsultant_wynagrodzenie_roczne': 500000.0,
+        'konsultant_procent_czasu_rozwoj_admin': 0.05,
+        'konsultant_procent_czasu_billable_docelowy': 0.60,
+        'konsultant_procent_czasu_utrzymanie_projektow': 0.15,
+        # 'konsultant_procent_czasu_sprzedaz_docelowy' - obliczane dynamicznie
+
+        # Parametry Ramp-up
+        'rampup_dlugosc_lata': 2, # Silnik kohortowy; model roczny ma sztywno R1, R2, Full
+        'rampup_efektywnosc_billable_rok1': 0.25,
+        'rampup_efektywnosc_billable_rok2': 0.60,
+        'rampup_efektywnosc_sprzedaz_rok1': 0.10,
+        'rampup_efektywnosc_sprzedaz_rok2': 0.50,
+
+        # Parametry Sprzedażowe
+        'sprzedaz_leady_rocznie_docelowo': 6,
+        'sprzedaz_srednia_wartosc_kontraktu': 2000000.0,
+        'sprzedaz_cykl_sprzedazy_miesiace': 12, # Opóźnienie podpisania kontraktu (model roczny: zawsze 1 rok)
+        'sprzedaz_cykl_rozrzut_miesiace': 0, # Rozrzut cyklu sprzedaży (silnik kohortowy)
+        'sprzedaz_okres_realizacji_miesiace': 1, # Okres rozpoznawania przychodu z kontraktu (silnik kohortowy)
+        'sprzedaz_wspolczynnik_konwersji': 0.35,
+
+        # Parametry Korporacyjne
+        'korporacyjne_overhead_roczny_na_konsultanta': 120000.0,
+        'korporacyjne_koszt_rekrutacji_konsultanta': 100000.0,
+
+        # Cele Firmy (do porównania)
+        'cel_marza_operacyjna': 0.15,
+        'cel_liczba_konsultantow_docelowa': 7, # Informacyjnie
+        'cel_obrot_roczny_aspiracja': 100000000.0, # Informacyjnie
+
+        # Parametry Modelu
+        'model_horyzont_analizy_lata': 5,
+
+        # Plan Rekrutacji (Nowi Konsultanci w Roku)
+        'rekrutacja_rok1_nowi': 2,
+        'rekrutacja_rok2_nowi': 2,
+        'rekrutacja_rok3_nowi': 3,
+        'rekrutacja_rok4_nowi': 0,
+        'rekrutacja_rok5_nowi': 0,
+    }
+
+
+def complete_inputs(scenariusz):
+    """Uzupełnia scenariusz wartościami domyślnymi i wylicza % czasu na sprzedaż (jak panel boczny).
+
+    Lata horyzontu bez `rekrutacja_rokN_nowi` dostają 0 nowych osób, więc uzupełnione
+    scenariusze o tym samym horyzoncie mają zawsze ten sam zestaw kluczy.
+    """
+    inputs_dict = {**get_default_inputs(), **scenariusz}
+    for n in range(1, int(inputs_dict['model_horyzont_analizy_lata']) + 1):
+        inputs_dict.setdefault(f'rekrutacja_rok{n}_nowi', 0)
+    if 'konsultant_procent_czasu_sprzedaz_docelowy' not in scenariusz:
+        inputs_dict['konsultant_procent_czasu_sprzedaz_docelowy'] = max(0, 1.0 - inputs_dict['konsultant_procent_czasu_rozwoj_admin'] -
+                                                                         inputs_dict['konsultant_procent_czasu_billable_docelowy'] -
+                                                                         inputs_dict['konsultant_procent_czasu_utrzymanie_projektow'])
+    return inputs_dict
+
+
+# --- Scenariusze z plików i żądań (CLI, usługa HTTP, portfel) ---
+
+KOLUMNA_ID = 'id'
+WZOR_REKRUTACJI = re.compile(r'rekrutacja_rok\d+_nowi$')
+PARAMETR_POCHODNY = 'konsultant_procent_czasu_sprzedaz_docelowy'
+
+
+def _check_keys(scenariusz, numer):
+    znane = get_default_inputs()
+    nieznane = [k for k in scenariusz
+                if k not in znane and k not in (KOLUMNA_ID, PARAMETR_POCHODNY) and not WZOR_REKRUTACJI.match(k)]
+    if nieznane:
+        raise ValueError(f"Scenariusz {numer}: nieznane parametry {', '.join(sorted(nieznane))}.")
+
+
+def parse_scenario(wiersz, numer):
+    """Sprawdza klucze scenariusza i zamienia wartości na liczby (poza 'id'); `numer` służy do komunikatów i domyślnego id."""
+    if not isinstance(wiersz, dict):
+        raise ValueError(f"Scenariusz {numer}: oczekiwano obiektu z parametrami.")
+    _check_keys(wiersz, numer)
+    scenariusz = {}
+    for k, v in wiersz.items():
+        if k == KOLUMNA_ID:
+            scenariusz[k] = v
+            continue
+        # JSON null, listy, obiekty i wartości logiczne nie są liczbami parametrów
+        if isinstance(v, bool) or not isinstance(v, (int, float, str)):
+            raise ValueError(f"Scenariusz {numer}: parametr {k} musi być liczbą, otrzymano {json.dumps(v)}.")
+        try:
+            scenariusz[k] = float(v)
+        except ValueError:
+            raise ValueError(f"Scenariusz {numer}: parametr {k} musi być liczbą, otrzymano {v!r}.") from None
+        if not math.isfinite(scenariusz[k]):
+            raise ValueError(f"Scenariusz {numer}: parametr {k} musi być skończoną liczbą, otrzymano {v!r}.")
+    scenariusz.setdefault(KOLUMNA_ID, str(numer))
+    if 'model_horyzont_analizy_lata' in scenariusz:
+        horyzont = scenariusz['model_horyzont_analizy_lata']
+        if horyzont != int(horyzont) or horyzont < 1:
+            raise ValueError(f"Scenariusz {numer}: horyzont analizy musi być dodatnią liczbą całkowitą lat, "
+                             f"otrzymano {wiersz['model_horyzont_analizy_lata']!r}.")
+        scenariusz['model_horyzont_analizy_lata'] = int(horyzont)
+    return scenariusz
+
+
+def payback_period_text(rok_zwrotu, horyzont_lat):
+    """Opis okresu zwrotu do podsumowania; `rok_zwrotu` = 0 oznacza brak zwrotu w horyzoncie."""
+    if rok_zwrotu:
+        return f"W {rok_zwrotu} roku"
+    return f"Brak zwrotu w ciągu {'1 roku' if horyzont_lat == 1 else f'{horyzont_lat} lat'}"
+
+
+@timed('metryki')
+def calculate_consultant_annual_metrics(inputs_dict):
+    """Oblicza roczne metryki dla każdego typu konsultanta (R1, R2, Full)."""
+    metrics = {}
+    godziny_pracy_rocznie_global = inputs_dict['konsultant_godziny_pracy_miesiac'] * 12
+
+    for typ in ["R1", "R2", "Full"]:
+        m = {}
+        m['godziny_pracy_rocznie'] = godziny_pracy_rocznie_global
+        m['godziny_na_rozwoj_admin'] = m['godziny_pracy_rocznie'] * inputs_dict['konsultant_procent_czasu_rozwoj_admin']
+
+        if typ == "R1":
+            efektywnosc_billable = inputs_dict['rampup_efektywnosc_billable_rok1']
+            efektywnosc_sprzedaz = inputs_dict['rampup_efektywnosc_sprzedaz_rok1']
+            m['godziny_na_utrzymanie_projektow'] = 0 # Założenie
+        elif typ == "R2":
+            efektywnosc_billable = inputs_dict['rampup_efektywnosc_billable_rok2']
+            efektywnosc_sprzedaz = inputs_dict['rampup_efektywnosc_sprzedaz_rok2']
+            # Założenie: R2 poświęca połowę docelowego czasu na utrzymanie
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
+                                                inputs_dict['konsultant_procent_czasu_utrzymanie_projektow'] * 0.5
+        else: # Full
+            efektywnosc_billable = 1.0
+            efektywnosc_sprzedaz = 1.0
+            m['godziny_na_utrzymanie_projektow'] = m['godziny_pracy_rocznie'] * \
+                                                inputs_dict['konsultant_procent_czasu_utrzymanie_projektow']
+
+        m['godziny_billable'] = m['godziny_pracy_rocznie'] * \
+                                inputs_dict['konsultant_procent_czasu_billable_docelowy'] * efektywnosc_billable
+        
+        if typ == "Full":
+             m['godziny_na_sprzedaz'] = m['godziny_pracy_rocznie'] * \
+                                       inputs_dict['konsultant_procent_czasu_sprzedaz_docelowy']
+        else: # Dla R1 i R2, czas na sprzedaż to reszta
+            m['godziny_na_sprzedaz'] = m['godziny_pracy_rocznie'] - m['godziny_na_rozwoj_admin'] - \
+                                     m['godziny_billable'] - m['godziny_na_utrzymanie_projektow']
+            if m['godziny_na_sprzedaz'] < 0: m['godziny_na_sprzedaz'] = 0
+
+
+        m['przychod_z_godzin_billable'] = m['godziny_billable'] * inputs_dict['konsultant_stawka_billable_godz']
+        
+        m['liczba_wygenerowanych_leadow'] = inputs_dict['sprzedaz_leady_rocznie_docelowo'] * efektywnosc_sprzedaz
+        m['liczba_pozyskanych_kontraktow'] = m['liczba_wygenerowanych_leadow'] * inputs_dict['sprzedaz_wspolczynnik_konwersji']
+        m['potencjalny_przychod_z_kontraktow'] = m['liczba_pozyskanych_kontraktow'] * inputs_dict['sprzedaz_srednia_wartosc_kontraktu']
+        
+        m['koszt_wynagrodzenia'] = inputs_dict['konsultant_wynagrodzenie_roczne']
+        m['koszt_overheadu'] = inputs_dict['korporacyjne_overhead_roczny_na_konsultanta']
+        m['calkowity_koszt_roczny_konsultanta'] = m['koszt_wynagrodzenia'] + m['koszt_overheadu']
+        
+        m['calkowity_przychod_potencjalny_konsultanta'] = m['przychod_z_godzin_billable'] + m['potencjalny_przychod_z_kontraktow']
+        m['zysk_strata_na_konsultancie_potencjalny'] = m['calkowity_przychod_potencjalny_konsultanta'] - m['calkowity_koszt_roczny_konsultanta']
+        
+        metrics[typ] = m
+    return metrics
+
+
+@timed('symulacja')
+def run_financial_model_records(inputs_dict, metrics=None):
+    """Uruchamia roczną symulację finansową w horyzoncie `model_horyzont_analizy_lata` bez pandas.
+
+    `metrics` to opcjonalnie wcześniej policzony wynik `calculate_consultant_annual_metrics`.
+    Zwraca listę słowników z wynikami rocznymi, podsumowanie ROI i metryki per typ konsultanta.
+    """
+    
+    horyzont_lat = inputs_dict['model_horyzont_analizy_lata']
+    # Lata bez podanego planu rekrutacji nie mają nowych konsultantów
+    plan_rekrutacji = [inputs_dict.get(f'rekrutacja_rok{n}_nowi', 0) for n in range(1, horyzont_lat + 1)]
+
+    # Oblicz metryki roczne per typ konsultanta raz
+    metrics_per_consultant_type = metrics if metrics is not None else calculate_consultant_annual_metrics(inputs_dict)
+
+    # Inicjalizacja stanów
+    konsultanci_r1_poprzedni_rok = 0
+    konsultanci_r2_poprzedni_rok = 0
+    konsultanci_full_poprzedni_rok = 0
+    
+    kontrakty_pozyskane_lacznie_poprzedni_rok = 0
+    skumulowany_przeplyw_pieniezny = 0
+    
+    roczne_wyniki_lista = []
+    calkowite_koszty_rekrutacji_do_roi = 0
+
+    for i_rok in range(horyzont_lat):
+        rok_kalendarzowy = i_rok + 1
+        wyniki_biezacego_roku = {"Rok": rok_kalendarzowy}
+
+        # --- Liczba Konsultantów ---
+        nowi_w_roku = plan_rekrutacji[i_rok]
+        
+        przechodzacy_do_r2 = konsultanci_r1_poprzedni_rok
+        przechodzacy_do_full = konsultanci_r2_poprzedni_rok
+        
+        biezacy_r1_eoy = nowi_w_roku
+        biezacy_r2_eoy = przechodzacy_do_r2
+        biezacy_full_eoy = konsultanci_full_poprzedni_rok + przechodzacy_do_full
+        
+        wyniki_biezacego_roku["Konsultanci R1 (koniec roku)"] = biezacy_r1_eoy
+        wyniki_biezacego_roku["Konsultanci R2 (koniec roku)"] = biezacy_r2_eoy
+        wyniki_biezacego_roku["Konsultanci Full (koniec roku)"] = biezacy_full_eoy
+        laczna_liczba_konsultantow_eoy = biezacy_r1_eoy + biezacy_r2_eoy + biezacy_full_eoy
+        wyniki_biezacego_roku["Łączna Liczba Konsultantów (koniec roku)"] = laczna_liczba_konsultantow_eoy
+
+        # Aktualizacja stanu na następny rok
+        konsultanci_r1_poprzedni_rok = biezacy_r1_eoy
+        konsultanci_r2_poprzedni_rok = biezacy_r2_eoy
+        konsultanci_full_poprzedni_rok = biezacy_full_eoy
+
+        # --- Przychody ---
+        przychod_billable_r1 = biezacy_r1_eoy * metrics_per_consultant_type["R1"]['przychod_z_godzin_billable']
+        przychod_billable_r2 = biezacy_r2_eoy * metrics_per_consultant_type["R2"]['przychod_z_godzin_billable']
+        przychod_billable_full = biezacy_full_eoy * metrics_per_consultant_type["Full"]['przychod_z_godzin_billable']
+        laczny_przychod_billable = przychod_billable_r1 + przychod_billable_r2 + przychod_billable_full
+        wyniki_biezacego_roku["Łączny Przychód z Godzin Billable"] = laczny_przychod_billable
+
+        kontrakty_pozyskane_r1_w_roku = biezacy_r1_eoy * metrics_per_consultant_type["R1"]['liczba_pozyskanych_kontraktow']
+        kontrakty_pozyskane_r2_w_roku = biezacy_r2_eoy * metrics_per_consultant_type["R2"]['liczba_pozyskanych_kontraktow']
+        kontrakty_pozyskane_full_w_roku = biezacy_full_eoy * metrics_per_consultant_type["Full"]['liczba_pozyskanych_kontraktow']
+        lacznie_kontrakty_pozyskane_biezacy_rok = kontrakty_pozyskane_r1_w_roku + kontrakty_pozyskane_r2_w_roku + kontrakty_pozyskane_full_w_roku
+        wyniki_biezacego_roku["Łącznie Kontrakty Pozyskane (szt.)"] = lacznie_kontrakty_pozyskane_biezacy_rok
+        
+        przychod_z_kontraktow_w_roku = kontrakty_pozyskane_lacznie_poprzedni_rok * inputs_dict['sprzedaz_srednia_wartosc_kontraktu']
+        wyniki_biezacego_roku["Przychód z Kontraktów (z opóźnieniem)"] = przychod_z_kontraktow_w_roku
+        
+        kontrakty_pozyskane_lacznie_poprzedni_rok = lacznie_kontrakty_pozyskane_biezacy_rok # Na następny rok
+
+        calkowity_przychod_firmy = laczny_przychod_billable + przychod_z_kontraktow_w_roku
+        wyniki_biezacego_roku["CAŁKOWITY PRZYCHÓD FIRMY"] = calkowity_przychod_firmy
+
+        # --- Koszty ---
+        wynagrodzenia = laczna_liczba_konsultantow_eoy * inputs_dict['konsultant_wynagrodzenie_roczne']
+        wyniki_biezacego_roku["Wynagrodzenia"] = wynagrodzenia
+        
+        overhead = laczna_liczba_konsultantow_eoy * inputs_dict['korporacyjne_overhead_roczny_na_konsultanta']
+        wyniki_biezacego_roku["Overhead"] = overhead
+        
+        koszty_rekrutacji = nowi_w_roku * inputs_dict['korporacyjne_koszt_rekrutacji_konsultanta']
+        wyniki_biezacego_roku["Koszty Rekrutacji"] = koszty_rekrutacji
+        calkowite_koszty_rekrutacji_do_roi += koszty_rekrutacji
+        
+        laczne_koszty_operacyjne = wynagrodzenia + overhead + koszty_rekrutacji
+        wyniki_biezacego_roku["Łączne Koszty Operacyjne"] = laczne_koszty_operacyjne
+
+        # --- Rentowność ---
+        ebit = calkowity_przychod_firmy - laczne_koszty_operacyjne
+        wyniki_biezacego_roku["ZYSK / STRATA OPERACYJNA (EBIT)"] = ebit
+        
+        marza_operacyjna = ebit / calkowity_przychod_firmy if calkowity_przychod_firmy != 0 else 0
+        wyniki_biezacego_roku["MARŻA OPERACYJNA (%)"] = marza_operacyjna * 100 # Procenty
+
+        # --- Przepływy ---
+        skumulowany_przeplyw_pieniezny += ebit
+        wyniki_biezacego_roku["Skumulowany przepływ pieniężny"] = skumulowany_przeplyw_pieniezny
+        
+        roczne_wyniki_lista.append(wyniki_biezacego_roku)
+
+    # --- Podsumowanie ROI ---
+    # Klucze '_5lat' zachowują historyczne nazwy (CLI, usługa HTTP, pamięć podręczna),
+    # ale obejmują cały wybrany horyzont analizy.
+    roi_summary = {}
+    roi_summary['calkowite_koszty_rekrutacji_5lat'] = calkowite_koszty_rekrutacji_do_roi
+    roi_summary['skumulowany_ebit_5lat'] = skumulowany_przeplyw_pieniezny
+    
+    if calkowite_koszty_rekrutacji_do_roi > 0:
+        roi_summary['roi'] = skumulowany_przeplyw_pieniezny / calkowite_koszty_rekrutacji_do_roi
+    else:
+        roi_summary['roi'] = float('inf') if skumulowany_przeplyw_pieniezny > 0 else 0
+
+    rok_zwrotu = 0
+    for i, rok_dane in enumerate(roczne_wyniki_lista):
+        if rok_dane["Skumulowany przepływ pieniężny"] > 0:
+            # Prosta wersja - rok, w którym po raz pierwszy jest dodatni
+            rok_zwrotu = rok_dane['Rok']
+            # TODO: Dokładniejsza interpolacja, jeśli potrzebna
+            break
+    roi_summary['payback_period_display'] = payback_period_text(rok_zwrotu, len(roczne_wyniki_lista))
+    
+    return roczne_wyniki_lista, roi_summary, metrics_per_consultant_type
+
+
+def run_financial_model(inputs_dict, metrics=None):
+    """Uruchamia roczną symulację finansową w horyzoncie `model_horyzont_analizy_lata`.
+
+    `metrics` to opcjonalnie wcześniej policzony wynik `calculate_consultant_annual_metrics`.
+    """
+    roczne_wyniki_lista, roi_summary, metrics_per_consultant_type = run_financial_model_records(inputs_dict, metrics)
+
+    # Konwersja na DataFrame (pandas ładowany dopiero tutaj)
+    with stage('tabele'):
+        import pandas as pd
+        roczne_wyniki_df = pd.DataFrame(roczne_wyniki_lista)
+        # Konwersja metryk konsultantów na DataFrame
+        detailed_consultant_metrics_df = pd.DataFrame(metrics_per_consultant_type).T # Transpozycja dla lepszego widoku
+    
+    return roczne_wyniki_df, roi_summary, detailed_consultant_metrics_df
@@ -0,0 +1,242 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from psmodel.batch import PARAMETRY_UDZIALOWE, input_columns
+from psmodel.cohort import run_model_batch
+
+# --- Symulacja Monte Carlo ze strumieniową agregacją wyników ---
+#
+# Losowania są liczone paczkami przez silnik wsadowy, a wyniki każdej paczki
+# trafiają do histogramów o stałych przedziałach. Pamięć zależy więc tylko od
+# rozmiaru paczki i liczby przedziałów, a nie od łącznej liczby losowań.
+# Każda paczka ma własne ziarno (SeedSequence.spawn), więc wynik nie zależy
+# od liczby procesów ani kolejności ich zakończenia.
+
+KOLUMNA_EBIT = "ZYSK / STRATA OPERACYJNA (EBIT)"
+KOLUMNA_PRZEPLYW = "Skumulowany przepływ pieniężny"
+KOLUMNA_MARZA = "MARŻA OPERACYJNA (%)"
+
+DOMYSLNE_PERCENTYLE = (5, 25, 50, 75, 95)
+
+# Parametry, których niepewność modelujemy domyślnie
+PARAMETRY_NIEPEWNE = (
+    'sprzedaz_leady_rocznie_docelowo',
+    'sprzedaz_wspolczynnik_konwersji',
+    'sprzedaz_srednia_wartosc_kontraktu',
+    'rampup_efektywnosc_billable_rok1',
+    'rampup_efektywnosc_billable_rok2',
+    'rampup_efektywnosc_sprzedaz_rok1',
+    'rampup_efektywnosc_sprzedaz_rok2',
+)
+
+
+def default_distributions(inputs_dict, rozrzut=0.2, klucze=PARAMETRY_NIEPEWNE):
+    """Zwraca rozkłady trójkątne ±rozrzut wokół bieżących wartości wybranych parametrów."""
+    rozklady = {}
+    for klucz in klucze:
+        wartosc = float(inputs_dict[klucz])
+        dol, gora = wartosc * (1 - rozrzut), wartosc * (1 + rozrzut)
+        if klucz in PARAMETRY_UDZIALOWE:
+            gora = min(gora, 1.0)
+        rozklady[klucz] = ('triangular', max(dol, 0.0), wartosc, max(gora, wartosc))
+    return rozklady
+
+
+def _losuj(rozklad, n, rng):
+    """Losuje n wartości z rozkładu opisanego krotką (nazwa, *parametry)."""
+    nazwa, *parametry = rozklad
+    if nazwa == 'triangular':
+        dol, moda, gora = parametry
+        if dol == gora:
+            return np.full(n, float(moda))
+        return rng.triangular(dol, moda, gora, n)
+    if nazwa == 'uniform':
+        return rng.uniform(*parametry, n)
+    if nazwa == 'normal':
+        return rng.normal(*parametry, n)
+    if nazwa == 'lognormal':  # parametry: mediana, sigma logarytmu
+        mediana, sigma = parametry
+        return mediana * np.exp(rng.normal(0.0, sigma, n))
+    if nazwa == 'poisson':
+        return rng.poisson(*parametry, n).astype(np.float64)
+    raise ValueError(f"Nieznany rozkład: {nazwa}")
+
+
+def draw_scenarios(inputs_dict, rozklady, n, rng):
+    """Zwraca słownik kolumn n losowych scenariuszy (parametry bez rozkładu pozostają stałe)."""
+    kolumny = {k: np.broadcast_to(np.float64(v), (n,)) for k, v in inputs_dict.items() if k not in rozklady}
+    if PARAMETRY_UDZIALOWE.intersection(rozklady):
+        # % czasu na sprzedaż zostanie wyliczony ponownie z wylosowanych udziałów
+        kolumny.pop('konsultant_procent_czasu_sprzedaz_docelowy', None)
+    for klucz, rozklad in rozklady.items():
+        proba = np.maximum(_losuj(rozklad, n, rng), 0.0)
+        if klucz in PARAMETRY_UDZIALOWE:
+            np.minimum(proba, 1.0, out=proba)
+        kolumny[klucz] = proba
+    return input_columns(kolumny)
+
+
+class StreamingHistogram:
+    """Histogram o stałych przedziałach (osobno dla każdego roku) z przedziałami na wartości spoza zakresu."""
+
+    def __init__(self, krawedzie):
+        self.krawedzie = np.asarray(krawedzie, dtype=np.float64)  # (rok, liczba_przedzialow + 1)
+        horyzont, k = self.krawedzie.shape
+        self.liczebnosci = np.zeros((horyzont, k + 1), dtype=np.int64)  # +1: niedomiar i nadmiar
+        self.minimum = np.full(horyzont, np.inf)
+        self.maksimum = np.full(horyzont, -np.inf)
+
+    def update(self, wartosci):
+        horyzont, k = self.krawedzie.shape
+        dol, gora = self.krawedzie[:, :1], self.krawedzie[:, -1:]
+        szerokosc = (gora - dol) / (k - 1)
+        indeksy = np.floor((wartosci.T - dol) / szerokosc).astype(np.int64) + 1
+        np.clip(indeksy, 0, k, out=indeksy)
+        indeksy += (np.arange(horyzont) * (k + 1))[:, None]
+        self.liczebnosci += np.bincount(indeksy.ravel(), minlength=horyzont * (k + 1)).reshape(horyzont, k + 1)
+        np.minimum(self.minimum, wartosci.min(axis=0), out=self.minimum)
+        np.maximum(self.maksimum, wartosci.max(axis=0), out=self.maksimum)
+
+    def merge(self, inny):
+        self.liczebnosci += inny.liczebnosci
+        np.minimum(self.minimum, inny.minimum, out=self.minimum)
+        np.maximum(self.maksimum, inny.maksimum, out=self.maksimum)
+
+    def percentiles(self, percentyle):
+        """Zwraca przybliżone percentyle (percentyl, rok) przez interpolację liniową wewnątrz przedziałów."""
+        horyzont, k = self.krawedzie.shape
+        # Granice wszystkich przedziałów łącznie z niedomiarem [min, e0] i nadmiarem [eK, max]
+        granice = np.concatenate([np.minimum(self.minimum, self.krawedzie[:, 0])[:, None], self.krawedzie,
+                                  np.maximum(self.maksimum, self.krawedzie[:, -1])[:, None]], axis=1)
+        skumulowane = np.cumsum(self.liczebnosci, axis=1)
+        wynik = np.empty((len(percentyle), horyzont))
+        for i_rok in range(horyzont):
+            n = skumulowane[i_rok, -1]
+            if n == 0:
+                wynik[:, i_rok] = np.nan
+                continue
+            cdf = np.concatenate([[0.0], skumulowane[i_rok] / n])
+            wynik[:, i_rok] = np.interp(np.asarray(percentyle) / 100.0, cdf, granice[i_rok])
+        return wynik
+
+
+class MonteCarloAggregator:
+    """Bieżące agregaty wyników Monte Carlo - rozmiar niezależny od liczby losowań."""
+
+    def __init__(self, krawedzie_ebit, krawedzie_przeplyw):
+        horyzont = len(krawedzie_ebit)
+        self.liczba_losowan = 0
+        self.ebit = StreamingHistogram(krawedzie_ebit)
+        self.przeplyw = StreamingHistogram(krawedzie_przeplyw)
+        self.suma_ebit = np.zeros(horyzont)
+        self.suma_przeplyw = np.zeros(horyzont)
+        self.lata_zwrotu = np.zeros(horyzont + 1, dtype=np.int64)  # indeks 0 = brak zwrotu
+        self.cel_marzy_osiagniety = np.zeros(horyzont, dtype=np.int64)
+
+    def update(self, wyniki, cel_marza):
+        ebit = wyniki[KOLUMNA_EBIT]
+        przeplyw = wyniki[KOLUMNA_PRZEPLYW]
+        self.liczba_losowan += len(ebit)
+        self.ebit.update(ebit)
+        self.przeplyw.update(przeplyw)
+        self.suma_ebit += ebit.sum(axis=0)
+        self.suma_przeplyw += przeplyw.sum(axis=0)
+        self.lata_zwrotu += np.bincount(wyniki['rok_zwrotu'], minlength=len(self.lata_zwrotu))
+        self.cel_marzy_osiagniety += (wyniki[KOLUMNA_MARZA] >= cel_marza[:, None] * 100).sum(axis=0)
+
+    def merge(self, inny):
+        self.liczba_losowan += inny.liczba_losowan
+        self.ebit.merge(inny.ebit)
+        self.przeplyw.merge(inny.przeplyw)
+        self.suma_ebit += inny.suma_ebit
+        self.suma_przeplyw += inny.suma_przeplyw
+        self.lata_zwrotu += inny.lata_zwrotu
+        self.cel_marzy_osiagniety += inny.cel_marzy_osiagniety
+
+    def summary(self, percentyle=DOMYSLNE_PERCENTYLE):
+        n = max(self.liczba_losowan, 1)
+        return {
+            'liczba_losowan': self.liczba_losowan,
+            'Rok': np.arange(1, len(self.suma_ebit) + 1),
+            'percentyle': tuple(percentyle),
+            'ebit_percentyle': self.ebit.percentiles(percentyle),
+            'przeplyw_percentyle': self.przeplyw.percentiles(percentyle),
+            'ebit_srednia': self.suma_ebit / n,
+            'przeplyw_srednia': self.suma_przeplyw / n,
+            # P(zwrot najpóźniej w roku N)
+            'prawdopodobienstwo_zwrotu': np.cumsum(self.lata_zwrotu[1:]) / n,
+            # P(marża w roku N >= cel_marza_operacyjna)
+            'prawdopodobienstwo_celu_marzy': self.cel_marzy_osiagniety / n,
+        }
+
+
+def _bin_edges(wartosci, liczba_przedzialow):
+    """Wyznacza stałe krawędzie przedziałów (rok, k+1) na podstawie paczki pilotażowej z marginesem."""
+    dol, gora = wartosci.min(axis=0), wartosci.max(axis=0)
+    margines = np.maximum((gora - dol) * 0.25, np.maximum(np.abs(dol), np.abs(gora)) * 1e-6 + 1.0)
+    return np.linspace(dol - margines, gora + margines, liczba_przedzialow + 1).T
+
+
+def _simulate_chunk(inputs_dict, rozklady, n, ziarno, krawedzie_ebit, krawedzie_przeplyw, krok_kohortowy=None):
+    rng = np.random.default_rng(ziarno)
+    kolumny = draw_scenarios(inputs_dict, rozklady, n, rng)
+    wyniki = run_model_batch(kolumny, krok_kohortowy)
+    agregator = MonteCarloAggregator(krawedzie_ebit, krawedzie_przeplyw)
+    agregator.update(wyniki, kolumny['cel_marza_operacyjna'])
+    return agregator
+
+
+def run_monte_carlo(inputs_dict, rozklady, liczba_losowan, rozmiar_paczki=50_000, seed=0,
+                    procesy=None, liczba_przedzialow=2000, percentyle=DOMYSLNE_PERCENTYLE, krok_kohortowy=None):
+    """Uruchamia symulację Monte Carlo modelu i zwraca zagregowane wyniki (percentyle, prawdopodobieństwa).
+
+    `rozklady` mapuje klucz z `get_default_inputs()` na krotkę rozkładu, np. ('triangular', 4, 6, 9).
+    `krok_kohortowy` ("roczny" lub "miesieczny") liczy losowania silnikiem kohortowym zamiast modelu rocznego.
+    Wynik jest powtarzalny dla danego `seed` i `rozmiar_paczki` niezależnie od liczby procesów.
+
+    Krawędzie histogramów są wyznaczane raz, z paczki pilotażowej, z marginesem 25% zakresu.
+    Losowania spoza tego zakresu trafiają do przedziałów niedomiaru/nadmiaru (interpolowanych
+    do faktycznego minimum/maksimum), więc skrajne percentyle przy dużej liczbie losowań
+    i małej paczce są przybliżone mniej dokładnie niż środek rozkładu.
+    """
+    if liczba_losowan <= 0:
+        raise ValueError("Liczba losowań musi być dodatnia.")
+    if rozmiar_paczki <= 0:
+        raise ValueError("Rozmiar paczki musi być dodatni.")
+    rozmiary = [rozmiar_paczki] * (liczba_losowan // rozmiar_paczki)
+    if liczba_losowan % rozmiar_paczki:
+        rozmiary.append(liczba_losowan % rozmiar_paczki)
+    ziarna = np.random.SeedSequence(seed).spawn(len(rozmiary))
+
+    # Paczka pilotażowa (pierwsza) wyznacza zakresy histogramów i od razu wchodzi do wyniku
+    rng = np.random.default_rng(ziarna[0])
+    kolumny = draw_scenarios(inputs_dict, rozklady, rozmiary[0], rng)
+    wyniki = run_model_batch(kolumny, krok_kohortowy)
+    krawedzie_ebit = _bin_edges(wyniki[KOLUMNA_EBIT], liczba_przedzialow)
+    krawedzie_przeplyw = _bin_edges(wyniki[KOLUMNA_PRZEPLYW], liczba_przedzialow)
+    agregator = MonteCarloAggregator(krawedzie_ebit, krawedzie_przeplyw)
+    agregator.update(wyniki, kolumny['cel_marza_operacyjna'])
+    del kolumny, wyniki
+
+    zadania = [(inputs_dict, rozklady, n, ziarno, krawedzie_ebit, krawedzie_przeplyw, krok_kohortowy)
+               for n, ziarno in zip(rozmiary[1:], ziarna[1:])]
+    procesy = procesy or os.cpu_count() or 1
+    if procesy == 1 or len(zadania) <= 1:
+        for zadanie in zadania:
+            agregator.merge(_simulate_chunk(*zadanie))
+    else:
+        # Ograniczona liczba zadań w locie utrzymuje stałe zużycie pamięci;
+        # łączenie w kolejności paczek daje powtarzalne sumy zmiennoprzecinkowe.
+        with ProcessPoolExecutor(max_workers=procesy) as pula:
+            w_locie = deque()
+            for zadanie in zadania:
+                w_locie.append(pula.submit(_simulate_chunk, *zadanie))
+                if len(w_locie) >= 2 * procesy:
+                    agregator.merge(w_locie.popleft().result())
+            while w_locie:
+                agregator.merge(w_locie.popleft().result())
+
+    return agregator.summary(percentyle)
@@ -0,0 +1,136 @@
+import numpy as np
+
+from psmodel.batch import run_financial_model_batch
+
+# --- Optymalizacja planu rekrutacji względem celów firmy ---
+#
+# Przy ustalonych pozostałych parametrach wszystkie wyniki roczne modelu są
+# liniowe względem planu rekrutacji (zerowy plan daje zerowe wyniki). Wystarczy
+# więc jedno wsadowe uruchomienie z planami jednostkowymi, aby poznać wkład
+# jednej osoby zatrudnionej w roku k w każdy wynik. Przeszukiwanie idzie rok po
+# roku i przenosi stan prefiksu planu (sumy częściowe kosztów, przychodu, marży
+# i EBIT) zamiast liczyć model od roku 1. Wkład kolejnych lat nie zależy od
+# prefiksu, więc stan, który nie może spełnić celów albo jest zdominowany przez
+# inny stan (nie droższy, a przy tym nie gorszy w przychodzie, marży i EBIT), jest
+# odrzucany od razu - liczba stanów rośnie wolno nawet dla długich horyzontów.
+#
+# Przeszukiwanie w głąb (podział i ograniczenia) odcina gałąź dopiero wtedy, gdy
+# front zawiera już lepszy plan, i odwiedza każdy prefiks osobno, więc przy
+# dłuższych horyzontach liczba węzłów rośnie jak 11^horyzont. Stany prefiksu są
+# przeszukiwane wszerz i przycinane po każdym roku; węzłem jest tu stan prefiksu.
+
+KOLUMNA_PRZYCHOD = "CAŁKOWITY PRZYCHÓD FIRMY"
+KOLUMNA_EBIT = "ZYSK / STRATA OPERACYJNA (EBIT)"
+
+TOLERANCJA = 1e-6
+
+
+def _unit_contributions(inputs_dict, horyzont_lat):
+    """Zwraca wkład jednej osoby zatrudnionej w roku k w wyniki (tablice indeksowane rokiem zatrudnienia)."""
+    kolumny = {k: np.full(horyzont_lat, float(v)) for k, v in inputs_dict.items()
+               if k != 'konsultant_procent_czasu_sprzedaz_docelowy'}
+    for n in range(1, horyzont_lat + 1):
+        kolumny[f'rekrutacja_rok{n}_nowi'] = (np.arange(horyzont_lat) == n - 1).astype(np.float64)
+    wyniki = run_financial_model_batch(kolumny)
+    return {
+        'przychod': wyniki[KOLUMNA_PRZYCHOD],  # (rok zatrudnienia, rok wyniku)
+        'ebit': wyniki[KOLUMNA_EBIT],
+        'skumulowany_ebit': wyniki['skumulowany_ebit_5lat'],
+        'koszt_rekrutacji': wyniki['calkowite_koszty_rekrutacji_5lat'],
+    }
+
+
+def _pareto_front(punkty):
+    """Zostawia punkty (koszt, EBIT, ...) niezdominowane: żaden inny nie jest tańszy i nie ma wyższego EBIT."""
+    front = []
+    for punkt in sorted(punkty, key=lambda p: (p[0], -p[1])):
+        if not front or punkt[1] > front[-1][1] + TOLERANCJA:
+            front.append(punkt)
+    return front
+
+
+def _drop_dominated(stany):
+    """Usuwa stany (koszt, przychód, nadwyżka marży, EBIT) zdominowane przez inny stan."""
+    kolejnosc = np.lexsort((-stany[:, 3], -stany[:, 2], -stany[:, 1], stany[:, 0]))
+    stany = stany[kolejnosc]
+    zostaje = np.ones(len(stany), dtype=bool)
+    for i in range(len(stany)):
+        if zostaje[i]:
+            dalsze = stany[i + 1:]
+            zostaje[i + 1:] &= ~((stany[i, 0] <= dalsze[:, 0] + TOLERANCJA) &
+                                 np.all(stany[i, 1:] >= dalsze[:, 1:] - TOLERANCJA, axis=1))
+    return kolejnosc[zostaje]
+
+
+def _search_plans(wklady, rok_docelowy, cel_marza, cel_obrot, max_nowych):
+    """Przeszukuje plany rekrutacji rok po roku; zwraca front Pareto (koszt, skumulowany EBIT, plan) i liczbę stanów."""
+    i_cel = rok_docelowy - 1
+    przychod = wklady['przychod'][:, i_cel]
+    # Warunek marży ebit >= cel * przychód zapisany liniowo
+    nadwyzka_marzy = wklady['ebit'][:, i_cel] - cel_marza * przychod
+    wklad_osoby = np.column_stack([wklady['koszt_rekrutacji'], przychod, nadwyzka_marzy, wklady['skumulowany_ebit']])
+
+    def maks_reszty(wspolczynniki):
+        # Największy możliwy wkład lat k.. (przy każdym roku 0 lub max_nowych osób)
+        return np.concatenate([np.cumsum((np.maximum(wspolczynniki, 0) * max_nowych)[::-1])[::-1], [0.0]])
+
+    maks_przychod, maks_marza = maks_reszty(przychod), maks_reszty(nadwyzka_marzy)
+
+    nowi = np.arange(max_nowych + 1)
+    stany = np.zeros((1, 4))  # sumy częściowe: koszt, przychód, nadwyżka marży, EBIT
+    plany = np.zeros((1, 0), dtype=int)
+    odwiedzone = 0
+    for k in range(len(przychod)):
+        stany = (stany[:, None, :] + nowi[None, :, None] * wklad_osoby[k]).reshape(-1, 4)
+        plany = np.column_stack([np.repeat(plany, len(nowi), axis=0), np.tile(nowi, len(plany))])
+        odwiedzone += len(stany)
+        # Odcięcie: cele nieosiągalne nawet przy maksymalnej rekrutacji w kolejnych latach
+        osiagalne = (stany[:, 1] + maks_przychod[k + 1] >= cel_obrot - TOLERANCJA) & \
+            (stany[:, 2] + maks_marza[k + 1] >= -TOLERANCJA)
+        stany, plany = stany[osiagalne], plany[osiagalne]
+        zostaja = _drop_dominated(stany)
+        stany, plany = stany[zostaja], plany[zostaja]
+
+    spelnione = stany[:, 1] > 0  # marża przy zerowym przychodzie wynosi 0
+    front = _pareto_front([(koszt, ebit, tuple(int(n) for n in plan))
+                           for (koszt, _, _, ebit), plan in zip(stany[spelnione], plany[spelnione])])
+    return front, odwiedzone
+
+
+def optimize_recruitment_plan(inputs_dict, rok_docelowy, max_nowych=10, procenty_billable=None):
+    """Szuka najtańszego planu rekrutacji osiągającego `cel_marza_operacyjna` i `cel_obrot_roczny_aspiracja` w roku docelowym.
+
+    Opcjonalnie przeszukuje też listę wartości `konsultant_procent_czasu_billable_docelowy`.
+    Zwraca słownik z najtańszym planem ('najtanszy_plan', None gdy cele są nieosiągalne)
+    oraz frontem Pareto skumulowanego EBIT względem kosztów rekrutacji ('front_pareto').
+    """
+    horyzont_lat = int(inputs_dict['model_horyzont_analizy_lata'])
+    if not 1 <= rok_docelowy <= horyzont_lat:
+        raise ValueError(f"Rok docelowy musi mieścić się w horyzoncie analizy (1-{horyzont_lat}).")
+    if procenty_billable is None:
+        procenty_billable = [inputs_dict['konsultant_procent_czasu_billable_docelowy']]
+
+    punkty = []
+    odwiedzone_lacznie = 0
+    for procent_billable in procenty_billable:
+        wariant = {**inputs_dict, 'konsultant_procent_czasu_billable_docelowy': float(procent_billable)}
+        wklady = _unit_contributions(wariant, horyzont_lat)
+        front, odwiedzone = _search_plans(wklady, rok_docelowy, inputs_dict['cel_marza_operacyjna'],
+                                           inputs_dict['cel_obrot_roczny_aspiracja'], max_nowych)
+        odwiedzone_lacznie += odwiedzone
+        punkty += [(koszt, ebit, (float(procent_billable), plan)) for koszt, ebit, plan in front]
+    front = _pareto_front(punkty)
+
+    front_pareto = [{
+        'plan': list(plan),
+        'konsultant_procent_czasu_billable_docelowy': procent_billable,
+        'koszt_rekrutacji': float(koszt),
+        'skumulowany_ebit': float(ebit),
+    } for koszt, ebit, (procent_billable, plan) in front]
+
+    return {
+        'rok_docelowy': rok_docelowy,
+        'najtanszy_plan': front_pareto[0] if front_pareto else None,
+        'front_pareto': front_pareto,
+        'odwiedzone_wezly': odwiedzone_lacznie,
+    }
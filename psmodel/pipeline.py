@@ -0,0 +1,81 @@
+import numpy as np
+
+# --- Lejek kontraktów: leady -> cykl sprzedaży -> rozpoznanie przychodu ---
+#
+# Każdy etap lejka to jądro splotu na osi czasu: leady z danego kroku podpisują
+# kontrakty z opóźnieniem rozłożonym wg rozkładu cyklu sprzedaży, a wartość
+# podpisanego kontraktu jest rozpoznawana w kolejnych miesiącach okresu realizacji.
+# Jądra budujemy w miesiącach i sumujemy do kroków symulacji, a następnie
+# nakładamy splotem na całą tablicę (scenariusz, krok) - koszt jest liniowy
+# w horyzoncie i nie zależy od liczby kontraktów.
+
+MIESIACE_W_ROKU = 12
+
+
+def causal_convolve(x, jadro):
+    """Splot przyczynowy wzdłuż osi czasu: wynik[:, t] = Σ_j jadro[:, j] · x[:, t - j].
+
+    `x` ma kształt (scenariusz, czas), `jadro` (scenariusz, długość) lub (długość,).
+    """
+    jadro = np.atleast_2d(jadro)
+    wynik = np.zeros(np.broadcast_shapes(x.shape, (jadro.shape[0], x.shape[1])))
+    for j in range(min(jadro.shape[1], x.shape[1])):
+        wynik[:, j:] += jadro[:, j:j + 1] * x[:, :x.shape[1] - j]
+    return wynik
+
+
+def _monthly_to_steps(jadro_miesieczne, kroki_na_rok):
+    # Masa jądra z miesiąca m trafia do kroku m // (miesiące w kroku)
+    miesiace_w_kroku = MIESIACE_W_ROKU // kroki_na_rok
+    n, dlugosc = jadro_miesieczne.shape
+    dlugosc_krokowa = -(-dlugosc // miesiace_w_kroku)
+    uzupelnione = np.zeros((n, dlugosc_krokowa * miesiace_w_kroku))
+    uzupelnione[:, :dlugosc] = jadro_miesieczne
+    return uzupelnione.reshape(n, dlugosc_krokowa, miesiace_w_kroku).sum(axis=2)
+
+
+def sales_cycle_kernel(kolumny, kroki_na_rok):
+    """Rozkład opóźnienia podpisania kontraktu od wygenerowania leada (scenariusz, opóźnienie w krokach).
+
+    Rozkład trójkątny wokół `sprzedaz_cykl_sprzedazy_miesiace` o połowie szerokości
+    `sprzedaz_cykl_rozrzut_miesiace` + 1 miesiąc; przy zerowym rozrzucie i całkowitym cyklu
+    całe opóźnienie przypada na jeden miesiąc.
+    """
+    cykl = np.asarray(kolumny['sprzedaz_cykl_sprzedazy_miesiace'], dtype=np.float64)
+    polowa_szerokosci = np.asarray(kolumny.get('sprzedaz_cykl_rozrzut_miesiace', 0.0), dtype=np.float64) + 1.0
+    cykl, polowa_szerokosci = np.broadcast_arrays(cykl, polowa_szerokosci)
+    if np.any(cykl < 0) or np.any(polowa_szerokosci < 1):
+        raise ValueError("Cykl sprzedaży i jego rozrzut nie mogą być ujemne.")
+    miesiace = np.arange(int(np.ceil((cykl + polowa_szerokosci).max())))
+    wagi = np.maximum(1.0 - np.abs(miesiace[None, :] - cykl[:, None]) / polowa_szerokosci[:, None], 0.0)
+    return _monthly_to_steps(wagi / wagi.sum(axis=1, keepdims=True), kroki_na_rok)
+
+
+def recognition_kernel(kolumny, kroki_na_rok):
+    """Udział wartości kontraktu rozpoznany w kolejnych krokach od podpisania (scenariusz, krok).
+
+    Wartość jest rozpoznawana równomiernie przez `sprzedaz_okres_realizacji_miesiace` miesięcy.
+    """
+    okres = np.atleast_1d(np.asarray(kolumny.get('sprzedaz_okres_realizacji_miesiace', 1.0), dtype=np.float64))
+    if np.any(okres <= 0):
+        raise ValueError("Okres realizacji kontraktu musi być dodatni.")
+    miesiace = np.arange(int(np.ceil(okres.max())))
+    # Część miesiąca [m, m + 1) mieszcząca się w okresie realizacji [0, okres)
+    pokrycie = np.clip(okres[:, None] - miesiace[None, :], 0.0, 1.0)
+    return _monthly_to_steps(pokrycie / okres[:, None], kroki_na_rok)
+
+
+def contract_pipeline(leady, kolumny, kroki_na_rok):
+    """Przepuszcza leady (scenariusz, krok) przez lejek kontraktów.
+
+    Zwraca słownik z kontraktami pozyskanymi z leadów w danym kroku, kontraktami podpisanymi
+    po cyklu sprzedaży i przychodem rozpoznanym w okresie realizacji.
+    """
+    pozyskane = leady * np.asarray(kolumny['sprzedaz_wspolczynnik_konwersji'])[:, None]
+    podpisane = causal_convolve(pozyskane, sales_cycle_kernel(kolumny, kroki_na_rok))
+    wartosc_podpisana = podpisane * np.asarray(kolumny['sprzedaz_srednia_wartosc_kontraktu'])[:, None]
+    return {
+        'kontrakty_pozyskane': pozyskane,
+        'kontrakty_podpisane': podpisane,
+        'przychod': causal_convolve(wartosc_podpisana, recognition_kernel(kolumny, kroki_na_rok)),
+    }
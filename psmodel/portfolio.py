@@ -0,0 +1,204 @@
+import csv
+
+import numpy as np
+
+from psmodel.batch import KOLUMNY_ROCZNE, roi_summary_batch, run_financial_model_batch
+from psmodel.cache import canonical_key
+from psmodel.model import KOLUMNA_ID, WZOR_REKRUTACJI, complete_inputs, get_default_inputs, parse_scenario
+
+# --- Portfel jednostek (praktyk, biur) ---
+#
+# Każda jednostka ma własny słownik parametrów jak `get_default_inputs()`. Wyniki
+# jednostek są zapamiętywane pod kanonicznym skrótem parametrów, więc po zmianie
+# kilku jednostek przeliczamy tylko je - wszystkie naraz, jednym wywołaniem silnika
+# wsadowego. Wyniki przechowujemy jako macierz (jednostka, rok, kolumna), a agregacja
+# do grup i całego portfela to mnożenie macierzy przynależności przez tę macierz.
+#
+# Wspólny narzut korporacyjny (np. centrala) jest rozdzielany co roku na jednostki
+# według klucza alokacji i wliczany do ich kosztów operacyjnych, więc EBIT portfela
+# jest sumą EBIT jednostek po alokacji.
+
+KOLUMNA_GRUPA = 'grupa'
+KOLUMNA_NARZUT = "Narzut wspólny (alokacja)"
+KOLUMNY_PORTFELA = KOLUMNY_ROCZNE + (KOLUMNA_NARZUT,)
+
+# Klucze alokacji wspólnego narzutu: nazwa -> kolumna wyników rocznych (None - po równo)
+KLUCZE_ALOKACJI = {
+    'konsultanci': "Łączna Liczba Konsultantów (koniec roku)",
+    'przychod': "CAŁKOWITY PRZYCHÓD FIRMY",
+    'rowno': None,
+}
+
+
+def read_units(plik):
+    """Czyta jednostki z pliku CSV: kolumna 'id' to nazwa jednostki, 'grupa' (opcjonalnie) to grupa do agregacji.
+
+    Zwraca listę trójek (nazwa, grupa, parametry); puste pola są pomijane.
+    """
+    jednostki = []
+    for numer, wiersz in enumerate(csv.DictReader(plik), start=1):
+        wiersz = {k: v for k, v in wiersz.items() if v not in ('', None)}
+        grupa = wiersz.pop(KOLUMNA_GRUPA, '')
+        parametry = parse_scenario(wiersz, numer)
+        jednostki.append((parametry.pop(KOLUMNA_ID), grupa, parametry))
+    return jednostki
+
+
+def _derived_columns(macierz):
+    # Marża i skumulowany przepływ z EBIT i przychodu macierzy (wiersz, rok, kolumna) - w miejscu
+    ebit = macierz[:, :, KOLUMNY_PORTFELA.index("ZYSK / STRATA OPERACYJNA (EBIT)")]
+    przychod = macierz[:, :, KOLUMNY_PORTFELA.index("CAŁKOWITY PRZYCHÓD FIRMY")]
+    macierz[:, :, KOLUMNY_PORTFELA.index("MARŻA OPERACYJNA (%)")] = np.divide(
+        ebit, przychod, out=np.zeros_like(ebit), where=przychod != 0) * 100
+    macierz[:, :, KOLUMNY_PORTFELA.index("Skumulowany przepływ pieniężny")] = np.cumsum(ebit, axis=1)
+
+
+class Portfolio:
+    """Portfel jednostek ze wspólnym horyzontem analizy i wspólnym narzutem korporacyjnym."""
+
+    def __init__(self, horyzont_lat=None, narzut_wspolny_roczny=0.0, klucz_alokacji='konsultanci'):
+        if klucz_alokacji not in KLUCZE_ALOKACJI:
+            raise ValueError(f"Nieznany klucz alokacji: {klucz_alokacji}. Dostępne: {', '.join(KLUCZE_ALOKACJI)}.")
+        self.horyzont_lat = int(horyzont_lat or get_default_inputs()['model_horyzont_analizy_lata'])
+        self.narzut_wspolny_roczny = float(narzut_wspolny_roczny)
+        self.klucz_alokacji = klucz_alokacji
+        self._jednostki = {}  # nazwa -> (grupa, klucz parametrów)
+        self._parametry = {}  # klucz parametrów -> parametry (tylko jeszcze nieprzeliczone)
+        self._wyniki = {}  # klucz parametrów -> wyniki roczne (rok, kolumna) bez alokacji narzutu
+        self._macierz = None  # (jednostka, rok, kolumna) w kolejności `nazwy`
+        self.przeliczone_ostatnio = 0
+        self.przeliczone_lacznie = 0
+
+    def __len__(self):
+        return len(self._jednostki)
+
+    @property
+    def nazwy(self):
+        return list(self._jednostki)
+
+    @property
+    def grupy(self):
+        return [grupa for grupa, _ in self._jednostki.values()]
+
+    def set_unit(self, nazwa, inputs_dict, grupa=''):
+        """Dodaje lub zmienia jednostkę; brakujące parametry biorą wartości domyślne, horyzont jest wspólny dla portfela."""
+        parametry = self._unit_inputs(inputs_dict)
+        klucz = canonical_key(parametry)
+        if self._jednostki.get(nazwa) != (grupa, klucz):
+            self._jednostki[nazwa] = (grupa, klucz)
+            self._macierz = None
+        if klucz not in self._wyniki:
+            self._parametry[klucz] = parametry
+
+    def _unit_inputs(self, inputs_dict):
+        """Parametry jednostki z pełnym zestawem kluczy dla horyzontu portfela.
+
+        Lata rekrutacji poza horyzontem są pomijane, a brakujące lata mają 0 nowych osób, więc
+        jednostki z plików z pustymi polami lub z różnymi latami planu trafiają do silnika
+        wsadowego z tymi samymi kluczami (i te same plany dają ten sam klucz pamięci).
+        """
+        parametry = complete_inputs({**inputs_dict, 'model_horyzont_analizy_lata': self.horyzont_lat})
+        return {k: v for k, v in parametry.items()
+                if not WZOR_REKRUTACJI.match(k) or int(k[len('rekrutacja_rok'):-len('_nowi')]) <= self.horyzont_lat}
+
+    def remove_unit(self, nazwa):
+        del self._jednostki[nazwa]
+        self._macierz = None
+
+    def replace_units(self, jednostki):
+        """Ustawia skład portfela z listy trójek (nazwa, grupa, parametry); jednostki spoza listy są usuwane."""
+        nowe = set()
+        for nazwa, grupa, parametry in jednostki:
+            self.set_unit(nazwa, parametry, grupa)
+            nowe.add(nazwa)
+        for nazwa in [n for n in self._jednostki if n not in nowe]:
+            self.remove_unit(nazwa)
+
+    def evaluate(self):
+        """Przelicza jednostki ze zmienionymi parametrami jednym wywołaniem silnika wsadowego; zwraca ich liczbę."""
+        uzywane = {klucz for _, klucz in self._jednostki.values()}
+        do_policzenia = [k for k in self._parametry if k in uzywane]
+        if do_policzenia:
+            wyniki = run_financial_model_batch([self._parametry[k] for k in do_policzenia])
+            roczne = np.stack([wyniki[k] for k in KOLUMNY_ROCZNE], axis=2)
+            for i, klucz in enumerate(do_policzenia):
+                self._wyniki[klucz] = roczne[i]
+        # Wyniki jednostek usuniętych lub zmienionych nie są już potrzebne
+        self._wyniki = {k: v for k, v in self._wyniki.items() if k in uzywane}
+        self._parametry.clear()
+        self.przeliczone_ostatnio = len(do_policzenia)
+        self.przeliczone_lacznie += len(do_policzenia)
+        return len(do_policzenia)
+
+    def _matrix(self):
+        # Macierz wyników z alokacją narzutu - budowana ponownie tylko po zmianie składu lub narzutu
+        if self._parametry:
+            self.evaluate()
+        if self._macierz is None:
+            macierz = np.zeros((len(self), self.horyzont_lat, len(KOLUMNY_PORTFELA)))
+            if len(self):
+                macierz[:, :, :len(KOLUMNY_ROCZNE)] = np.stack([self._wyniki[k] for _, k in self._jednostki.values()])
+            self._macierz = macierz
+            self._allocate()
+        return self._macierz
+
+    def _allocate(self):
+        macierz = self._macierz
+        kolumna = KLUCZE_ALOKACJI[self.klucz_alokacji]
+        if kolumna is None:
+            wagi = np.ones(macierz.shape[:2])
+        else:
+            wagi = macierz[:, :, KOLUMNY_ROCZNE.index(kolumna)].copy()
+        sumy = wagi.sum(axis=0)
+        # W latach bez konsultantów (lub przychodu) narzut dzielimy po równo
+        wagi[:, sumy == 0] = 1.0
+        wagi /= np.maximum(wagi.sum(axis=0), 1e-300)
+        narzut = wagi * self.narzut_wspolny_roczny
+
+        macierz[:, :, KOLUMNY_PORTFELA.index("Łączne Koszty Operacyjne")] += narzut
+        macierz[:, :, KOLUMNY_PORTFELA.index("ZYSK / STRATA OPERACYJNA (EBIT)")] -= narzut
+        macierz[:, :, KOLUMNY_PORTFELA.index(KOLUMNA_NARZUT)] = narzut
+        _derived_columns(macierz)
+
+    def set_overhead(self, narzut_wspolny_roczny, klucz_alokacji=None):
+        """Zmienia wspólny narzut lub klucz alokacji - bez przeliczania modelu jednostek."""
+        if klucz_alokacji is not None and klucz_alokacji not in KLUCZE_ALOKACJI:
+            raise ValueError(f"Nieznany klucz alokacji: {klucz_alokacji}. Dostępne: {', '.join(KLUCZE_ALOKACJI)}.")
+        if (float(narzut_wspolny_roczny), klucz_alokacji or self.klucz_alokacji) != (self.narzut_wspolny_roczny, self.klucz_alokacji):
+            self.narzut_wspolny_roczny = float(narzut_wspolny_roczny)
+            self.klucz_alokacji = klucz_alokacji or self.klucz_alokacji
+            self._macierz = None
+
+    def _results(self, macierz, etykiety):
+        wyniki = {k: macierz[:, :, i] for i, k in enumerate(KOLUMNY_PORTFELA)}
+        wyniki["Rok"] = np.arange(1, self.horyzont_lat + 1)
+        wyniki.update(roi_summary_batch(wyniki))
+        wyniki['etykiety'] = etykiety
+        return wyniki
+
+    def unit_results(self, grupa=None):
+        """Wyniki jednostek (po alokacji narzutu) w formacie `run_financial_model_batch`; `grupa` zawęża do jednej grupy.
+
+        Dodatkowo zawiera 'etykiety' (nazwy jednostek) i kolumnę `KOLUMNA_NARZUT`.
+        """
+        macierz = self._matrix()
+        if grupa is None:
+            return self._results(macierz, self.nazwy)
+        wybrane = [i for i, g in enumerate(self.grupy) if g == grupa]
+        return self._results(macierz[wybrane], [self.nazwy[i] for i in wybrane])
+
+    def rollup(self, po_grupach=True):
+        """Wyniki skonsolidowane: po grupach (wiersz na grupę) albo całego portfela (jeden wiersz 'Portfel')."""
+        macierz = self._matrix()
+        if po_grupach:
+            etykiety, numery = np.unique(np.array(self.grupy, dtype=str), return_inverse=True)
+            etykiety = [str(e) for e in etykiety]
+        else:
+            etykiety, numery = ["Portfel"], np.zeros(len(self), dtype=np.int64)
+        przynaleznosc = np.zeros((len(etykiety), len(self)))
+        przynaleznosc[numery, np.arange(len(self))] = 1.0
+        # Suma po jednostkach: (grupa, jednostka) @ (jednostka, rok * kolumna)
+        sumy = (przynaleznosc @ macierz.reshape(len(self), -1)).reshape(len(etykiety), self.horyzont_lat, -1)
+        # Marża i skumulowany przepływ nie są addytywne - liczymy je od nowa z sum
+        _derived_columns(sumy)
+        return self._results(sumy, etykiety)
@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from psmodel.batch import PARAMETRY_UDZIALOWE
+from psmodel.cohort import run_model_batch
+
+# --- Analiza wrażliwości: wykres tornado i siatka 2-D ---
+#
+# Wszystkie warianty parametrów są liczone jednym (lub kilkoma paczkami)
+# wywołaniem silnika wsadowego zamiast osobnego uruchomienia modelu na punkt.
+
+WYNIKI_WRAZLIWOSCI = ('skumulowany_ebit_5lat', 'roi')
+
+# Parametry strukturalne i pochodne, których nie zmieniamy w analizie
+# (długość ramp-upu w latach musi być wspólna dla całego wsadu silnika kohortowego)
+PARAMETRY_POMIJANE = {'model_horyzont_analizy_lata', 'konsultant_procent_czasu_sprzedaz_docelowy', 'rampup_dlugosc_lata'}
+
+
+def numeric_parameters(inputs_dict):
+    """Zwraca klucze liczbowych parametrów wejściowych podlegających analizie wrażliwości."""
+    return [k for k, v in inputs_dict.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in PARAMETRY_POMIJANE]
+
+
+def _base_columns(inputs_dict, n):
+    # % czasu na sprzedaż jest zawsze wyliczany na nowo z pozostałych udziałów czasu
+    return {k: np.broadcast_to(np.float64(v), (n,)) for k, v in inputs_dict.items()
+            if k != 'konsultant_procent_czasu_sprzedaz_docelowy'}
+
+
+def _variant_values(klucz, wartosc, delta):
+    """Zwraca wartości (niska, wysoka) parametru dla wykresu tornado."""
+    if klucz.startswith('rekrutacja_'):
+        # Plan rekrutacji zmieniamy o jednego konsultanta, bo zmiana procentowa zera nic nie pokazuje
+        return max(wartosc - 1, 0), wartosc + 1
+    niska, wysoka = wartosc * (1 - delta), wartosc * (1 + delta)
+    if klucz in PARAMETRY_UDZIALOWE:
+        niska, wysoka = min(max(niska, 0.0), 1.0), min(max(wysoka, 0.0), 1.0)
+    return niska, wysoka
+
+
+def tornado(inputs_dict, delta=0.1, klucze=None, krok_kohortowy=None):
+    """Analiza jeden-parametr-naraz: zmiana każdego parametru o ±delta (rekrutacja: ±1 osoba).
+
+    Zwraca słownik tablic posortowanych malejąco według rozpiętości skumulowanego EBIT.
+    `krok_kohortowy` ("roczny" lub "miesieczny") liczy warianty silnikiem kohortowym.
+    """
+    klucze = list(klucze) if klucze is not None else numeric_parameters(inputs_dict)
+    n = 2 * len(klucze) + 1  # wiersz 0 = scenariusz bazowy
+    kolumny = _base_columns(inputs_dict, n)
+    niskie, wysokie = [], []
+    for i, klucz in enumerate(klucze):
+        niska, wysoka = _variant_values(klucz, float(inputs_dict[klucz]), delta)
+        kolumna = np.array(kolumny[klucz])
+        kolumna[2 * i + 1], kolumna[2 * i + 2] = niska, wysoka
+        kolumny[klucz] = kolumna
+        niskie.append(niska)
+        wysokie.append(wysoka)
+
+    wyniki = run_model_batch(kolumny, krok_kohortowy)
+    ebit, roi = wyniki['skumulowany_ebit_5lat'], wyniki['roi']
+    rozpietosc = np.abs(ebit[2::2] - ebit[1::2])
+    kolejnosc = np.argsort(-rozpietosc, kind='stable')
+    return {
+        'parametr': [klucze[i] for i in kolejnosc],
+        'wartosc_bazowa': np.array([float(inputs_dict[klucze[i]]) for i in kolejnosc]),
+        'wartosc_niska': np.array(niskie)[kolejnosc],
+        'wartosc_wysoka': np.array(wysokie)[kolejnosc],
+        'ebit_niski': ebit[1::2][kolejnosc],
+        'ebit_wysoki': ebit[2::2][kolejnosc],
+        'roi_niskie': roi[1::2][kolejnosc],
+        'roi_wysokie': roi[2::2][kolejnosc],
+        'ebit_bazowy': float(ebit[0]),
+        'roi_bazowe': float(roi[0]),
+    }
+
+
+def _evaluate_grid_chunk(inputs_dict, klucz_x, wartosci_x, klucz_y, wartosci_y, start, stop, krok_kohortowy=None):
+    indeksy = np.arange(start, stop)
+    kolumny = _base_columns(inputs_dict, stop - start)
+    # Wiersze siatki w porządku (y, x), tj. indeks = iy * len(x) + ix
+    kolumny[klucz_x] = wartosci_x[indeksy % len(wartosci_x)]
+    kolumny[klucz_y] = wartosci_y[indeksy // len(wartosci_x)]
+    wyniki = run_model_batch(kolumny, krok_kohortowy)
+    return {k: wyniki[k] for k in WYNIKI_WRAZLIWOSCI}
+
+
+def sweep_2d(inputs_dict, klucz_x, wartosci_x, klucz_y, wartosci_y, rozmiar_paczki=100_000, procesy=1,
+             krok_kohortowy=None):
+    """Liczy gęstą siatkę wyników dla dwóch parametrów; zwraca tablice (len(wartosci_y), len(wartosci_x)).
+
+    `krok_kohortowy` ("roczny" lub "miesieczny") liczy siatkę silnikiem kohortowym.
+    """
+    if klucz_x == klucz_y:
+        raise ValueError("Parametry osi X i Y muszą być różne.")
+    wartosci_x = np.asarray(wartosci_x, dtype=np.float64)
+    wartosci_y = np.asarray(wartosci_y, dtype=np.float64)
+    n = len(wartosci_x) * len(wartosci_y)
+    zakresy = [(start, min(start + rozmiar_paczki, n)) for start in range(0, n, rozmiar_paczki)]
+    zadania = [(inputs_dict, klucz_x, wartosci_x, klucz_y, wartosci_y, start, stop, krok_kohortowy)
+               for start, stop in zakresy]
+
+    procesy = procesy or os.cpu_count() or 1
+    if procesy == 1 or len(zadania) == 1:
+        czesci = [_evaluate_grid_chunk(*zadanie) for zadanie in zadania]
+    else:
+        with ProcessPoolExecutor(max_workers=procesy) as pula:
+            czesci = list(pula.map(_evaluate_grid_chunk, *zip(*zadania)))
+
+    siatka = {'x': wartosci_x, 'y': wartosci_y, 'klucz_x': klucz_x, 'klucz_y': klucz_y}
+    for k in WYNIKI_WRAZLIWOSCI:
+        siatka[k] = np.concatenate([c[k] for c in czesci]).reshape(len(wartosci_y), len(wartosci_x))
+    return siatka
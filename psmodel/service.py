@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from psmodel.cli import evaluate_batch
+from psmodel.model import KOLUMNA_ID, get_default_inputs, parse_scenario
+
+# --- Lokalna usługa HTTP/JSON z łączeniem zapytań w paczki ---
+#
+# Pojedyncze scenariusze z równoległych zapytań trafiają do kolejki; zadanie
+# zbierające czeka krótkie okno czasu (lub do zapełnienia paczki) i liczy je
+# jednym wywołaniem silnika wsadowego w wątku roboczym, nie blokując pętli
+# zdarzeń. Kolejka jest ograniczona - po jej zapełnieniu usługa od razu odpowiada
+# 503 zamiast gromadzić zaległości. Paczki scenariuszy są odsyłane strumieniowo
+# (chunked) wiersz po wierszu, w miarę liczenia kolejnych części.
+#
+#   python -m psmodel.service serwuj --port 8765
+#   python -m psmodel.service obciazenie --zapytania 20000 --wspolbieznosc 200
+
+MAKS_NAGLOWKI = 64 * 1024
+MAKS_TRESC = 64 * 1024 * 1024
+
+STATUSY = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def evaluate_isolated(scenariusze, roczne):
+    """Liczy grupę scenariuszy wsadowo; jeśli wywołanie wsadowe się nie powiedzie, liczy każdy osobno.
+
+    Zwraca listę w kolejności wejścia: słownik wyniku albo wyjątek dla scenariusza, którego
+    nie da się policzyć. Zła dana jednego klienta nie psuje w ten sposób wyników pozostałych.
+    """
+    try:
+        return list(evaluate_batch(scenariusze, roczne))
+    except Exception:
+        pass
+    wyniki = []
+    for scenariusz in scenariusze:
+        try:
+            wyniki.extend(evaluate_batch([scenariusz], roczne))
+        except Exception as e:
+            wyniki.append(e)
+    return wyniki
+
+
+class ServiceMetrics:
+    """Liczniki zapytań, rozmiary paczek oraz opóźnienia i przepustowość z ostatnich zapytań."""
+
+    def __init__(self, okno_s=10.0, maks_probek=20_000):
+        self.start = time.monotonic()
+        self.okno_s = okno_s
+        self.zapytania = 0
+        self.odrzucone = 0
+        self.bledy = 0
+        self.paczki = 0
+        self.scenariusze_w_paczkach = 0
+        self.opoznienia = deque(maxlen=maks_probek)  # (czas zakończenia, opóźnienie w s)
+
+    def record(self, poczatek):
+        koniec = time.monotonic()
+        self.zapytania += 1
+        self.opoznienia.append((koniec, koniec - poczatek))
+
+    def summary(self):
+        teraz = time.monotonic()
+        ostatnie = sorted(o for t, o in self.opoznienia if teraz - t <= self.okno_s)
+
+        def percentyl(p):
+            return ostatnie[min(int(p / 100 * len(ostatnie)), len(ostatnie) - 1)] * 1000 if ostatnie else None
+
+        return {
+            'czas_dzialania_s': teraz - self.start,
+            'zapytania': self.zapytania,
+            'odrzucone': self.odrzucone,
+            'bledy': self.bledy,
+            'paczki': self.paczki,
+            'sredni_rozmiar_paczki': self.scenariusze_w_paczkach / self.paczki if self.paczki else 0.0,
+            'przepustowosc_zapytan_s': len(ostatnie) / min(self.okno_s, teraz - self.start) if ostatnie else 0.0,
+            'opoznienie_ms': {'p50': percentyl(50), 'p95': percentyl(95), 'p99': percentyl(99)},
+        }
+
+
+class MicroBatcher:
+    """Łączy pojedyncze scenariusze zgłoszone w oknie `okno_ms` w jedno wywołanie silnika wsadowego."""
+
+    def __init__(self, metryki, okno_ms=2.0, maks_paczka=1024, maks_oczekujacych=10_000):
+        self.metryki = metryki
+        self.okno_s = okno_ms / 1000
+        self.maks_paczka = maks_paczka
+        self.kolejka = asyncio.Queue(maxsize=maks_oczekujacych)
+        self._zadanie = None
+
+    def start(self):
+        self._zadanie = asyncio.get_running_loop().create_task(self._zbieraj())
+
+    async def stop(self):
+        if self._zadanie:
+            self._zadanie.cancel()
+            await asyncio.gather(self._zadanie, return_exceptions=True)
+
+    def submit(self, scenariusz):
+        """Zgłasza scenariusz i zwraca future z wynikiem; przy pełnej kolejce zgłasza asyncio.QueueFull."""
+        future = asyncio.get_running_loop().create_future()
+        self.kolejka.put_nowait((scenariusz, future))
+        return future
+
+    async def _zbieraj(self):
+        petla = asyncio.get_running_loop()
+        while True:
+            paczka = [await self.kolejka.get()]
+            termin = petla.time() + self.okno_s
+            while len(paczka) < self.maks_paczka:
+                pozostalo = termin - petla.time()
+                if pozostalo <= 0:
+                    break
+                try:
+                    paczka.append(await asyncio.wait_for(self.kolejka.get(), pozostalo))
+                except asyncio.TimeoutError:
+                    break
+            # Przy dużym obciążeniu dobieramy od razu wszystko, co już czeka
+            while len(paczka) < self.maks_paczka and not self.kolejka.empty():
+                paczka.append(self.kolejka.get_nowait())
+            await self._licz(paczka)
+
+    async def _licz(self, paczka):
+        # Silnik wsadowy wymaga wspólnego horyzontu - grupujemy paczkę wg horyzontu
+        domyslny_horyzont = get_default_inputs()['model_horyzont_analizy_lata']
+        grupy = {}
+        for scenariusz, future in paczka:
+            grupy.setdefault(scenariusz.get('model_horyzont_analizy_lata', domyslny_horyzont), []).append((scenariusz, future))
+        petla = asyncio.get_running_loop()
+        for grupa in grupy.values():
+            scenariusze = [s for s, _ in grupa]
+            try:
+                wyniki = await petla.run_in_executor(None, evaluate_isolated, scenariusze, True)
+            except Exception as e:  # np. zamknięty executor - nie dotyczy danych wejściowych
+                wyniki = [e] * len(grupa)
+            self.metryki.paczki += 1
+            self.metryki.scenariusze_w_paczkach += len(grupa)
+            for (_, future), wynik in zip(grupa, wyniki):
+                if future.done():
+                    continue
+                if isinstance(wynik, Exception):
+                    future.set_exception(wynik)
+                else:
+                    future.set_result(wynik)
+
+
+class ModelService:
+    """Serwer HTTP/1.1 (keep-alive) z punktami /model, /scenariusze, /metryki i /zdrowie."""
+
+    def __init__(self, okno_ms=2.0, maks_paczka=1024, maks_oczekujacych=10_000, maks_strumieni=8, rozmiar_paczki=1000):
+        self.metryki = ServiceMetrics()
+        self.batcher = MicroBatcher(self.metryki, okno_ms, maks_paczka, maks_oczekujacych)
+        self.strumienie = asyncio.Semaphore(maks_strumieni)
+        self.maks_strumieni = maks_strumieni
+        self.rozmiar_paczki = rozmiar_paczki
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.batcher.start()
+        self.serwer = await asyncio.start_server(self._obsluz_polaczenie, host, port, limit=MAKS_NAGLOWKI)
+        return self.serwer
+
+    async def stop(self):
+        self.serwer.close()
+        await self.serwer.wait_closed()
+        await self.batcher.stop()
+
+    async def _obsluz_polaczenie(self, reader, writer):
+        try:
+            while True:
+                try:
+                    naglowek = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                linie = naglowek.decode('latin-1').split('\r\n')
+                try:
+                    metoda, cel, _ = linie[0].split(' ', 2)
+                except ValueError:
+                    await self._odpowiedz(writer, 400, {'blad': "Niepoprawny wiersz żądania."}, zamknij=True)
+                    break
+                naglowki = {k.strip().lower(): v.strip() for k, _, v in (l.partition(':') for l in linie[1:] if l)}
+                zamknij = naglowki.get('connection', '').lower() == 'close'
+                if 'chunked' in naglowki.get('transfer-encoding', '').lower():
+                    await self._odpowiedz(writer, 411, {'blad': "Wymagany nagłówek Content-Length."}, zamknij=True)
+                    break
+                try:
+                    dlugosc = int(naglowki.get('content-length', 0) or 0)
+                except ValueError:
+                    dlugosc = -1
+                if dlugosc < 0:
+                    await self._odpowiedz(writer, 400, {'blad': "Niepoprawny nagłówek Content-Length."}, zamknij=True)
+                    break
+                if dlugosc > MAKS_TRESC:
+                    await self._odpowiedz(writer, 413, {'blad': "Treść zapytania jest za duża."}, zamknij=True)
+                    break
+                tresc = await reader.readexactly(dlugosc) if dlugosc else b''
+                await self._route(metoda, cel, tresc, writer, zamknij)
+                if zamknij:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _odpowiedz(self, writer, status, dane, zamknij=False, naglowki_dodatkowe=()):
+        tresc = json.dumps(dane, ensure_ascii=False).encode('utf-8')
+        naglowki = [f"HTTP/1.1 {status} {STATUSY[status]}", "Content-Type: application/json; charset=utf-8",
+                    f"Content-Length: {len(tresc)}", f"Connection: {'close' if zamknij else 'keep-alive'}", *naglowki_dodatkowe]
+        writer.write(('\r\n'.join(naglowki) + '\r\n\r\n').encode('latin-1') + tresc)
+        await writer.drain()
+
+    async def _route(self, metoda, cel, tresc, writer, zamknij):
+        adres = urlsplit(cel)
+        parametry = parse_qs(adres.query)
+        roczne = parametry.get('roczne', ['0'])[0] not in ('0', 'false', '')
+        if adres.path == '/zdrowie':
+            await self._odpowiedz(writer, 200, {'status': 'ok'}, zamknij)
+        elif adres.path == '/metryki':
+            metryki = self.metryki.summary()
+            metryki['oczekujace'] = self.batcher.kolejka.qsize()
+            await self._odpowiedz(writer, 200, metryki, zamknij)
+        elif adres.path == '/model':
+            if metoda != 'POST':
+                await self._odpowiedz(writer, 405, {'blad': "Użyj POST."}, zamknij)
+            else:
+                await self._model(tresc, roczne, writer, zamknij)
+        elif adres.path == '/scenariusze':
+            if metoda != 'POST':
+                await self._odpowiedz(writer, 405, {'blad': "Użyj POST."}, zamknij)
+            else:
+                await self._scenariusze(tresc, roczne, writer, zamknij)
+        else:
+            await self._odpowiedz(writer, 404, {'blad': f"Nieznana ścieżka {adres.path}."}, zamknij)
+
+    async def _model(self, tresc, roczne, writer, zamknij):
+        """Jeden scenariusz (obiekt JSON) - liczony razem z innymi zapytaniami z tego samego okna."""
+        poczatek = time.monotonic()
+        try:
+            scenariusz = parse_scenario(json.loads(tresc or b'{}'), 1)
+            wynik = await self.batcher.submit(scenariusz)
+        except asyncio.QueueFull:
+            self.metryki.odrzucone += 1
+            await self._odpowiedz(writer, 503, {'blad': "Kolejka jest pełna, spróbuj ponownie."}, zamknij, ("Retry-After: 1",))
+            return
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            self.metryki.bledy += 1
+            await self._odpowiedz(writer, 400, {'blad': str(e)}, zamknij)
+            return
+        except Exception as e:  # błąd silnika nie może zerwać połączenia bez odpowiedzi
+            self.metryki.bledy += 1
+            await self._odpowiedz(writer, 500, {'blad': f"Błąd wewnętrzny modelu: {e}"}, zamknij)
+            return
+        if not roczne:
+            wynik = {k: v for k, v in wynik.items() if k != 'roczne'}
+        await self._odpowiedz(writer, 200, wynik, zamknij)
+        self.metryki.record(poczatek)
+
+    async def _scenariusze(self, tresc, roczne, writer, zamknij):
+        """Paczka scenariuszy (JSON lines albo tablica JSON) - wyniki odsyłane strumieniowo jako JSON lines."""
+        if self.strumienie.locked():
+            self.metryki.odrzucone += 1
+            await self._odpowiedz(writer, 503, {'blad': f"Przekroczono limit {self.maks_strumieni} równoległych paczek."},
+                                  zamknij, ("Retry-After: 1",))
+            return
+        poczatek = time.monotonic()
+        try:
+            tekst = tresc.decode('utf-8').strip()
+            wiersze = json.loads(tekst) if tekst.startswith('[') else [json.loads(l) for l in tekst.splitlines() if l.strip()]
+            scenariusze = [parse_scenario(w, i) for i, w in enumerate(wiersze, start=1)]
+        except (ValueError, TypeError, AttributeError) as e:
+            self.metryki.bledy += 1
+            await self._odpowiedz(writer, 400, {'blad': str(e)}, zamknij)
+            return
+
+        async with self.strumienie:
+            writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson; charset=utf-8\r\n"
+                          f"Transfer-Encoding: chunked\r\nConnection: {'close' if zamknij else 'keep-alive'}\r\n\r\n").encode('latin-1'))
+            petla = asyncio.get_running_loop()
+            domyslny_horyzont = get_default_inputs()['model_horyzont_analizy_lata']
+            for start in range(0, len(scenariusze), self.rozmiar_paczki):
+                czesc = scenariusze[start:start + self.rozmiar_paczki]
+                grupy = {}
+                for s in czesc:
+                    grupy.setdefault(s.get('model_horyzont_analizy_lata', domyslny_horyzont), []).append(s)
+                for grupa in grupy.values():
+                    # Nagłówki 200 są już wysłane - błąd scenariusza trafia do strumienia jako rekord z 'blad'
+                    try:
+                        wyniki = await petla.run_in_executor(None, evaluate_isolated, grupa, roczne)
+                    except Exception as e:
+                        wyniki = [e] * len(grupa)
+                    rekordy = []
+                    for scenariusz, wynik in zip(grupa, wyniki):
+                        if isinstance(wynik, Exception):
+                            self.metryki.bledy += 1
+                            wynik = {KOLUMNA_ID: scenariusz[KOLUMNA_ID], 'blad': str(wynik)}
+                        rekordy.append(wynik)
+                    fragment = ''.join(json.dumps(w, ensure_ascii=False) + '\n' for w in rekordy).encode('utf-8')
+                    writer.write(f"{len(fragment):x}\r\n".encode('latin-1') + fragment + b"\r\n")
+                    await writer.drain()  # wolny klient spowalnia liczenie zamiast zapełniać pamięć
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        self.metryki.record(poczatek)
+
+
+async def _serve(args):
+    usluga = ModelService(args.okno_ms, args.maks_paczka, args.maks_oczekujacych, args.maks_strumieni)
+    serwer = await usluga.start(args.host, args.port)
+    print(f"Usługa modelu nasłuchuje na http://{args.host}:{args.port}", flush=True)
+    async with serwer:
+        await serwer.serve_forever()
+
+
+async def load_test(host, port, liczba_zapytan=10_000, wspolbieznosc=100, scenariusz=None):
+    """Wysyła `liczba_zapytan` zapytań POST /model z `wspolbieznosc` połączeń keep-alive; zwraca statystyki."""
+    tresc = json.dumps(scenariusz or {}).encode('utf-8')
+    zapytanie = (f"POST /model HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(tresc)}\r\n\r\n").encode('latin-1') + tresc
+    opoznienia = []
+    statusy = {}
+    pozostalo = liczba_zapytan
+
+    async def klient():
+        nonlocal pozostalo
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while pozostalo > 0:
+                pozostalo -= 1
+                poczatek = time.perf_counter()
+                writer.write(zapytanie)
+                naglowek = await reader.readuntil(b'\r\n\r\n')
+                status = int(naglowek.split(b' ', 2)[1])
+                dlugosc = int(naglowek.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+                await reader.readexactly(dlugosc)
+                opoznienia.append(time.perf_counter() - poczatek)
+                statusy[status] = statusy.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    poczatek = time.perf_counter()
+    await asyncio.gather(*(klient() for _ in range(wspolbieznosc)))
+    czas = time.perf_counter() - poczatek
+    opoznienia.sort()
+    return {
+        'zapytania': len(opoznienia),
+        'statusy': statusy,
+        'czas_s': czas,
+        'zapytan_na_s': len(opoznienia) / czas,
+        'opoznienie_ms': {f'p{p}': opoznienia[min(int(p / 100 * len(opoznienia)), len(opoznienia) - 1)] * 1000
+                          for p in (50, 95, 99)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m psmodel.service', description="Lokalna usługa HTTP/JSON modelu finansowego.")
+    polecenia = parser.add_subparsers(dest='polecenie', required=True)
+    serwuj = polecenia.add_parser('serwuj', help="uruchom usługę")
+    serwuj.add_argument('--host', default='127.0.0.1')
+    serwuj.add_argument('--port', type=int, default=8765)
+    serwuj.add_argument('--okno-ms', type=float, default=2.0, help="okno łączenia pojedynczych zapytań w paczkę")
+    serwuj.add_argument('--maks-paczka', type=int, default=1024, help="maksymalna liczba scenariuszy w paczce")
+    serwuj.add_argument('--maks-oczekujacych', type=int, default=10_000, help="limit kolejki - powyżej odpowiedź 503")
+    serwuj.add_argument('--maks-strumieni', type=int, default=8, help="limit równoległych zapytań /scenariusze")
+    obciazenie = polecenia.add_parser('obciazenie', help="test obciążeniowy działającej usługi")
+    obciazenie.add_argument('--host', default='127.0.0.1')
+    obciazenie.add_argument('--port', type=int, default=8765)
+    obciazenie.add_argument('--zapytania', type=int, default=10_000)
+    obciazenie.add_argument('--wspolbieznosc', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    if args.polecenie == 'serwuj':
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        wynik = asyncio.run(load_test(args.host, args.port, args.zapytania, args.wspolbieznosc))
+        print(json.dumps(wynik, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
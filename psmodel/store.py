@@ -0,0 +1,389 @@
+import contextlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from psmodel.batch import KOLUMNY_ROCZNE, input_columns
+from psmodel.model import get_default_inputs
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# --- Kolumnowy magazyn scenariuszy ---
+#
+# Każdy horyzont analizy ma własny katalog z plikami binarnymi otwieranymi jako
+# tablice mapowane w pamięć: każdy parametr wejściowy ma osobny plik kolumny
+# (parametr dodany później zaczyna się od wiersza zapisanego w schemacie, a
+# wcześniejsze wiersze mają NaN), wyniki roczne (wiersz, rok, kolumna),
+# podsumowanie (wiersz, miara) i źródło wyniku (silnik i krok symulacji). Nowe
+# scenariusze są dopisywane na końcu plików, a liczba wierszy w `schemat.json`
+# zmienia się dopiero po zapisaniu danych.
+#
+# Dla wybranych miar utrzymujemy indeksy jako posortowane segmenty (wartości rosnąco
+# razem z numerami wierszy). Każde dopisanie tworzy nowy mały segment, a segmenty
+# podobnej wielkości są scalane jak w liczniku binarnym - segmentów jest O(log N),
+# a koszt dopisania wiersza O(log N) zamortyzowany zamiast przepisywania całego
+# indeksu. Zapytanie "najlepsze N przy warunkach" przegląda segmenty od góry
+# blokami i czyta z dysku tylko potrzebne wiersze.
+#
+# Zapis trzyma wyłączną blokadę pliku `.blokada`, a odczyty blokadę współdzieloną,
+# więc równoległe sesje aplikacji (i procesy) nie psują magazynu.
+
+WERSJA_FORMATU = 2
+
+PODSUMOWANIE = (
+    'calkowite_koszty_rekrutacji',
+    'skumulowany_ebit',
+    'roi',
+    'rok_zwrotu',  # inf, gdy brak zwrotu w horyzoncie
+    'ebit_ostatni_rok',
+    'marza_ostatni_rok',  # w procentach, jak "MARŻA OPERACYJNA (%)"
+    'nadwyzka_marzy',  # marża ostatniego roku minus cel_marza_operacyjna (ułamek)
+)
+
+INDEKSOWANE = ('roi', 'rok_zwrotu', 'ebit_ostatni_rok', 'skumulowany_ebit', 'nadwyzka_marzy')
+
+# Silnik i krok symulacji, z których pochodzą wyniki wiersza
+ZRODLA = ('model_roczny', 'kohortowy_roczny', 'kohortowy_miesieczny')
+
+KOLUMNA_EBIT = "ZYSK / STRATA OPERACYJNA (EBIT)"
+KOLUMNA_MARZA = "MARŻA OPERACYJNA (%)"
+KOLUMNA_PRZEPLYW = "Skumulowany przepływ pieniężny"
+KOLUMNA_KOSZTY_REKRUTACJI = "Koszty Rekrutacji"
+
+
+def summarize(wyniki, cel_marza):
+    """Liczy miary podsumowania (scenariusz, miara) z wyników rocznych w formacie `run_financial_model_batch`."""
+    koszty = wyniki[KOLUMNA_KOSZTY_REKRUTACJI].sum(axis=1)
+    przeplyw = wyniki[KOLUMNA_PRZEPLYW]
+    skumulowany_ebit = przeplyw[:, -1]
+    roi = np.where(skumulowany_ebit > 0, np.inf, 0.0)
+    np.divide(skumulowany_ebit, koszty, out=roi, where=koszty > 0)
+    dodatni = przeplyw > 0
+    rok_zwrotu = np.where(dodatni.any(axis=1), dodatni.argmax(axis=1) + 1.0, np.inf)
+    marza = wyniki[KOLUMNA_MARZA][:, -1]
+    return np.column_stack([koszty, skumulowany_ebit, roi, rok_zwrotu, wyniki[KOLUMNA_EBIT][:, -1],
+                            marza, marza / 100 - cel_marza])
+
+
+def merge_sorted(wartosci_a, wiersze_a, wartosci_b, wiersze_b):
+    """Scala dwa posortowane rosnąco indeksy (wartości, numery wierszy) w czasie liniowym."""
+    pozycje = np.searchsorted(wartosci_a, wartosci_b, side='right') + np.arange(len(wartosci_b))
+    z_a = np.ones(len(wartosci_a) + len(wartosci_b), dtype=bool)
+    z_a[pozycje] = False
+    wartosci = np.empty(len(z_a), dtype=np.float64)
+    wiersze = np.empty(len(z_a), dtype=np.int64)
+    wartosci[pozycje], wiersze[pozycje] = wartosci_b, wiersze_b
+    wartosci[z_a], wiersze[z_a] = wartosci_a, wiersze_a
+    return wartosci, wiersze
+
+
+class ScenarioStore:
+    """Magazyn scenariuszy jednego horyzontu analizy w katalogu `katalog/h<horyzont>`.
+
+    Obiekt można współdzielić między wątkami; każda operacja czyta bieżący schemat z dysku.
+    """
+
+    def __init__(self, katalog, horyzont_lat):
+        self.katalog = os.path.join(katalog, f"h{int(horyzont_lat)}")
+        self.horyzont_lat = int(horyzont_lat)
+        self._watek = threading.RLock()  # blokada pliku nie chroni `schemat` przed wątkami tego samego procesu
+        self._odswiez()
+
+    def _odswiez(self):
+        sciezka = self._sciezka('schemat.json')
+        if not os.path.exists(sciezka):
+            self.schemat = {'wersja': WERSJA_FORMATU, 'wiersze': 0, 'parametry': [], 'parametry_od': [],
+                            'kolumny_roczne': list(KOLUMNY_ROCZNE), 'podsumowanie': list(PODSUMOWANIE),
+                            'zrodla': list(ZRODLA), 'segmenty': [], 'nastepny_segment': 0}
+            return
+        with open(sciezka, encoding='utf-8') as plik:
+            schemat = json.load(plik)
+        if schemat.get('wersja') != WERSJA_FORMATU:
+            raise ValueError(f"Magazyn {self.katalog} ma nieobsługiwany format - usuń katalog lub wskaż inny.")
+        self.schemat = schemat
+
+    def __len__(self):
+        with self._watek:
+            self._odswiez()
+            return self.schemat['wiersze']
+
+    @property
+    def parametry(self):
+        return self.schemat['parametry']
+
+    def _sciezka(self, nazwa):
+        return os.path.join(self.katalog, nazwa)
+
+    @contextlib.contextmanager
+    def _blokada(self, wylaczna):
+        """Blokada międzyprocesowa magazynu; po jej uzyskaniu schemat jest czytany ponownie."""
+        with self._watek:
+            if not wylaczna and not os.path.exists(self._sciezka('schemat.json')):
+                self._odswiez()  # pusty magazyn - nic do czytania, katalogu nie tworzymy
+                yield
+                return
+            os.makedirs(self.katalog, exist_ok=True)
+            with self._blokada_pliku(wylaczna):
+                self._odswiez()
+                yield
+
+    @contextlib.contextmanager
+    def _blokada_pliku(self, wylaczna):
+        with open(self._sciezka('.blokada'), 'a+b') as plik:
+            if fcntl is not None:
+                fcntl.flock(plik, fcntl.LOCK_EX if wylaczna else fcntl.LOCK_SH)
+            else:
+                plik.seek(0)
+                msvcrt.locking(plik.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(plik, fcntl.LOCK_UN)
+                else:
+                    plik.seek(0)
+                    msvcrt.locking(plik.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _tablica(self, nazwa, ksztalt_wiersza, dtype=np.float64, od=0):
+        wiersze = self.schemat['wiersze']
+        if wiersze <= od:
+            return np.empty((0,) + ksztalt_wiersza, dtype=dtype)
+        return np.memmap(self._sciezka(nazwa), dtype=dtype, mode='r', shape=(wiersze - od,) + ksztalt_wiersza)
+
+    def _zapisz_schemat(self):
+        tymczasowa = self._sciezka('schemat.json.tmp')
+        with open(tymczasowa, 'w', encoding='utf-8') as plik:
+            json.dump(self.schemat, plik, ensure_ascii=False)
+        os.replace(tymczasowa, self._sciezka('schemat.json'))
+
+    def _dopisz(self, nazwa, dane, wiersz):
+        """Zapisuje `dane` od wiersza `wiersz` pliku (resztki przerwanego zapisu są nadpisywane)."""
+        dane = np.ascontiguousarray(dane)
+        with open(self._sciezka(nazwa), 'r+b' if os.path.exists(self._sciezka(nazwa)) else 'wb') as plik:
+            plik.seek(wiersz * (dane[0].nbytes if len(dane) else 0))
+            plik.write(dane.tobytes())
+            plik.truncate()
+
+    @property
+    def roczne(self):
+        """Wyniki roczne (wiersz, rok, kolumna) - kolejność kolumn jak w `KOLUMNY_ROCZNE`."""
+        return self._tablica('roczne.f64', (self.horyzont_lat, len(KOLUMNY_ROCZNE)))
+
+    @property
+    def podsumowanie(self):
+        """Miary podsumowania (wiersz, miara) - kolejność jak w `PODSUMOWANIE`."""
+        return self._tablica('podsumowanie.f64', (len(PODSUMOWANIE),))
+
+    @property
+    def zrodla(self):
+        """Kod źródła wyniku każdego wiersza - indeks w `ZRODLA`."""
+        return self._tablica('zrodlo.i8', (), dtype=np.int8)
+
+    def input_column(self, parametr):
+        """Zwraca kolumnę parametru wejściowego (wiersz,); wiersze sprzed dodania parametru mają NaN."""
+        with self._blokada(False):
+            kolumna = np.full(self.schemat['wiersze'], np.nan)
+            if parametr in self.parametry:
+                i = self.parametry.index(parametr)
+                od = self.schemat['parametry_od'][i]
+                kolumna[od:] = self._tablica(f'wejscie_{i}.f64', (), od=od)
+            return kolumna
+
+    def _indeks(self, segment, miara):
+        return (np.memmap(self._sciezka(f"indeks_{segment['nazwa']}_{miara}.f64"), dtype=np.float64, mode='r'),
+                np.memmap(self._sciezka(f"indeks_{segment['nazwa']}_{miara}.i64"), dtype=np.int64, mode='r'))
+
+    def _zapisz_segment(self, indeksy, liczba_wierszy):
+        """Zapisuje nowy segment (miara -> (wartości, wiersze)); zwraca jego opis do schematu."""
+        segment = {'nazwa': f"s{self.schemat['nastepny_segment']:06d}", 'wiersze': int(liczba_wierszy)}
+        self.schemat['nastepny_segment'] += 1
+        for miara, (wartosci, wiersze) in indeksy.items():
+            np.asarray(wartosci, dtype=np.float64).tofile(self._sciezka(f"indeks_{segment['nazwa']}_{miara}.f64"))
+            np.asarray(wiersze, dtype=np.int64).tofile(self._sciezka(f"indeks_{segment['nazwa']}_{miara}.i64"))
+        return segment
+
+    def _usun_segmenty(self, segmenty):
+        for segment in segmenty:
+            for miara in INDEKSOWANE:
+                for rozszerzenie in ('f64', 'i64'):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(self._sciezka(f"indeks_{segment['nazwa']}_{miara}.{rozszerzenie}"))
+
+    def _scal(self, segmenty):
+        indeksy = {}
+        for miara in INDEKSOWANE:
+            wartosci, wiersze = self._indeks(segmenty[0], miara)
+            for segment in segmenty[1:]:
+                wartosci, wiersze = merge_sorted(wartosci, wiersze, *self._indeks(segment, miara))
+            indeksy[miara] = (wartosci, wiersze)
+        return self._zapisz_segment(indeksy, sum(s['wiersze'] for s in segmenty))
+
+    def append(self, tabela, wyniki, zrodlo='model_roczny'):
+        """Dopisuje scenariusze (tabela parametrów jak w `input_columns`) z wynikami rocznymi; zwraca ich numery wierszy.
+
+        `zrodlo` (jedno z `ZRODLA`) zapisuje, który silnik i krok symulacji policzył wyniki.
+        """
+        if zrodlo not in ZRODLA:
+            raise ValueError(f"Nieznane źródło wyników {zrodlo!r} - dozwolone: {', '.join(ZRODLA)}.")
+        kolumny = input_columns(tabela)
+        n = len(next(iter(kolumny.values())))
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        if wyniki[KOLUMNA_EBIT].shape != (n, self.horyzont_lat):
+            raise ValueError(f"Wyniki muszą mieć kształt ({n}, {self.horyzont_lat}) - jeden wiersz na scenariusz.")
+        roczne = np.stack([np.asarray(wyniki[k], dtype=np.float64) for k in KOLUMNY_ROCZNE], axis=2)
+        # Scenariusze bez podanego celu marży porównujemy z celem domyślnym
+        cel_marza = kolumny.get('cel_marza_operacyjna', get_default_inputs()['cel_marza_operacyjna'])
+        podsumowanie = summarize(wyniki, cel_marza)
+
+        with self._blokada(True):
+            poczatek = self.schemat['wiersze']
+            # Nowe parametry rozszerzają schemat - ich kolumny zaczynają się od bieżącego wiersza
+            for k in sorted(set(kolumny) - set(self.parametry)):
+                self.schemat['parametry'].append(k)
+                self.schemat['parametry_od'].append(poczatek)
+            for i, (k, od) in enumerate(zip(self.parametry, self.schemat['parametry_od'])):
+                self._dopisz(f'wejscie_{i}.f64', np.asarray(kolumny.get(k, np.full(n, np.nan)), dtype=np.float64),
+                             poczatek - od)
+            self._dopisz('roczne.f64', roczne, poczatek)
+            self._dopisz('podsumowanie.f64', podsumowanie, poczatek)
+            self._dopisz('zrodlo.i8', np.full(n, ZRODLA.index(zrodlo), dtype=np.int8), poczatek)
+
+            numery = np.arange(poczatek, poczatek + n, dtype=np.int64)
+            indeksy = {}
+            for miara in INDEKSOWANE:
+                wartosci = podsumowanie[:, PODSUMOWANIE.index(miara)]
+                kolejnosc = np.argsort(wartosci, kind='stable')
+                indeksy[miara] = (wartosci[kolejnosc], numery[kolejnosc])
+            segmenty = self.schemat['segmenty']
+            segmenty.append(self._zapisz_segment(indeksy, n))
+            # Scalanie segmentów podobnej wielkości (licznik binarny)
+            usuniete = []
+            while len(segmenty) >= 2 and segmenty[-2]['wiersze'] <= segmenty[-1]['wiersze']:
+                pary = segmenty[-2:]
+                segmenty[-2:] = [self._scal(pary)]
+                usuniete.extend(pary)
+            self.schemat['wiersze'] = poczatek + n
+            self._zapisz_schemat()
+            self._usun_segmenty(usuniete)
+        return numery
+
+    def compact(self):
+        """Scala wszystkie segmenty indeksów w jeden (np. przed serią wielu zapytań)."""
+        with self._blokada(True):
+            segmenty = self.schemat['segmenty']
+            if len(segmenty) < 2:
+                return
+            self.schemat['segmenty'] = [self._scal(segmenty)]
+            self._zapisz_schemat()
+            self._usun_segmenty(segmenty)
+
+    def range_query(self, miara, od=None, do=None):
+        """Zwraca numery wierszy z miarą w przedziale [od, do] (None - przedział otwarty), posortowane wg miary."""
+        with self._blokada(False):
+            czesci_wartosci, czesci_wierszy = [np.empty(0)], [np.empty(0, dtype=np.int64)]
+            for segment in self.schemat['segmenty']:
+                wartosci, wiersze = self._indeks(segment, miara)
+                start = 0 if od is None else np.searchsorted(wartosci, od, side='left')
+                stop = len(wartosci) if do is None else np.searchsorted(wartosci, do, side='right')
+                czesci_wartosci.append(np.asarray(wartosci[start:stop]))
+                czesci_wierszy.append(np.asarray(wiersze[start:stop]))
+            wartosci = np.concatenate(czesci_wartosci)
+            return np.concatenate(czesci_wierszy)[np.argsort(wartosci, kind='stable')]
+
+    def top(self, miara, n=50, malejaco=True, warunki=None, zrodlo=None, blok=4096):
+        """Zwraca `n` najlepszych scenariuszy wg miary spełniających `warunki`.
+
+        `warunki` to słownik miara -> (od, do) z granicami włącznie (None - bez granicy), np.
+        {'nadwyzka_marzy': (0, None)} wybiera scenariusze z marżą co najmniej równą celowi;
+        `zrodlo` zawęża wynik do wierszy policzonych danym silnikiem (jedno z `ZRODLA`).
+        Wynik to słownik: 'wiersz' (numery wierszy), kolumny podsumowania i 'zrodlo'.
+        """
+        with self._blokada(False):
+            segmenty = [self._indeks(s, miara) for s in self.schemat['segmenty']]
+            warunki = [(PODSUMOWANIE.index(k), od, do) for k, (od, do) in (warunki or {}).items()]
+            podsumowanie = self.podsumowanie
+            zrodla = self.zrodla
+            kod_zrodla = None if zrodlo is None else ZRODLA.index(zrodlo)
+            kursory = [0] * len(segmenty)
+            pula_wartosci, pula_wierszy = np.empty(0), np.empty(0, dtype=np.int64)
+            znalezione = []
+            liczba = 0
+            while liczba < n:
+                # Następny blok z każdego segmentu; nieprzejrzane wartości segmentu nie są lepsze niż jego ostatnia pobrana
+                czesci_wartosci, czesci_wierszy = [pula_wartosci], [pula_wierszy]
+                granica = None
+                for i, (wartosci, wiersze) in enumerate(segmenty):
+                    k, dlugosc = kursory[i], len(wartosci)
+                    if k >= dlugosc:
+                        continue
+                    if malejaco:
+                        fragment = slice(max(dlugosc - k - blok, 0), dlugosc - k)
+                        w, r = np.asarray(wartosci[fragment])[::-1], np.asarray(wiersze[fragment])[::-1]
+                    else:
+                        w, r = np.asarray(wartosci[k:k + blok]), np.asarray(wiersze[k:k + blok])
+                    kursory[i] += len(w)
+                    czesci_wartosci.append(w)
+                    czesci_wierszy.append(r)
+                    if kursory[i] < dlugosc:
+                        granica = w[-1] if granica is None else (max(granica, w[-1]) if malejaco else min(granica, w[-1]))
+                wartosci, wiersze = np.concatenate(czesci_wartosci), np.concatenate(czesci_wierszy)
+                if not len(wartosci):
+                    break
+                kolejnosc = np.argsort(wartosci, kind='stable')
+                if malejaco:
+                    kolejnosc = kolejnosc[::-1]
+                wartosci, wiersze = wartosci[kolejnosc], wiersze[kolejnosc]
+                if granica is None:
+                    pewne = len(wartosci)
+                else:
+                    pewne = int(np.count_nonzero(wartosci >= granica if malejaco else wartosci <= granica))
+                kandydaci = wiersze[:pewne]
+                pula_wartosci, pula_wierszy = wartosci[pewne:], wiersze[pewne:]
+
+                # Z dysku czytamy tylko wiersze bieżącego bloku
+                maska = np.ones(len(kandydaci), dtype=bool)
+                if warunki:
+                    miary = podsumowanie[kandydaci]
+                    for j, od, do in warunki:
+                        if od is not None:
+                            maska &= miary[:, j] >= od
+                        if do is not None:
+                            maska &= miary[:, j] <= do
+                if kod_zrodla is not None:
+                    maska &= zrodla[kandydaci] == kod_zrodla
+                znalezione.append(kandydaci[maska][:n - liczba])
+                liczba += len(znalezione[-1])
+
+            numery = np.concatenate(znalezione) if znalezione else np.empty(0, dtype=np.int64)
+            wynik = {'wiersz': numery}
+            miary = podsumowanie[numery] if len(numery) else np.empty((0, len(PODSUMOWANIE)))
+            for i, k in enumerate(PODSUMOWANIE):
+                wynik[k] = miary[:, i]
+            wynik['zrodlo'] = np.asarray(ZRODLA)[zrodla[numery] if len(numery) else np.empty(0, dtype=np.int8)]
+            return wynik
+
+    def inputs(self, numery):
+        """Zwraca parametry wejściowe wierszy jako listę słowników."""
+        numery = np.asarray(numery, dtype=np.int64)
+        with self._blokada(False):
+            kolumny = {}
+            for i, (k, od) in enumerate(zip(self.parametry, self.schemat['parametry_od'])):
+                wartosci = np.full(len(numery), np.nan)
+                maska = numery >= od
+                if maska.any():
+                    wartosci[maska] = self._tablica(f'wejscie_{i}.f64', (), od=od)[numery[maska] - od]
+                kolumny[k] = wartosci
+        return [{k: float(v[j]) for k, v in kolumny.items() if not np.isnan(v[j])} for j in range(len(numery))]
+
+    def yearly(self, numer):
+        """Zwraca wyniki roczne jednego wiersza jako słownik kolumna -> tablica (rok,)."""
+        with self._blokada(False):
+            roczne = np.array(self.roczne[numer])
+        return {'Rok': np.arange(1, self.horyzont_lat + 1), **{k: roczne[:, i] for i, k in enumerate(KOLUMNY_ROCZNE)}}
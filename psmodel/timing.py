@@ -0,0 +1,90 @@
+import contextvars
+import functools
+import time
+
+# --- Opcjonalny pomiar czasu etapów ---
+#
+# Etapy (metryki, symulacja, budowa tabel, formatowanie, renderowanie) są oznaczone
+# w kodzie przez `stage(nazwa)` albo dekorator `timed(nazwa)`. Pomiar jest włączony
+# tylko wewnątrz `record_timings()` - poza nim oznaczenie kosztuje jedno odczytanie
+# zmiennej kontekstowej. Zagnieżdżone etapy liczą czas własny: czas etapu
+# wewnętrznego nie jest doliczany do etapu zewnętrznego, więc suma etapów
+# odpowiada czasowi całkowitemu. Zmienna kontekstowa oddziela pomiary
+# równoległych sesji i wątków.
+
+_pomiary = contextvars.ContextVar('psmodel_pomiary', default=None)
+
+
+class StageTimings:
+    """Zebrane czasy etapów: łączny czas własny (s) i liczba wywołań dla każdej nazwy."""
+
+    def __init__(self):
+        self.etapy = {}
+        self._stos = []  # czasy etapów zagnieżdżonych w etapach otwartych
+
+    def add(self, nazwa, czas, liczba=1):
+        laczny, wywolania = self.etapy.get(nazwa, (0.0, 0))
+        self.etapy[nazwa] = (laczny + czas, wywolania + liczba)
+
+    @property
+    def total(self):
+        return sum(czas for czas, _ in self.etapy.values())
+
+    def records(self):
+        """Zwraca listę słowników (etap, czas_ms, wywolania, udzial) w kolejności pierwszego wystąpienia."""
+        calosc = self.total
+        return [{'etap': nazwa, 'czas_ms': czas * 1000, 'wywolania': liczba, 'udzial': czas / calosc if calosc else 0.0}
+                for nazwa, (czas, liczba) in self.etapy.items()]
+
+
+class stage:
+    """Kontekst oznaczający etap; mierzy czas tylko wewnątrz `record_timings()`."""
+
+    __slots__ = ('nazwa', 'pomiary', 'start')
+
+    def __init__(self, nazwa):
+        self.nazwa = nazwa
+
+    def __enter__(self):
+        self.pomiary = _pomiary.get()
+        if self.pomiary is not None:
+            self.pomiary._stos.append(0.0)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *wyjatek):
+        if self.pomiary is not None:
+            czas = time.perf_counter() - self.start
+            zagniezdzone = self.pomiary._stos.pop()
+            self.pomiary.add(self.nazwa, czas - zagniezdzone)
+            if self.pomiary._stos:
+                self.pomiary._stos[-1] += czas
+        return False
+
+
+def timed(nazwa):
+    """Dekorator oznaczający całą funkcję jako etap `nazwa`."""
+    def dekorator(funkcja):
+        @functools.wraps(funkcja)
+        def opakowanie(*args, **kwargs):
+            if _pomiary.get() is None:
+                return funkcja(*args, **kwargs)
+            with stage(nazwa):
+                return funkcja(*args, **kwargs)
+        return opakowanie
+    return dekorator
+
+
+class record_timings:
+    """Włącza pomiar etapów w bloku `with`; zwraca `StageTimings` (bloki zagnieżdżone zbierają osobno)."""
+
+    def __init__(self):
+        self.pomiary = StageTimings()
+
+    def __enter__(self):
+        self._token = _pomiary.set(self.pomiary)
+        return self.pomiary
+
+    def __exit__(self, *wyjatek):
+        _pomiary.reset(self._token)
+        return False
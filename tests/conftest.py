@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Katalog repozytorium dokładamy na końcu ścieżki: code.py (aplikacja Streamlit)
+# nie może przesłaniać modułu `code` z biblioteki standardowej.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import numpy as np
+
+from psmodel.agents import run_agent_simulation
+from psmodel.batch import KOLUMNY_ROCZNE
+from psmodel.model import complete_inputs, run_financial_model
+
+BEZ_LOSOWOSCI = dict(rotacja_roczna=0.0, opoznienie_zatrudnienia_mies=0.0, rozrzut_awansu_mies=0.0, szum_utylizacji=0.0)
+
+
+def test_without_noise_matches_yearly_model():
+    inputs = complete_inputs({'model_horyzont_analizy_lata': 6, 'rekrutacja_rok6_nowi': 1})
+    roczne_wyniki_df, roi_summary, _ = run_financial_model(inputs)
+    wyniki = run_agent_simulation(inputs, liczba_replikacji=3, rozmiar_paczki=2, **BEZ_LOSOWOSCI)
+    for kolumna in KOLUMNY_ROCZNE:
+        np.testing.assert_allclose(wyniki[kolumna], np.broadcast_to(roczne_wyniki_df[kolumna], (3, 6)),
+                                   rtol=1e-6, atol=1e-3, err_msg=kolumna)
+    np.testing.assert_allclose(wyniki['skumulowany_ebit_5lat'], roi_summary['skumulowany_ebit_5lat'], rtol=1e-6)
+    assert np.all(wyniki['odejscia'] == 0)
+
+
+def test_shapes_per_replication():
+    inputs = complete_inputs({})
+    wyniki = run_agent_simulation(inputs, liczba_replikacji=25, rozmiar_paczki=10, percentyle=(10, 90))
+    for kolumna in KOLUMNY_ROCZNE:
+        assert wyniki[kolumna].shape == (25, 5), kolumna
+        assert wyniki['srednie'][kolumna].shape == (5,)
+    assert wyniki['skumulowany_ebit_5lat'].shape == (25,)
+    assert wyniki['percentyle']['ebit'].shape == (2, 5)
+    assert wyniki['odejscia'].shape == (5,)
+
+
+def test_same_seed_same_result():
+    inputs = complete_inputs({})
+    a, b = (run_agent_simulation(inputs, liczba_replikacji=40, rozmiar_paczki=15, seed=11) for _ in range(2))
+    c = run_agent_simulation(inputs, liczba_replikacji=40, rozmiar_paczki=15, seed=12)
+    for kolumna in KOLUMNY_ROCZNE:
+        np.testing.assert_array_equal(a[kolumna], b[kolumna])
+    assert not np.array_equal(a["ZYSK / STRATA OPERACYJNA (EBIT)"], c["ZYSK / STRATA OPERACYJNA (EBIT)"])
+
+
+def test_attrition_lowers_headcount():
+    inputs = complete_inputs({})
+    bez_rotacji = run_agent_simulation(inputs, liczba_replikacji=200, **{**BEZ_LOSOWOSCI, 'rotacja_roczna': 0.0})
+    z_rotacja = run_agent_simulation(inputs, liczba_replikacji=200, **{**BEZ_LOSOWOSCI, 'rotacja_roczna': 0.3})
+    kolumna = "Łączna Liczba Konsultantów (koniec roku)"
+    assert np.all(z_rotacja['srednie'][kolumna] <= bez_rotacji['srednie'][kolumna])
+    assert z_rotacja['odejscia'].sum() > 0
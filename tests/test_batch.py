@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from psmodel.batch import KOLUMNY_ROCZNE, input_columns, run_financial_model_batch, scenario_results
+from psmodel.model import complete_inputs, run_financial_model_records
+
+
+def _scalar_ebit(scenariusz):
+    _, roi_summary, _ = run_financial_model_records(complete_inputs(scenariusz))
+    return roi_summary['skumulowany_ebit_5lat']
+
+
+def test_rows_with_different_keys():
+    # Pierwszy wiersz nie ma roku 7, kolejny nie ma roku 6 ani % czasu na sprzedaż
+    scenariusze = [
+        {'model_horyzont_analizy_lata': 8, 'rekrutacja_rok6_nowi': 1, 'konsultant_procent_czasu_sprzedaz_docelowy': 0.1},
+        {'model_horyzont_analizy_lata': 8, 'rekrutacja_rok7_nowi': 4},
+        {'model_horyzont_analizy_lata': 8},
+    ]
+    wiersze = [{**complete_inputs({}), **s} for s in scenariusze]
+    del wiersze[1]['konsultant_procent_czasu_sprzedaz_docelowy']
+    del wiersze[1]['rekrutacja_rok5_nowi']
+
+    wyniki = run_financial_model_batch(wiersze)
+
+    for i, wiersz in enumerate(wiersze):
+        assert wyniki['skumulowany_ebit_5lat'][i] == _scalar_ebit(wiersz)
+    assert wyniki['Koszty Rekrutacji'][1, 6] == 4 * wiersze[1]['korporacyjne_koszt_rekrutacji_konsultanta']
+    assert wyniki['Koszty Rekrutacji'][1, 4] == 0
+
+
+def test_missing_parameter_is_reported():
+    wiersze = [complete_inputs({}), complete_inputs({})]
+    del wiersze[1]['konsultant_stawka_billable_godz']
+    with pytest.raises(ValueError, match="Scenariusz 2: brak parametru konsultant_stawka_billable_godz"):
+        input_columns(wiersze)
+
+
+def test_complete_inputs_fills_recruitment_horizon():
+    inputs = complete_inputs({'model_horyzont_analizy_lata': 7})
+    assert inputs['rekrutacja_rok6_nowi'] == 0 and inputs['rekrutacja_rok7_nowi'] == 0
+    assert np.all(input_columns([inputs])['rekrutacja_rok7_nowi'] == 0)
+
+
+def test_batch_matches_scalar_on_random_scenarios():
+    rng = np.random.default_rng(3)
+    bazowe = complete_inputs({'model_horyzont_analizy_lata': 6})
+    wiersze = []
+    for _ in range(200):
+        scenariusz = {k: v * rng.uniform(0.2, 1.8) for k, v in bazowe.items()
+                      if k not in ('model_horyzont_analizy_lata', 'konsultant_procent_czasu_sprzedaz_docelowy')}
+        # Suma udziałów czasu czasem przekracza 1 - sprawdza obcięcie max(0, ...) % czasu na sprzedaż
+        scenariusz.update({f'rekrutacja_rok{n}_nowi': int(rng.integers(0, 6)) for n in range(1, 7)})
+        wiersze.append(complete_inputs({**scenariusz, 'model_horyzont_analizy_lata': 6}))
+
+    wyniki = run_financial_model_batch(wiersze)
+
+    for i, wiersz in enumerate(wiersze):
+        lista, roi_summary, _ = run_financial_model_records(wiersz)
+        for kolumna in KOLUMNY_ROCZNE:
+            assert np.array_equal(wyniki[kolumna][i], [w[kolumna] for w in lista]), (i, kolumna)
+        for klucz in ('calkowite_koszty_rekrutacji_5lat', 'skumulowany_ebit_5lat', 'roi'):
+            assert wyniki[klucz][i] == roi_summary[klucz], (i, klucz)
+
+
+@pytest.mark.parametrize('horyzont', [1, 3, 8])
+def test_payback_text_follows_horizon(horyzont):
+    wiersze = [complete_inputs({'model_horyzont_analizy_lata': horyzont, 'korporacyjne_koszt_rekrutacji_konsultanta': 1e9}),
+               complete_inputs({'model_horyzont_analizy_lata': horyzont})]
+    wyniki = run_financial_model_batch(wiersze)
+
+    for i, wiersz in enumerate(wiersze):
+        _, roi_summary, _ = run_financial_model_records(wiersz)
+        assert scenario_results(wyniki, i)[1]['payback_period_display'] == roi_summary['payback_period_display']
+    assert scenario_results(wyniki, 0)[1]['payback_period_display'] == \
+        f"Brak zwrotu w ciągu {'1 roku' if horyzont == 1 else f'{horyzont} lat'}"
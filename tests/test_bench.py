@@ -0,0 +1,21 @@
+import json
+
+from psmodel.bench import DOMYSLNA_BAZA, compare
+
+
+def test_committed_baseline():
+    with open(DOMYSLNA_BAZA, encoding='utf-8') as plik:
+        baza = json.load(plik)
+    assert {'przepustowosc_100000_scen_s', 'opoznienie_rekordy_s', 'pamiec_szczyt_100000_scen_mb'} <= set(baza['wyniki'])
+    assert set(baza['progi']) <= set(baza['wyniki'])
+
+
+def test_compare_direction_and_thresholds():
+    baza = {'wyniki': {'przepustowosc_1_scen_s': 100.0, 'opoznienie_rekordy_s': 1.0, 'etap_x_ms': 1.0},
+            'progi': {'etap_x_ms': 1.0}}
+    wyniki = {'przepustowosc_1_scen_s': 50.0, 'opoznienie_rekordy_s': 1.2, 'etap_x_ms': 1.9, 'nowa_miara': 3.0}
+    porownanie = {w['miara']: w for w in compare(wyniki, baza, prog=0.25)}
+    assert set(porownanie) == {'przepustowosc_1_scen_s', 'opoznienie_rekordy_s', 'etap_x_ms'}
+    assert porownanie['przepustowosc_1_scen_s']['regresja']  # dwa razy mniejsza przepustowość
+    assert not porownanie['opoznienie_rekordy_s']['regresja']
+    assert not porownanie['etap_x_ms']['regresja']  # próg z bazy ma pierwszeństwo
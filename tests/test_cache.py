@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from psmodel import cache
+from psmodel.cache import ResultCache, canonical_key
+
+
+def test_key_ignores_order_and_int_float():
+    assert canonical_key({'a': 12, 'b': 1.5}) == canonical_key({'b': 1.5, 'a': 12.0})
+    assert canonical_key({'a': 1}, krok='roczny') != canonical_key({'a': 1}, krok='miesieczny')
+
+
+def test_model_version_invalidates_disk_entries(tmp_path, monkeypatch):
+    klucz = canonical_key({'a': 1})
+    ResultCache('model', katalog=tmp_path).get_or_compute(klucz, lambda: 'stary model')
+
+    monkeypatch.setattr(cache, 'WERSJA_MODELU', cache.WERSJA_MODELU + 1)
+    nowy_klucz = canonical_key({'a': 1})
+    assert nowy_klucz != klucz
+    pamiec = ResultCache('model', katalog=tmp_path)
+    assert pamiec.get_or_compute(nowy_klucz, lambda: 'nowy model') == 'nowy model'
+    assert pamiec.stats()['trafienia_dysk'] == 0
+
+
+def test_counters_consistent_under_threads(tmp_path):
+    pamiec = ResultCache('model', maks_rozmiar=8, katalog=tmp_path)
+    with ThreadPoolExecutor(8) as pula:
+        list(pula.map(lambda i: pamiec.get_or_compute(str(i % 20).zfill(4), lambda: i), range(4000)))
+    stats = pamiec.stats()
+    assert stats['trafienia_pamiec'] + stats['trafienia_dysk'] + stats['chybienia'] == 4000
+    assert stats['rozmiar'] <= 8
+
+
+@pytest.mark.parametrize('zawartosc', [
+    b'cnieistniejacy_modul_psmodel\nKlasa\n.',  # ModuleNotFoundError - klasa z usuniętego modułu
+    b'cos\nnie_ma_takiej_funkcji\n.',  # AttributeError - klasa przemianowana w nowszym kodzie
+    b'\x80\x05',  # plik ucięty
+    b'',
+])
+def test_stale_disk_entry_is_a_miss(tmp_path, zawartosc):
+    pamiec = ResultCache('model', katalog=tmp_path)
+    klucz = canonical_key({'a': 1})
+    sciezka = tmp_path / 'model' / klucz[:2] / (klucz + '.pkl')
+    sciezka.parent.mkdir(parents=True)
+    sciezka.write_bytes(zawartosc)
+    assert pamiec._czytaj_z_dysku(klucz) == (False, None)
+    assert not sciezka.exists()
+
+    sciezka.write_bytes(zawartosc)
+    assert pamiec.get_or_compute(klucz, lambda: 'nowy') == 'nowy'
+    assert pamiec.stats()['chybienia'] == 1
+    # Zły plik został zastąpiony nowym wynikiem
+    ponownie = ResultCache('model', katalog=tmp_path)
+    assert ponownie.get_or_compute(klucz, lambda: 'inny') == 'nowy'
+    assert ponownie.stats()['trafienia_dysk'] == 1
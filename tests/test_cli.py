@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+
+from psmodel.cli import evaluate_stream, main, parse_scenario, read_scenarios
+from psmodel.model import complete_inputs, run_financial_model_records
+
+
+def test_mixed_keys_in_one_chunk():
+    # Puste komórki CSV są pomijane, więc wiersze jednej paczki mają różne klucze
+    plik = io.StringIO(
+        "id,model_horyzont_analizy_lata,rekrutacja_rok6_nowi,rekrutacja_rok7_nowi,konsultant_stawka_billable_godz\n"
+        "a,7,1,,\n"
+        "b,7,,3,450\n"
+        "c,7,,,\n")
+    wyniki = list(evaluate_stream(read_scenarios(plik, 'csv'), roczne=True))
+
+    assert [w['id'] for w in wyniki] == ['a', 'b', 'c']
+    oczekiwane = [
+        {'model_horyzont_analizy_lata': 7, 'rekrutacja_rok6_nowi': 1},
+        {'model_horyzont_analizy_lata': 7, 'rekrutacja_rok7_nowi': 3, 'konsultant_stawka_billable_godz': 450},
+        {'model_horyzont_analizy_lata': 7},
+    ]
+    for wynik, scenariusz in zip(wyniki, oczekiwane):
+        lista, roi_summary, _ = run_financial_model_records(complete_inputs(scenariusz))
+        assert wynik['skumulowany_ebit_5lat'] == roi_summary['skumulowany_ebit_5lat']
+        assert wynik['roczne']['Koszty Rekrutacji'] == [w['Koszty Rekrutacji'] for w in lista]
+
+
+@pytest.mark.parametrize('wartosc', [None, [1], {'a': 1}, True, 'abc'])
+def test_non_numeric_value_is_value_error(wartosc):
+    with pytest.raises(ValueError, match="Scenariusz 3: parametr konsultant_stawka_billable_godz"):
+        parse_scenario({'konsultant_stawka_billable_godz': wartosc}, 3)
+
+
+def test_main_reports_bad_value(tmp_path, capsys):
+    wejscie = tmp_path / 'scenariusze.jsonl'
+    wejscie.write_text(json.dumps({'konsultant_stawka_billable_godz': None}) + '\n', encoding='utf-8')
+    with pytest.raises(SystemExit) as wyjscie:
+        main([str(wejscie), '-o', str(tmp_path / 'wyniki.jsonl')])
+    assert wyjscie.value.code == 2
+    assert "Scenariusz 1" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('horyzont', [2.5, '3.7', 0, -2])
+def test_invalid_horizon_is_value_error(horyzont):
+    with pytest.raises(ValueError, match="Scenariusz 1: horyzont analizy musi być dodatnią liczbą całkowitą"):
+        parse_scenario({'model_horyzont_analizy_lata': horyzont}, 1)
+
+
+def test_integral_float_horizon_is_accepted():
+    assert parse_scenario({'model_horyzont_analizy_lata': 7.0}, 1)['model_horyzont_analizy_lata'] == 7
+
+
+@pytest.mark.parametrize('wartosc', ['nan', 'inf', float('-inf')])
+def test_non_finite_value_is_value_error(wartosc):
+    with pytest.raises(ValueError, match="skończoną liczbą"):
+        parse_scenario({'konsultant_stawka_billable_godz': wartosc}, 1)
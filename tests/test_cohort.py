@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from psmodel.batch import KOLUMNY_ROCZNE, input_columns
+from psmodel.cohort import rampup_curve, run_cohort_model
+from psmodel.model import complete_inputs, run_financial_model
+
+SCENARIUSZ = {'model_horyzont_analizy_lata': 6, 'rekrutacja_rok6_nowi': 2}
+
+
+@pytest.mark.parametrize('krok', ['roczny', 'miesieczny'])
+def test_matches_yearly_model(krok):
+    # Cykl 12 mies. bez rozrzutu i realizacja w 1 mies. - w sumach rocznych to samo co model roczny
+    inputs = complete_inputs(SCENARIUSZ)
+    roczne_wyniki_df, roi_summary, _ = run_financial_model(inputs)
+    wyniki = run_cohort_model([inputs], krok=krok)
+    for kolumna in KOLUMNY_ROCZNE:
+        np.testing.assert_allclose(wyniki[kolumna][0], roczne_wyniki_df[kolumna], rtol=1e-12, atol=1e-6, err_msg=kolumna)
+    assert np.isclose(wyniki['skumulowany_ebit_5lat'][0], roi_summary['skumulowany_ebit_5lat'])
+
+
+def test_monthly_periods_sum_to_years():
+    wyniki = run_cohort_model([complete_inputs({**SCENARIUSZ, 'sprzedaz_cykl_sprzedazy_miesiace': 5})], krok='miesieczny')
+    okresowe = wyniki['okresowe']
+    assert okresowe['Okres'][-1] == 6 * 12
+    for kolumna in ("Łączny Przychód z Godzin Billable", "Przychód z Kontraktów (z opóźnieniem)",
+                    "Koszty Rekrutacji", "ZYSK / STRATA OPERACYJNA (EBIT)"):
+        np.testing.assert_allclose(okresowe[kolumna][0].reshape(6, 12).sum(axis=1), wyniki[kolumna][0], err_msg=kolumna)
+    np.testing.assert_array_equal(okresowe["Łączna Liczba Konsultantów"][0, 11::12],
+                                  wyniki["Łączna Liczba Konsultantów (koniec roku)"][0])
+
+
+def test_rampup_curve():
+    kolumny = input_columns([complete_inputs({})])
+    krzywa = rampup_curve(kolumny, 12)
+    assert krzywa['billable'].shape == (1, 24)
+    assert np.all(krzywa['billable'][0, :12] == 0.25) and np.all(krzywa['billable'][0, 12:] == 0.60)
+
+    krzywa = rampup_curve(input_columns([complete_inputs({'rampup_dlugosc_lata': 3})]), 1)
+    np.testing.assert_allclose(krzywa['sprzedaz'][0], [0.10, 0.30, 0.50])
+
+
+def test_custom_rampup_curve_changes_result():
+    inputs = complete_inputs(SCENARIUSZ)
+    domyslne = run_cohort_model([inputs], krok='miesieczny')
+    # Pełna efektywność od pierwszego miesiąca - więcej przychodu z godzin, te same koszty
+    natychmiastowe = run_cohort_model([inputs], krok='miesieczny', krzywa={'billable': [1.0], 'sprzedaz': [1.0]})
+    roznica = natychmiastowe["Łączny Przychód z Godzin Billable"] - domyslne["Łączny Przychód z Godzin Billable"]
+    assert np.all(roznica >= 0) and roznica[0, 0] > 0  # lata bez nowych osób w ramp-upie bez zmian
+    np.testing.assert_array_equal(natychmiastowe["Łączne Koszty Operacyjne"], domyslne["Łączne Koszty Operacyjne"])
+
+    dluzszy = run_cohort_model([complete_inputs({**SCENARIUSZ, 'rampup_dlugosc_lata': 3})], krok='miesieczny')
+    assert dluzszy['skumulowany_ebit_5lat'][0] < domyslne['skumulowany_ebit_5lat'][0]
+
+
+def test_rampup_length_must_be_shared():
+    with pytest.raises(ValueError, match="ramp-upu"):
+        run_cohort_model([complete_inputs({}), complete_inputs({'rampup_dlugosc_lata': 3})])
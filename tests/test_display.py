@@ -0,0 +1,40 @@
+import numpy as np
+
+from psmodel.display import MAKS_PUNKTOW_WYKRESU, downsample_indices, page_rows
+
+
+def test_page_rows_empty():
+    wiersze, liczba_stron = page_rows(0, 1)
+    assert len(wiersze) == 0 and liczba_stron == 1
+
+
+def test_page_rows_last_partial_page():
+    wiersze, liczba_stron = page_rows(1_203, 3, rozmiar_strony=500)
+    assert liczba_stron == 3
+    np.testing.assert_array_equal(wiersze, np.arange(1_000, 1_203))
+    # Numer strony poza zakresem jest sprowadzany do ostatniej (pierwszej) strony
+    np.testing.assert_array_equal(page_rows(1_203, 9, rozmiar_strony=500)[0], wiersze)
+    np.testing.assert_array_equal(page_rows(1_203, 0, rozmiar_strony=500)[0], np.arange(500))
+
+
+def test_page_rows_follow_order():
+    kolejnosc = np.array([4, 2, 0, 3, 1])
+    wiersze, liczba_stron = page_rows(kolejnosc, 2, rozmiar_strony=2)
+    assert liczba_stron == 3
+    np.testing.assert_array_equal(wiersze, [0, 3])
+
+
+def test_downsample_short_series_is_untouched():
+    assert len(downsample_indices([])) == 0
+    seria = np.arange(MAKS_PUNKTOW_WYKRESU, dtype=float)
+    np.testing.assert_array_equal(downsample_indices([seria]), np.arange(MAKS_PUNKTOW_WYKRESU))
+
+
+def test_downsample_keeps_ends_and_extremes():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=5_001), rng.normal(size=5_001)
+    a[1_234], b[4_321] = 100.0, -100.0
+    punkty = downsample_indices([a, b])
+    assert len(punkty) <= MAKS_PUNKTOW_WYKRESU + 2
+    assert np.all(np.diff(punkty) > 0)
+    assert {0, 5_000, 1_234, 4_321} <= set(punkty.tolist())
@@ -0,0 +1,38 @@
+import numpy as np
+
+from psmodel.batch import KOLUMNY_ROCZNE
+from psmodel.jacobian import financial_model_jacobian
+from psmodel.model import complete_inputs, run_financial_model_records
+
+
+def _yearly(inputs):
+    lista, roi_summary, _ = run_financial_model_records(complete_inputs(inputs))
+    wyniki = {k: np.array([w[k] for w in lista], dtype=np.float64) for k in KOLUMNY_ROCZNE}
+    wyniki['skumulowany_ebit_5lat'] = roi_summary['skumulowany_ebit_5lat']
+    wyniki['roi'] = roi_summary['roi']
+    return wyniki
+
+
+def test_jacobian_matches_central_differences():
+    inputs = complete_inputs({'model_horyzont_analizy_lata': 6, 'rekrutacja_rok6_nowi': 1})
+    jakobian = financial_model_jacobian(inputs)
+    bazowe = {k: v for k, v in inputs.items() if k != 'konsultant_procent_czasu_sprzedaz_docelowy'}
+    assert jakobian['parametry']
+
+    for i, parametr in enumerate(jakobian['parametry']):
+        h = 1e-6 * max(abs(float(inputs[parametr])), 1.0)
+        plus, minus = _yearly({**bazowe, parametr: inputs[parametr] + h}), _yearly({**bazowe, parametr: inputs[parametr] - h})
+        for kolumna in (*KOLUMNY_ROCZNE, 'skumulowany_ebit_5lat', 'roi'):
+            roznice = (np.asarray(plus[kolumna]) - np.asarray(minus[kolumna])) / (2 * h)
+            analityczne = jakobian['jakobian'][kolumna][..., i]
+            skala = np.maximum(np.abs(np.asarray(jakobian['wartosci'][kolumna])) / max(abs(float(inputs[parametr])), 1.0), 1.0)
+            np.testing.assert_allclose(analityczne, roznice, rtol=1e-5, atol=1e-5 * np.max(skala),
+                                       err_msg=f"{kolumna} po {parametr}")
+
+
+def test_jacobian_values_match_model():
+    inputs = complete_inputs({})
+    jakobian = financial_model_jacobian(inputs)
+    oczekiwane = _yearly(inputs)
+    for kolumna in KOLUMNY_ROCZNE:
+        np.testing.assert_allclose(jakobian['wartosci'][kolumna], oczekiwane[kolumna], rtol=1e-12)
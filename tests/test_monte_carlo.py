@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from psmodel.model import complete_inputs
+from psmodel.monte_carlo import default_distributions, run_monte_carlo
+
+
+def _run(**kwargs):
+    inputs = complete_inputs({})
+    return run_monte_carlo(inputs, default_distributions(inputs, 0.3), 20_000, rozmiar_paczki=3_000, seed=7, **kwargs)
+
+
+def _assert_same(a, b):
+    assert a.keys() == b.keys()
+    for k in a:
+        assert np.array_equal(np.asarray(a[k]), np.asarray(b[k]), equal_nan=True), k
+
+
+def test_same_seed_same_result_for_any_worker_count():
+    _assert_same(_run(procesy=1), _run(procesy=3))
+
+
+def test_cohort_engine_with_yearly_step_matches_yearly_model():
+    # Z domyślnymi parametrami lejka (cykl 12 mies., bez rozrzutu) silnik kohortowy odtwarza model roczny
+    roczny, kohortowy = _run(procesy=1), _run(procesy=1, krok_kohortowy='roczny')
+    for k in ('ebit_srednia', 'przeplyw_srednia', 'prawdopodobienstwo_zwrotu', 'prawdopodobienstwo_celu_marzy'):
+        np.testing.assert_allclose(kohortowy[k], roczny[k], rtol=1e-9, atol=1e-6)
+
+
+def test_monthly_cohort_engine():
+    wynik = _run(procesy=1, krok_kohortowy='miesieczny')
+    assert wynik['liczba_losowan'] == 20_000
+    assert wynik['ebit_percentyle'].shape == (5, 5)
+
+
+@pytest.mark.parametrize('rozmiar_paczki', [0, -5])
+def test_non_positive_chunk_size_is_rejected(rozmiar_paczki):
+    inputs = complete_inputs({})
+    with pytest.raises(ValueError, match="Rozmiar paczki"):
+        run_monte_carlo(inputs, default_distributions(inputs), 1_000, rozmiar_paczki=rozmiar_paczki)
@@ -0,0 +1,53 @@
+import itertools
+
+import numpy as np
+
+from psmodel.model import complete_inputs, run_financial_model_records
+from psmodel.optimizer import KOLUMNA_EBIT, KOLUMNA_PRZYCHOD, TOLERANCJA, optimize_recruitment_plan
+
+
+def _exhaustive_front(inputs, rok_docelowy, max_nowych):
+    horyzont_lat = int(inputs['model_horyzont_analizy_lata'])
+    punkty = []
+    for plan in itertools.product(range(max_nowych + 1), repeat=horyzont_lat):
+        scenariusz = {**inputs, **{f'rekrutacja_rok{n}_nowi': nowi for n, nowi in enumerate(plan, 1)}}
+        lista, roi_summary, _ = run_financial_model_records(scenariusz)
+        przychod, ebit = lista[rok_docelowy - 1][KOLUMNA_PRZYCHOD], lista[rok_docelowy - 1][KOLUMNA_EBIT]
+        if przychod > 0 and przychod >= inputs['cel_obrot_roczny_aspiracja'] - TOLERANCJA and \
+                ebit >= inputs['cel_marza_operacyjna'] * przychod - TOLERANCJA:
+            punkty.append((roi_summary['calkowite_koszty_rekrutacji_5lat'], roi_summary['skumulowany_ebit_5lat']))
+    front = []
+    for koszt, ebit in sorted(punkty, key=lambda p: (p[0], -p[1])):
+        if not front or ebit > front[-1][1] + TOLERANCJA:
+            front.append((koszt, ebit))
+    return front
+
+
+def test_front_matches_exhaustive_search():
+    inputs = complete_inputs({'model_horyzont_analizy_lata': 3, 'cel_obrot_roczny_aspiracja': 1_500_000,
+                              'cel_marza_operacyjna': 0.05})
+    wynik = optimize_recruitment_plan(inputs, rok_docelowy=3, max_nowych=3)
+    oczekiwany = _exhaustive_front(inputs, 3, 3)
+    assert oczekiwany
+    np.testing.assert_allclose([(p['koszt_rekrutacji'], p['skumulowany_ebit']) for p in wynik['front_pareto']],
+                               oczekiwany, rtol=1e-9, atol=1e-6)
+    assert wynik['odwiedzone_wezly'] < 1 + 4 + 4 ** 2 + 4 ** 3  # odcięcia skracają pełne drzewo
+
+    for punkt in wynik['front_pareto']:
+        scenariusz = {**inputs, **{f'rekrutacja_rok{n}_nowi': nowi for n, nowi in enumerate(punkt['plan'], 1)}}
+        _, roi_summary, _ = run_financial_model_records(scenariusz)
+        assert np.isclose(roi_summary['skumulowany_ebit_5lat'], punkt['skumulowany_ebit'])
+
+
+def test_unreachable_goal():
+    inputs = complete_inputs({'model_horyzont_analizy_lata': 2, 'cel_obrot_roczny_aspiracja': 1e12})
+    wynik = optimize_recruitment_plan(inputs, rok_docelowy=2, max_nowych=2)
+    assert wynik['najtanszy_plan'] is None and wynik['front_pareto'] == []
+
+
+def test_long_horizon_stays_small():
+    inputs = complete_inputs({'model_horyzont_analizy_lata': 10, 'cel_obrot_roczny_aspiracja': 20_000_000,
+                              'cel_marza_operacyjna': 0.1})
+    wynik = optimize_recruitment_plan(inputs, rok_docelowy=8, max_nowych=10)
+    assert wynik['najtanszy_plan'] is not None
+    assert wynik['odwiedzone_wezly'] < 10 * 11 ** 3  # pełne drzewo: ~11^10 węzłów
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from psmodel.batch import input_columns
+from psmodel.cohort import run_cohort_model
+from psmodel.model import complete_inputs
+from psmodel.pipeline import causal_convolve, contract_pipeline, recognition_kernel, sales_cycle_kernel
+
+
+def _kolumny(**parametry):
+    return input_columns([complete_inputs(parametry)])
+
+
+@pytest.mark.parametrize('kroki_na_rok', [1, 12])
+@pytest.mark.parametrize('parametry', [
+    {}, {'sprzedaz_cykl_sprzedazy_miesiace': 0}, {'sprzedaz_cykl_sprzedazy_miesiace': 7.5, 'sprzedaz_cykl_rozrzut_miesiace': 3},
+    {'sprzedaz_okres_realizacji_miesiace': 18}, {'sprzedaz_okres_realizacji_miesiace': 2.5},
+])
+def test_kernels_sum_to_one(parametry, kroki_na_rok):
+    kolumny = _kolumny(**parametry)
+    np.testing.assert_allclose(sales_cycle_kernel(kolumny, kroki_na_rok).sum(axis=1), 1.0)
+    np.testing.assert_allclose(recognition_kernel(kolumny, kroki_na_rok).sum(axis=1), 1.0)
+
+
+def test_sales_cycle_delays_revenue():
+    kolumny = _kolumny(sprzedaz_cykl_sprzedazy_miesiace=5)
+    leady = np.zeros((1, 24))
+    leady[0, 2] = 10.0
+    lejek = contract_pipeline(leady, kolumny, 12)
+    wartosc = 10.0 * kolumny['sprzedaz_wspolczynnik_konwersji'][0] * kolumny['sprzedaz_srednia_wartosc_kontraktu'][0]
+    oczekiwany = np.zeros(24)
+    oczekiwany[2 + 5] = wartosc
+    np.testing.assert_allclose(lejek['przychod'][0], oczekiwany)
+    assert lejek['kontrakty_podpisane'][0].argmax() == 7
+
+
+def test_zero_cycle_matches_no_pipeline():
+    inputs = complete_inputs({'sprzedaz_cykl_sprzedazy_miesiace': 0})
+    for krok in ('roczny', 'miesieczny'):
+        wyniki = run_cohort_model([inputs], krok=krok)
+        # Bez cyklu i z realizacją w 1 mies. przychód z kontraktów to kontrakty pozyskane × wartość, w tym samym okresie
+        np.testing.assert_allclose(wyniki["Przychód z Kontraktów (z opóźnieniem)"],
+                                   wyniki["Łącznie Kontrakty Pozyskane (szt.)"] * inputs['sprzedaz_srednia_wartosc_kontraktu'])
+
+
+def test_causal_convolve():
+    x = np.array([[1.0, 2.0, 3.0, 0.0]])
+    np.testing.assert_allclose(causal_convolve(x, np.array([0.5, 0.5])), [[0.5, 1.5, 2.5, 1.5]])
+    # Jądro dłuższe niż oś czasu jest obcinane
+    np.testing.assert_allclose(causal_convolve(x, np.ones(10)), [[1.0, 3.0, 6.0, 6.0]])
+
+
+def test_negative_cycle_is_rejected():
+    with pytest.raises(ValueError, match="Cykl sprzedaży"):
+        sales_cycle_kernel(_kolumny(sprzedaz_cykl_sprzedazy_miesiace=-1), 12)
@@ -0,0 +1,36 @@
+import io
+
+import numpy as np
+
+from psmodel.batch import run_financial_model_batch
+from psmodel.model import complete_inputs
+from psmodel.portfolio import Portfolio, read_units
+
+
+def test_units_with_different_keys():
+    plik = io.StringIO(
+        "id,grupa,rekrutacja_rok6_nowi,rekrutacja_rok7_nowi,rekrutacja_rok9_nowi,konsultant_stawka_billable_godz\n"
+        "a,x,2,,5,\n"
+        "b,x,,3,,450\n"
+        "c,y,,,,\n")
+    portfel = Portfolio(7)
+    portfel.replace_units(read_units(plik))
+    assert portfel.evaluate() == 3
+
+    jednostki = portfel.unit_results()
+    oczekiwane = run_financial_model_batch([complete_inputs({'model_horyzont_analizy_lata': 7, **p}) for p in (
+        {'rekrutacja_rok6_nowi': 2}, {'rekrutacja_rok7_nowi': 3, 'konsultant_stawka_billable_godz': 450}, {})])
+    assert list(jednostki['etykiety']) == ['a', 'b', 'c']
+    np.testing.assert_array_equal(jednostki['skumulowany_ebit_5lat'], oczekiwane['skumulowany_ebit_5lat'])
+    np.testing.assert_array_equal(portfel.rollup(po_grupach=False)['skumulowany_ebit_5lat'],
+                                  [oczekiwane['skumulowany_ebit_5lat'].sum()])
+
+
+def test_short_horizon_ignores_later_years():
+    portfel = Portfolio(3)
+    portfel.set_unit('a', {'rekrutacja_rok4_nowi': 9})
+    portfel.set_unit('b', {})
+    portfel.evaluate()
+    wyniki = portfel.unit_results()
+    assert wyniki['skumulowany_ebit_5lat'][0] == wyniki['skumulowany_ebit_5lat'][1]
+    assert portfel.przeliczone_ostatnio == 1  # te same parametry w horyzoncie - jeden klucz
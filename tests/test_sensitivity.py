@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from psmodel.batch import run_financial_model_batch
+from psmodel.model import complete_inputs
+from psmodel.sensitivity import sweep_2d, tornado
+
+
+def test_tornado_matches_single_runs():
+    inputs = complete_inputs({})
+    wynik = tornado(inputs, 0.1)
+    for parametr, niska, wysoka, ebit_niski, ebit_wysoki in zip(
+            wynik['parametr'], wynik['wartosc_niska'], wynik['wartosc_wysoka'], wynik['ebit_niski'], wynik['ebit_wysoki']):
+        warianty = [{**inputs, parametr: niska}, {**inputs, parametr: wysoka}]
+        for w in warianty:
+            w.pop('konsultant_procent_czasu_sprzedaz_docelowy')
+        ebit = run_financial_model_batch([complete_inputs(w) for w in warianty])['skumulowany_ebit_5lat']
+        assert (ebit_niski, ebit_wysoki) == (ebit[0], ebit[1])
+
+
+@pytest.mark.parametrize('krok', ['roczny', 'miesieczny'])
+def test_cohort_engine_sensitivities(krok):
+    inputs = complete_inputs({'sprzedaz_cykl_sprzedazy_miesiace': 6})
+    wynik = tornado(inputs, 0.1, krok_kohortowy=krok)
+    assert 'rampup_dlugosc_lata' not in wynik['parametr']
+    if krok == 'miesieczny':
+        # Cykl sprzedaży nie wpływa na model roczny, ale zmienia wynik miesięcznego silnika kohortowego
+        i = wynik['parametr'].index('sprzedaz_cykl_sprzedazy_miesiace')
+        assert wynik['ebit_niski'][i] != wynik['ebit_wysoki'][i]
+
+    siatka = sweep_2d(inputs, 'konsultant_stawka_billable_godz', np.linspace(300, 700, 7),
+                      'sprzedaz_wspolczynnik_konwersji', np.linspace(0.1, 0.5, 5), rozmiar_paczki=8, krok_kohortowy=krok)
+    assert siatka['skumulowany_ebit_5lat'].shape == (5, 7)
+    assert np.all(np.diff(siatka['skumulowany_ebit_5lat'], axis=1) > 0)
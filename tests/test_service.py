@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from psmodel import service
+from psmodel.cli import evaluate_batch
+from psmodel.model import parse_scenario
+
+
+@pytest.fixture
+def bad_id(monkeypatch):
+    """Silnik wsadowy zgłasza błąd dla każdej paczki zawierającej scenariusz o id 'zly'."""
+    def licz(paczka, roczne=False):
+        if any(s['id'] == 'zly' for s in paczka):
+            raise ValueError("zły scenariusz")
+        return evaluate_batch(paczka, roczne)
+    monkeypatch.setattr(service, 'evaluate_batch', licz)
+
+
+async def _request(port, metoda, sciezka, tresc=b'', naglowki=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    if naglowki is None:
+        naglowki = f"Content-Length: {len(tresc)}\r\n"
+    writer.write(f"{metoda} {sciezka} HTTP/1.1\r\nHost: x\r\n{naglowki}Connection: close\r\n\r\n".encode('latin-1') + tresc)
+    odpowiedz = await reader.read()
+    writer.close()
+    naglowek, _, cialo = odpowiedz.partition(b'\r\n\r\n')
+    return int(naglowek.split(b' ', 2)[1]), naglowek, cialo
+
+
+def _with_service(test, **kwargs):
+    async def uruchom():
+        usluga = service.ModelService(okno_ms=50, **kwargs)
+        serwer = await usluga.start(port=0)
+        try:
+            return await test(serwer.sockets[0].getsockname()[1])
+        finally:
+            await usluga.stop()
+    return asyncio.run(uruchom())
+
+
+def test_evaluate_isolated_only_fails_bad_scenario(bad_id):
+    scenariusze = [parse_scenario({'id': i}, 1) for i in ('a', 'zly', 'b')]
+    wyniki = service.evaluate_isolated(scenariusze, False)
+    assert [w['id'] for w in (wyniki[0], wyniki[2])] == ['a', 'b']
+    assert isinstance(wyniki[1], ValueError)
+
+
+def test_bad_request_does_not_fail_batched_neighbours(bad_id):
+    async def test(port):
+        return await asyncio.gather(*(
+            _request(port, 'POST', '/model', json.dumps({'id': i}).encode()) for i in ('a', 'zly', 'b')))
+
+    (status_a, _, a), (status_zly, _, zly), (status_b, _, b) = _with_service(test)
+    assert (status_a, status_zly, status_b) == (200, 400, 200)
+    assert json.loads(a)['id'] == 'a' and json.loads(b)['id'] == 'b'
+    assert 'zły scenariusz' in json.loads(zly)['blad']
+
+
+def test_stream_reports_error_record_and_terminates(bad_id):
+    tresc = '\n'.join(json.dumps({'id': i}) for i in ('a', 'zly', 'b')).encode()
+
+    async def test(port):
+        return await _request(port, 'POST', '/scenariusze', tresc)
+
+    status, naglowek, cialo = _with_service(test)
+    assert status == 200 and b'chunked' in naglowek
+    assert cialo.endswith(b'0\r\n\r\n')
+    fragmenty = cialo.split(b'\r\n')[1::2]  # rozmiar fragmentu, treść, rozmiar, treść, ...
+    rekordy = [json.loads(linia) for fragment in fragmenty for linia in fragment.splitlines() if linia]
+    assert [r['id'] for r in rekordy] == ['a', 'zly', 'b']
+    assert 'blad' in rekordy[1] and 'roi' in rekordy[0] and 'roi' in rekordy[2]
+
+
+def test_malformed_content_length_is_400():
+    async def test(port):
+        return await _request(port, 'POST', '/model', b'{}', naglowki="Content-Length: abc\r\n")
+
+    status, _, cialo = _with_service(test)
+    assert status == 400
+    assert 'Content-Length' in json.loads(cialo)['blad']
+
+
+def test_unexpected_engine_error_is_500(monkeypatch):
+    def licz(paczka, roczne=False):
+        raise RuntimeError("awaria silnika")
+    monkeypatch.setattr(service, 'evaluate_batch', licz)
+
+    async def test(port):
+        return await _request(port, 'POST', '/model', b'{}')
+
+    status, _, cialo = _with_service(test)
+    assert status == 500
+    assert 'awaria silnika' in json.loads(cialo)['blad']
+
+
+@pytest.mark.parametrize('horyzont', [2.5, 0, -1])
+def test_invalid_horizon_is_400(horyzont):
+    async def test(port):
+        return await _request(port, 'POST', '/model', json.dumps({'model_horyzont_analizy_lata': horyzont}).encode())
+
+    status, _, cialo = _with_service(test)
+    assert status == 400
+    assert 'horyzont analizy' in json.loads(cialo)['blad']
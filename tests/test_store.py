@@ -0,0 +1,82 @@
+import multiprocessing
+
+import numpy as np
+
+from psmodel.batch import run_financial_model_batch
+from psmodel.model import complete_inputs
+from psmodel.store import INDEKSOWANE, PODSUMOWANIE, ScenarioStore
+
+
+def _scenarios(n, seed):
+    rng = np.random.default_rng(seed)
+    return [complete_inputs({'rekrutacja_rok1_nowi': int(a), 'rekrutacja_rok2_nowi': int(b),
+                             'konsultant_stawka_billable_godz': float(c)})
+            for a, b, c in zip(rng.integers(0, 6, n), rng.integers(0, 6, n), rng.uniform(200, 800, n))]
+
+
+def _append(katalog, seed, n=3, powtorzenia=20):
+    magazyn = ScenarioStore(katalog, 5)
+    for i in range(powtorzenia):
+        scenariusze = _scenarios(n, seed * 1000 + i)
+        magazyn.append(scenariusze, run_financial_model_batch(scenariusze))
+
+
+def test_top_matches_full_sort_across_segments(tmp_path):
+    magazyn = ScenarioStore(tmp_path, 5)
+    for i in range(37):
+        scenariusze = _scenarios(1 + i % 5, i)
+        magazyn.append(scenariusze, run_financial_model_batch(scenariusze),
+                       zrodlo='kohortowy_miesieczny' if i % 3 == 0 else 'model_roczny')
+    # Scalanie jak licznik binarny - liczba segmentów rośnie logarytmicznie
+    assert len(magazyn.schemat['segmenty']) <= np.log2(len(magazyn)) + 1
+
+    podsumowanie = np.asarray(magazyn.podsumowanie)
+    for miara in INDEKSOWANE:
+        wartosci = podsumowanie[:, PODSUMOWANIE.index(miara)]
+        warunek = podsumowanie[:, PODSUMOWANIE.index('nadwyzka_marzy')] >= 0
+        oczekiwane = np.sort(wartosci[warunek])[::-1][:10]
+        wynik = magazyn.top(miara, n=10, warunki={'nadwyzka_marzy': (0, None)}, blok=4)
+        assert np.array_equal(wynik[miara], oczekiwane)
+        assert np.array_equal(wynik[miara], podsumowanie[wynik['wiersz'], PODSUMOWANIE.index(miara)])
+
+        rosnaco = magazyn.top(miara, n=7, malejaco=False, blok=3)
+        assert np.array_equal(rosnaco[miara], np.sort(wartosci)[:7])
+
+        zakres = magazyn.range_query(miara, od=np.median(wartosci))
+        assert np.array_equal(np.sort(zakres), np.flatnonzero(wartosci >= np.median(wartosci)))
+
+    zrodla = magazyn.top('roi', n=1000, zrodlo='kohortowy_miesieczny')
+    assert len(zrodla['wiersz']) == sum(1 + i % 5 for i in range(0, 37, 3))
+    assert set(zrodla['zrodlo']) == {'kohortowy_miesieczny'}
+
+    magazyn.compact()
+    assert len(magazyn.schemat['segmenty']) == 1
+    assert np.array_equal(magazyn.top('roi', n=10)['roi'], np.sort(podsumowanie[:, PODSUMOWANIE.index('roi')])[::-1][:10])
+
+
+def test_new_parameters_extend_schema(tmp_path):
+    magazyn = ScenarioStore(tmp_path, 8)
+    pierwszy = [complete_inputs({'model_horyzont_analizy_lata': 8})]
+    drugi = [complete_inputs({'model_horyzont_analizy_lata': 8, 'rekrutacja_rok9_nowi': 2})]
+    magazyn.append(pierwszy, run_financial_model_batch(pierwszy))
+    magazyn.append(drugi, run_financial_model_batch(drugi))
+
+    wejscia = magazyn.inputs([0, 1])
+    assert 'rekrutacja_rok9_nowi' not in wejscia[0]
+    assert wejscia[1]['rekrutacja_rok9_nowi'] == 2
+    assert np.isnan(magazyn.input_column('rekrutacja_rok9_nowi')[0])
+
+
+def test_concurrent_appends_from_processes(tmp_path):
+    kontekst = multiprocessing.get_context('spawn')
+    procesy = [kontekst.Process(target=_append, args=(str(tmp_path), seed)) for seed in range(4)]
+    for proces in procesy:
+        proces.start()
+    for proces in procesy:
+        proces.join()
+        assert proces.exitcode == 0
+
+    magazyn = ScenarioStore(tmp_path, 5)
+    assert len(magazyn) == 4 * 20 * 3
+    for miara in INDEKSOWANE:
+        assert np.array_equal(np.sort(magazyn.range_query(miara)), np.arange(len(magazyn)))
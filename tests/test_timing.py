@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from psmodel import timing
+from psmodel.timing import record_timings, stage, timed
+
+
+@pytest.fixture
+def zegar(monkeypatch):
+    # Zegar przesuwany ręcznie - czasy etapów są dokładne
+    teraz = [0.0]
+    monkeypatch.setattr(timing.time, 'perf_counter', lambda: teraz[0])
+
+    def przesun(sekundy):
+        teraz[0] += sekundy
+    return przesun
+
+
+def test_nested_stages_count_self_time(zegar):
+    with record_timings() as pomiary:
+        with stage('zewnetrzny'):
+            zegar(1.0)
+            with stage('wewnetrzny'):
+                zegar(2.0)
+                with stage('najglebszy'):
+                    zegar(4.0)
+            zegar(8.0)
+        with stage('wewnetrzny'):
+            zegar(16.0)
+    assert pomiary.etapy == {'zewnetrzny': (9.0, 1), 'wewnetrzny': (18.0, 2), 'najglebszy': (4.0, 1)}
+    assert pomiary.total == 31.0  # suma czasów własnych = czas całkowity
+    assert [w['etap'] for w in pomiary.records()] == ['najglebszy', 'wewnetrzny', 'zewnetrzny']
+
+
+def test_timed_and_disabled_outside_block(zegar):
+    @timed('funkcja')
+    def funkcja():
+        with stage('srodek'):
+            zegar(1.0)
+        zegar(0.5)
+        return 7
+
+    assert funkcja() == 7  # poza record_timings nic nie jest zbierane
+    with record_timings() as pomiary:
+        assert funkcja() == 7
+    assert pomiary.etapy == {'srodek': (1.0, 1), 'funkcja': (0.5, 1)}
+
+
+def test_stage_closes_on_exception(zegar):
+    with record_timings() as pomiary:
+        with pytest.raises(RuntimeError):
+            with stage('zewnetrzny'):
+                with stage('blad'):
+                    zegar(1.0)
+                    raise RuntimeError
+        with stage('po_bledzie'):
+            zegar(2.0)
+    assert pomiary.etapy == {'blad': (1.0, 1), 'zewnetrzny': (0.0, 1), 'po_bledzie': (2.0, 1)}
+
+
+def test_threads_and_nested_blocks_collect_separately():
+    with record_timings() as zewnetrzne:
+        with record_timings() as wewnetrzne:
+            with stage('a'):
+                pass
+        watek = threading.Thread(target=lambda: stage('w_watku').__enter__().__exit__(None, None, None))
+        watek.start()
+        watek.join()
+        with stage('b'):
+            pass
+    assert list(wewnetrzne.etapy) == ['a']
+    assert list(zewnetrzne.etapy) == ['b']